@@ -1,39 +1,102 @@
 """
 AI agents for MedRefills using LangChain.
 Primary Agent reviews refill requests using protocol checking tools.
+In rules-first mode, clear-cut requests are decided by the deterministic
+rules engine and only ambiguous ones reach the agent.
 """
 import json
-from typing import Dict
+import os
+import threading
+from typing import Dict, Optional, Tuple
 from langchain.agents import create_react_agent, AgentExecutor
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+from app.agents.pool import AgentPool, AgentPoolExhausted
+from app.agents.scheduled_llm import ScheduledChatModel, SingleAttemptGemini
+from app.agents.structured_review import STRUCTURED_PROMPT_VERSION, run_structured_review
 from app.agents.tools import ProtocolCheckTool
-from app.core.db import engine
-from sqlmodel import Session
+from app.core.config import settings
+from app.core.metrics import llm_metrics_handler, observe_stage, track_ai_review
+from app.services.decision_cache import decision_fingerprint, get_or_review
+from app.services.emr_service import get_patient_data, get_patient_clinical_data
+from app.services.llm_scheduler import LLMBackpressureError, llm_priority
+from app.services.protocol_registry import protocol_registry
+from app.services.protocol_rules import ProtocolEvaluation, evaluate_protocol
+from app.services.review_snapshot import build_snapshot
 
 
-def create_primary_agent(session: Session) -> AgentExecutor:
+# Bump when the ReAct prompt or tools change, so cached decisions are not reused
+AGENT_PROMPT_VERSION = "1"
+
+_llm: Optional[BaseChatModel] = None
+_agent_pool: Optional[AgentPool] = None
+_init_lock = threading.Lock()
+
+
+def create_llm() -> BaseChatModel:
+    """
+    Create the Gemini chat model, wrapped so every call goes through the
+    LLM scheduler (rate limit, concurrency cap, priorities).
+    
+    The underlying client keeps its transport (gRPC channel or HTTP session)
+    open, so one instance should be shared across reviews. With
+    LLM_PROVIDER=fake a CountingFakeChatModel is wrapped instead.
+    """
+    if settings.llm_provider == "fake":
+        from app.agents.fake_llm import CountingFakeChatModel
+        llm = CountingFakeChatModel(latency=settings.fake_llm_latency, callbacks=[llm_metrics_handler])
+    else:
+        google_api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+        llm = SingleAttemptGemini(
+            model=settings.gemini_model,
+            temperature=0,
+            google_api_key=google_api_key,
+            transport=settings.gemini_transport,
+            callbacks=[llm_metrics_handler],
+        )
+    return ScheduledChatModel(llm=llm)
+
+
+def get_llm() -> BaseChatModel:
+    """Return the process-wide shared LLM client."""
+    global _llm
+    if _llm is None:
+        with _init_lock:
+            if _llm is None:
+                _llm = create_llm()
+    return _llm
+
+
+def get_agent_pool() -> AgentPool:
+    """Return the process-wide pool of Primary Agent executors."""
+    global _agent_pool
+    if _agent_pool is None:
+        with _init_lock:
+            if _agent_pool is None:
+                _agent_pool = AgentPool(
+                    factory=lambda: create_primary_agent(get_llm()),
+                    size=settings.agent_pool_size,
+                    timeout=settings.agent_pool_timeout,
+                )
+    return _agent_pool
+
+
+def create_primary_agent(llm: Optional[BaseChatModel] = None) -> AgentExecutor:
     """
     Create the Primary Agent that reviews refill requests.
     
     Args:
-        session: Database session for the ProtocolCheckTool
+        llm: Chat model to use (defaults to the shared client)
         
     Returns:
         Configured AgentExecutor
     """
-    # Initialize the protocol check tool with database session
-    protocol_tool = ProtocolCheckTool(session=session)
+    # The protocol check tool borrows a DB session per call
+    protocol_tool = ProtocolCheckTool()
     
     # Initialize LLM (using Google Gemini Pro)
-    import os
-    google_api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-pro",
-        temperature=0,
-        google_api_key=google_api_key,
-    )
+    llm = llm or get_llm()
     
     # Create a prompt template for the agent using the ReAct format
     prompt = ChatPromptTemplate.from_messages([
@@ -58,8 +121,8 @@ Final Answer: Format your final response as JSON with:
     "confidence": <0-100>
 }}"""),
         MessagesPlaceholder(variable_name="chat_history"),
-        ("human", "{input}"),
-        MessagesPlaceholder(variable_name="agent_scratchpad"),
+        # create_react_agent renders the scratchpad as Thought/Action/Observation text
+        ("human", "{input}\n\n{agent_scratchpad}"),
     ])
     
     # Create the agent
@@ -76,12 +139,148 @@ Final Answer: Format your final response as JSON with:
     return executor
 
 
-def run_ai_review(patient_mrn: str, medication_class: str) -> Dict:
+def evaluate_rules(patient_mrn: str, medication_class: str) -> Tuple[ProtocolEvaluation, Dict]:
+    """
+    Evaluate the protocol for a refill request without the LLM.
+    
+    Args:
+        patient_mrn: Patient's Medical Record Number
+        medication_class: Class of medication being refilled
+        
+    Returns:
+        Tuple of the ProtocolEvaluation from the rules engine and a snapshot
+        of the EMR data, protocol and rule results it was based on
+    """
+    patient_data = get_patient_data(patient_mrn)
+    clinical_data = get_patient_clinical_data(patient_mrn)
+    
+    protocol = protocol_registry.get(medication_class)
+    if not protocol:
+        evaluation = ProtocolEvaluation(
+            decision="Deny",
+            reason=f"No protocol found for medication class: {medication_class}"
+        )
+    else:
+        with observe_stage("rules"):
+            evaluation = evaluate_protocol(protocol, clinical_data)
+    
+    return evaluation, build_snapshot(patient_data, clinical_data, protocol, evaluation)
+
+
+def configure_llm(llm) -> None:
+    """
+    Replace the shared LLM (e.g. with a fake for benchmarks).
+    
+    Pooled agent executors are discarded so they are rebuilt with it.
+    """
+    global _llm, _agent_pool
+    with _init_lock:
+        _llm = llm
+        _agent_pool = None
+
+
+def run_ai_review(
+    patient_mrn: str,
+    medication_class: str,
+    mode: Optional[str] = None,
+    agent_mode: Optional[str] = None,
+    urgent: bool = False
+) -> Dict:
     """
     Run the AI review process for a refill request.
     
+    In 'rules_first' mode the protocol is evaluated directly and the result
+    is returned when it is conclusive. The agent is only invoked when EMR
+    data is missing, a value is near a threshold, or the rules engine fails.
+    In 'agent' mode every request goes through the agent.
+    
+    The agent either runs the ReAct tool loop ('react') or answers once from
+    the precomputed protocol results ('structured'); structured mode falls
+    back to ReAct when the EMR data could not be fetched.
+    
+    Agent decisions are cached by a fingerprint of the EMR values, protocol,
+    model and prompt version, so identical reviews skip the LLM. Only the
+    decision and confidence are shared; cached results get a reason built
+    from the request's own rule results.
+    
+    Args:
+        patient_mrn: Patient's Medical Record Number
+        medication_class: Class of medication being refilled
+        mode: 'rules_first' or 'agent' (defaults to settings.ai_review_mode)
+        agent_mode: 'react' or 'structured' (defaults to settings.ai_agent_mode)
+        urgent: Serve this review's LLM calls ahead of normal ones
+        
+    Returns:
+        Dictionary with keys: decision, reason, confidence, decided_by
+        ('rules' or 'agent'), cache_hit (agent decision reused from the
+        decision cache) and snapshot (EMR data and rule results the review
+        was based on, None if they could not be fetched)
+    
+    Raises:
+        LLMBackpressureError: If the LLM had no capacity for the review; the
+            caller should retry later rather than record a decision
+    """
+    with track_ai_review() as tracker, llm_priority("urgent" if urgent else "normal"):
+        result = _run_ai_review(patient_mrn, medication_class, mode, agent_mode)
+        tracker.record(result)
+    return result
+
+
+def _run_ai_review(
+    patient_mrn: str,
+    medication_class: str,
+    mode: Optional[str],
+    agent_mode: Optional[str]
+) -> Dict:
+    """Body of run_ai_review, timed and counted by track_ai_review."""
+    mode = mode or settings.ai_review_mode
+    agent_mode = agent_mode or settings.ai_agent_mode
+    
+    try:
+        evaluation, snapshot = evaluate_rules(patient_mrn, medication_class)
+    except Exception:
+        # Let the agent handle anything the rules engine could not
+        evaluation, snapshot = None, None
+    
+    if mode == "rules_first" and evaluation is not None and evaluation.conclusive:
+        return {
+            "decision": evaluation.decision,
+            "reason": evaluation.reason,
+            "confidence": 100.0,
+            "decided_by": "rules",
+            "cache_hit": False,
+            "snapshot": snapshot
+        }
+    
+    if agent_mode == "structured" and snapshot is not None:
+        prompt_version = f"structured-{STRUCTURED_PROMPT_VERSION}"
+
+        def review() -> Dict:
+            # The LLM is only built on a cache miss
+            return run_structured_review(patient_mrn, medication_class, snapshot, get_llm())
+    else:
+        prompt_version = f"react-{AGENT_PROMPT_VERSION}"
+
+        def review() -> Dict:
+            return run_agent_review(patient_mrn, medication_class)
+    
+    if snapshot is not None and settings.ai_decision_cache_enabled:
+        fingerprint = decision_fingerprint(snapshot, settings.gemini_model, prompt_version)
+        result, cache_hit = get_or_review(fingerprint, review, snapshot)
+    else:
+        result, cache_hit = review(), False
+    result["decided_by"] = "agent"
+    result["cache_hit"] = cache_hit
+    result["snapshot"] = snapshot
+    return result
+
+
+def run_agent_review(patient_mrn: str, medication_class: str) -> Dict:
+    """
+    Run the Primary Agent for a refill request.
+    
     This function:
-    1. Creates the Primary Agent
+    1. Borrows a Primary Agent from the pool
     2. Invokes it with a review prompt
     3. Parses the JSON response
     4. Returns the decision data
@@ -93,52 +292,53 @@ def run_ai_review(patient_mrn: str, medication_class: str) -> Dict:
     Returns:
         Dictionary with keys: decision, reason, confidence
     """
-    with Session(engine) as session:
-        # Create agent
-        agent = create_primary_agent(session)
-        
-        # Create review prompt
-        prompt = f"""Review patient {patient_mrn} for {medication_class} refill using your tools.
+    # Create review prompt
+    prompt = f"""Review patient {patient_mrn} for {medication_class} refill using your tools.
         
         Check all applicable protocols and provide your recommendation as JSON with decision, reason, and confidence."""
-        
-        # Run the agent
-        try:
+    
+    # Run the agent
+    try:
+        with get_agent_pool().borrow() as agent:
             result = agent.invoke({"input": prompt, "chat_history": []})
-            
-            # Extract the AI message from the result
-            output = result.get("output", "")
-            
-            # Try to parse JSON from the output
-            # The agent might return JSON wrapped in markdown or plain text
-            import re
-            json_match = re.search(r'\{[^{}]*"decision"[^{}]*\}', output, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                decision_data = json.loads(json_str)
-            else:
-                # Fallback: try to parse the entire output as JSON
-                try:
-                    decision_data = json.loads(output)
-                except:
-                    # Last resort: create a basic response
-                    decision_data = {
-                        "decision": "Deny",
-                        "reason": "Unable to parse agent response",
-                        "confidence": 0
-                    }
-            
-            return {
-                "decision": decision_data.get("decision", "Deny"),
-                "reason": decision_data.get("reason", "No reason provided"),
-                "confidence": float(decision_data.get("confidence", 75))
-            }
-            
-        except Exception as e:
-            # Return error response
-            return {
-                "decision": "Deny",
-                "reason": f"Error during AI review: {str(e)}",
-                "confidence": 0
-            }
-
+        
+        # Extract the AI message from the result
+        output = result.get("output", "")
+        
+        # Try to parse JSON from the output
+        # The agent might return JSON wrapped in markdown or plain text
+        import re
+        json_match = re.search(r'\{[^{}]*"decision"[^{}]*\}', output, re.DOTALL)
+        if json_match:
+            json_str = json_match.group(0)
+            decision_data = json.loads(json_str)
+        else:
+            # Fallback: try to parse the entire output as JSON
+            try:
+                decision_data = json.loads(output)
+            except:
+                # Last resort: create a basic response
+                decision_data = {
+                    "decision": "Deny",
+                    "reason": "Unable to parse agent response",
+                    "confidence": 0
+                }
+        
+        return {
+            "decision": decision_data.get("decision", "Deny"),
+            "reason": decision_data.get("reason", "No reason provided"),
+            "confidence": float(decision_data.get("confidence", 75))
+        }
+        
+    except LLMBackpressureError:
+        # No capacity is not a decision; let the caller retry
+        raise
+    except AgentPoolExhausted as e:
+        raise LLMBackpressureError(str(e), retry_after=settings.agent_pool_timeout) from e
+    except Exception as e:
+        # Return error response
+        return {
+            "decision": "Deny",
+            "reason": f"Error during AI review: {str(e)}",
+            "confidence": 0
+        }
@@ -0,0 +1,80 @@
+"""
+Thread-safe pool of pre-built agent executors.
+
+Building an AgentExecutor (prompt, tools, agent runnable) and an LLM client
+is comparatively expensive, so executors are built once and borrowed for
+the duration of a single review.
+"""
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from langchain.agents import AgentExecutor
+
+
+class AgentPoolExhausted(Exception):
+    """Raised when no executor becomes available within the timeout."""
+
+
+class AgentPool:
+    """
+    Bounded pool of AgentExecutors.
+
+    Executors are created lazily up to `size` and returned to the pool after
+    each use, so concurrent reviews never share an executor.
+    """
+
+    def __init__(self, factory: Callable[[], AgentExecutor], size: int, timeout: Optional[float] = None):
+        """
+        Args:
+            factory: Callable that builds a new AgentExecutor
+            size: Maximum number of executors
+            timeout: Seconds to wait for a free executor (None waits forever)
+        """
+        self._factory = factory
+        self._size = size
+        self._timeout = timeout
+        self._idle: "queue.LifoQueue[AgentExecutor]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """Maximum number of executors in the pool."""
+        return self._size
+
+    @contextmanager
+    def borrow(self) -> Iterator[AgentExecutor]:
+        """Borrow an executor for the duration of the `with` block."""
+        executor = self._acquire()
+        try:
+            yield executor
+        finally:
+            self._idle.put(executor)
+
+    def _acquire(self) -> AgentExecutor:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self._size
+            if can_create:
+                self._created += 1
+
+        if can_create:
+            try:
+                return self._factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self._timeout)
+        except queue.Empty:
+            raise AgentPoolExhausted(
+                f"No agent executor available after {self._timeout}s (pool size {self._size})"
+            )
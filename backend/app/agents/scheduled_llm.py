@@ -0,0 +1,88 @@
+"""
+Chat model wrapper that admits every call through the LLM scheduler.
+
+Provider rate-limit errors (HTTP 429 / quota exhausted) and outages are
+turned into LLMBackpressureError, so callers retry later instead of
+treating them as a failed review.
+
+The Gemini client retries failed calls internally (up to 10 attempts with
+backoff of up to 60 s). Run inside a slot, those retries would hold it for
+minutes, past the Redis lease TTL. SingleAttemptGemini calls the API once
+and leaves retrying to the caller (the Celery task's backpressure retry).
+"""
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_google_genai.chat_models import _response_to_result
+
+from app.services.llm_scheduler import LLMBackpressureError, llm_scheduler
+
+try:
+    from google.api_core.exceptions import (
+        DeadlineExceeded,
+        InternalServerError,
+        ResourceExhausted,
+        ServiceUnavailable,
+        TooManyRequests,
+    )
+    RATE_LIMIT_ERRORS = (ResourceExhausted, TooManyRequests)
+    UNAVAILABLE_ERRORS = (ServiceUnavailable, InternalServerError, DeadlineExceeded)
+except ImportError:
+    RATE_LIMIT_ERRORS = ()
+    UNAVAILABLE_ERRORS = ()
+
+# Seconds to back off after the provider rejected a call for quota (one quota window)
+PROVIDER_RATE_LIMIT_RETRY_AFTER = 60.0
+# Seconds to back off after a transient provider failure
+PROVIDER_UNAVAILABLE_RETRY_AFTER = 10.0
+
+
+class SingleAttemptGemini(ChatGoogleGenerativeAI):
+    """Gemini chat model that calls the API once per generation, without the client's retry loop."""
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        params, chat, message = self._prepare_chat(messages, stop=stop, **kwargs)
+        return _response_to_result(chat.send_message(content=message, **params))
+
+
+class ScheduledChatModel(BaseChatModel):
+    """Delegates to `llm` while holding a slot from the LLM scheduler."""
+
+    llm: BaseChatModel
+
+    @property
+    def _llm_type(self) -> str:
+        return self.llm._llm_type
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with llm_scheduler.slot():
+            try:
+                # generate() rather than _generate() so the wrapped model's own
+                # callbacks (metrics) time the call itself, not the queueing;
+                # the caller's callbacks already see this wrapper's run
+                result = self.llm.generate([messages], stop=stop, **kwargs)
+            except RATE_LIMIT_ERRORS as e:
+                raise LLMBackpressureError(
+                    f"LLM provider rate limit: {e}", retry_after=PROVIDER_RATE_LIMIT_RETRY_AFTER
+                ) from e
+            except UNAVAILABLE_ERRORS as e:
+                raise LLMBackpressureError(
+                    f"LLM provider unavailable: {e}", retry_after=PROVIDER_UNAVAILABLE_RETRY_AFTER
+                ) from e
+        return ChatResult(generations=result.generations[0], llm_output=result.llm_output)
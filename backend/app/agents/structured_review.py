@@ -0,0 +1,121 @@
+"""
+Single-shot structured review.
+
+Instead of the ReAct loop (at least two LLM calls: one to call the
+protocol tool, one to answer), the EMR data and protocol results computed
+by the rules engine are put in the prompt and the model answers once with
+JSON matching ReviewDecision. The answer is parsed with a schema, not
+scraped with a regex.
+"""
+from typing import Dict
+
+from langchain.output_parsers import PydanticOutputParser
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.pydantic_v1 import BaseModel, Field, validator
+
+from app.services.llm_scheduler import LLMBackpressureError
+
+# Bump when the prompt changes, so cached decisions are not reused
+STRUCTURED_PROMPT_VERSION = "1"
+
+
+class ReviewDecision(BaseModel):
+    """Decision returned by the model."""
+    decision: str = Field(description="'Approve' or 'Deny'")
+    reason: str = Field(description="Short clinical justification referencing the protocol results")
+    confidence: float = Field(description="Confidence in the decision, 0-100")
+
+    @validator("decision")
+    def valid_decision(cls, value: str) -> str:
+        value = value.strip().capitalize()
+        if value not in ("Approve", "Deny"):
+            raise ValueError("decision must be 'Approve' or 'Deny'")
+        return value
+
+    @validator("confidence")
+    def valid_confidence(cls, value: float) -> float:
+        return min(max(value, 0.0), 100.0)
+
+
+parser = PydanticOutputParser(pydantic_object=ReviewDecision)
+
+prompt = ChatPromptTemplate.from_messages([
+    ("system", """You review medication refill requests against clinical protocols.
+
+The protocol rules have already been evaluated against the patient's EMR data. Approve only if every rule passed. Deny if any rule failed. When data is missing or a value is close to a threshold, decide conservatively and explain why.
+
+{format_instructions}
+Respond with the JSON object only."""),
+    ("human", """Patient MRN: {patient_mrn}
+Medication class: {medication_class}
+Protocol: {protocol}
+Clinical data: {clinical_data}
+Rule results:
+{rule_results}
+Escalation reasons: {escalation_reasons}
+Rules engine suggestion: {suggestion}"""),
+]).partial(format_instructions=parser.get_format_instructions())
+
+
+def _format_rule_results(rule_results) -> str:
+    lines = []
+    for result in rule_results:
+        status = {True: "PASS", False: "FAIL", None: "MISSING DATA"}[result.get("passed")]
+        if result.get("violation"):
+            status = "FAIL"
+        suffix = " (borderline)" if result.get("borderline") else ""
+        lines.append(f"- {result['label']}: {result['emr_data']} -> {status}{suffix}")
+    return "\n".join(lines) or "- No rules evaluated"
+
+
+def run_structured_review(
+    patient_mrn: str,
+    medication_class: str,
+    snapshot: Dict,
+    llm: BaseChatModel,
+) -> Dict:
+    """
+    Review a refill request with one LLM call.
+
+    Args:
+        patient_mrn: Patient's Medical Record Number
+        medication_class: Class of medication being refilled
+        snapshot: Review snapshot from build_snapshot (EMR data and rule results)
+        llm: Chat model to use
+
+    Returns:
+        Dictionary with keys: decision, reason, confidence
+    """
+    chain = prompt | llm | parser
+    try:
+        decision = chain.invoke({
+            "patient_mrn": patient_mrn,
+            "medication_class": medication_class,
+            "protocol": snapshot.get("protocol"),
+            "clinical_data": snapshot.get("clinical_data"),
+            "rule_results": _format_rule_results(snapshot.get("rule_results", [])),
+            "escalation_reasons": "; ".join(snapshot.get("escalation_reasons") or []) or "none",
+            "suggestion": snapshot.get("decision"),
+        })
+    except LLMBackpressureError:
+        raise
+    except OutputParserException:
+        return {
+            "decision": "Deny",
+            "reason": "Unable to parse structured response",
+            "confidence": 0
+        }
+    except Exception as e:
+        return {
+            "decision": "Deny",
+            "reason": f"Error during AI review: {str(e)}",
+            "confidence": 0
+        }
+
+    return {
+        "decision": decision.decision,
+        "reason": decision.reason,
+        "confidence": float(decision.confidence)
+    }
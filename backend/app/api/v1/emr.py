@@ -0,0 +1,29 @@
+"""
+API endpoints for the EMR data cache.
+"""
+from fastapi import APIRouter
+
+from app.services.emr_service import clear_emr_cache, get_emr_cache_stats, invalidate_patient
+
+router = APIRouter(prefix="/api/v1/emr", tags=["emr"])
+
+
+@router.get("/cache")
+def get_cache_stats():
+    """Return hit/miss counters and size of this worker's EMR cache."""
+    return get_emr_cache_stats()
+
+
+@router.delete("/cache/patients/{mrn}", status_code=204)
+def invalidate_patient_cache(mrn: str):
+    """
+    Drop cached EMR data for a patient.
+    Call this when the EMR reports a change (e.g. a new lab result).
+    """
+    invalidate_patient(mrn)
+
+
+@router.delete("/cache", status_code=204)
+def clear_cache():
+    """Drop all cached EMR data."""
+    clear_emr_cache()
@@ -0,0 +1,104 @@
+"""
+API endpoints for medication protocols.
+"""
+from datetime import date, datetime
+from typing import List
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlmodel import Session
+
+from app.core.db import get_session
+from app.models import MedicationProtocol
+from app.schemas import (
+    MedicationProtocolRead,
+    MedicationProtocolUpdate,
+    PopulationScreenFailure,
+    PopulationScreenRequest,
+    PopulationScreenResult,
+)
+from app.services.population_screening import screen_population, to_float_array
+from app.services.protocol_registry import protocol_registry
+
+router = APIRouter(prefix="/api/v1", tags=["protocols"])
+
+
+@router.get("/protocols", response_model=List[MedicationProtocolRead])
+def list_protocols(response: Response):
+    """
+    List all medication protocols from the in-memory registry.
+    The registry version is returned in the X-Protocol-Registry-Version header.
+    """
+    response.headers["X-Protocol-Registry-Version"] = str(protocol_registry.version)
+    return protocol_registry.all()
+
+
+@router.put("/protocols/{protocol_id}", response_model=MedicationProtocolRead)
+def update_protocol(
+    protocol_id: int,
+    payload: MedicationProtocolUpdate,
+    session: Session = Depends(get_session)
+):
+    """
+    Update a protocol's rules and bump its version.
+    
+    The local registry is reloaded immediately; other workers reload when
+    PostgreSQL notifies them of the change.
+    """
+    protocol = session.get(MedicationProtocol, protocol_id)
+    if not protocol:
+        raise HTTPException(status_code=404, detail="Protocol not found")
+    
+    for name, value in payload.model_dump(exclude_unset=True).items():
+        setattr(protocol, name, value)
+    protocol.version += 1
+    protocol.updated_at = datetime.utcnow()
+    
+    session.add(protocol)
+    session.commit()
+    session.refresh(protocol)
+    
+    protocol_registry.load()
+    
+    return protocol
+
+
+@router.post("/protocols/{protocol_id}/screen", response_model=PopulationScreenResult)
+def screen_protocol_population(protocol_id: int, payload: PopulationScreenRequest):
+    """
+    Screen a population of patients against a protocol in one vectorized pass.
+    
+    Takes clinical data as parallel columns (one element per patient) and
+    returns pass/fail counts, failures per rule and optionally the failing
+    patients with their reasons.
+    """
+    protocol = protocol_registry.get_by_id(protocol_id)
+    if not protocol:
+        raise HTTPException(status_code=404, detail="Protocol not found")
+    
+    columns = (payload.mrns, payload.last_visit_dates, payload.a1c_values, payload.a1c_dates)
+    if len({len(column) for column in columns}) != 1:
+        raise HTTPException(status_code=400, detail="All columns must have the same length")
+    
+    as_of = payload.as_of or date.today()
+    result = screen_population(
+        protocol,
+        np.array(payload.last_visit_dates, dtype="datetime64[D]"),
+        to_float_array(payload.a1c_values),
+        np.array(payload.a1c_dates, dtype="datetime64[D]"),
+        as_of=as_of,
+    )
+    
+    failures = []
+    if payload.include_failures:
+        failures = [
+            PopulationScreenFailure(mrn=payload.mrns[index], reasons=result.reasons(index))
+            for index in np.flatnonzero(~result.passed)
+        ]
+    
+    return PopulationScreenResult(
+        protocol_id=protocol.id,
+        protocol_version=protocol.version,
+        as_of=as_of,
+        summary=result.summary(),
+        failures=failures,
+    )
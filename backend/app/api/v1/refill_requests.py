@@ -1,132 +1,389 @@
 """
 API endpoints for refill requests.
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 from datetime import datetime
 
-from app.core.db import get_session
-from app.models import RefillRequest, Patient, MedicationProtocol, RefillStatus
-from app.schemas import RefillRequestRead, ReviewPayload, RefillDetailData
-from app.services.emr_service import get_patient_data, get_patient_clinical_data
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import get_async_session, get_session
+from app.core.metrics import observe_stage
+from app.models import ArchivedRefillRequest, RefillRequest, Patient, MedicationProtocol, RefillStatus
+from app.schemas import (
+    BulkReviewItemResult,
+    BulkReviewPayload,
+    BulkReviewResult,
+    ClaimNextPayload,
+    ClaimPayload,
+    RefillDetailData,
+    RefillIngestResult,
+    RefillRequestBatchCreate,
+    RefillRequestRead,
+    RefillStatsRead,
+    ReviewPayload,
+)
+from app.services.bulk_review import apply_bulk_review
+from app.services.emr_service import aget_patient_data, aget_patient_clinical_data
+from app.services.etags import CACHE_CONTROL, detail_etag, etag_matches, queue_etag
+from app.services.protocol_registry import protocol_registry
+from app.services.protocol_rules import evaluate_protocol
+from app.services.refill_claims import ClaimConflict, check_can_review, claim_next, claim_request, release_claim
+from app.services.refill_events import refill_events
+from app.services.refill_ingest import ingest_rows, parse_feed
+from app.services.refill_export import EXPORT_FORMATS, build_export_statement, stream_export
+from app.services.refill_queue import InvalidCursor, build_queue_statement, decode_cursor, encode_cursor
+from app.services.refill_stats import refill_stats
+from app.services.review_snapshot import protocols_checked
+from app.worker.tasks import enqueue_ai_reviews
 
 router = APIRouter(prefix="/api/v1", tags=["refill-requests"])
 
 
-@router.get("/refill-queue", response_model=List[RefillRequestRead])
-def get_refill_queue(session: Session = Depends(get_session)):
+async def load_refill_request(
+    session: AsyncSession,
+    request_id: int,
+    for_update: bool = False
+) -> Optional[RefillRequest]:
+    """Load a refill request with its patient and protocol in one round-trip per table."""
+    statement = (
+        select(RefillRequest)
+        .where(RefillRequest.id == request_id)
+        .options(selectinload(RefillRequest.patient), selectinload(RefillRequest.protocol))
+        .execution_options(populate_existing=True)
+    )
+    if for_update:
+        statement = statement.with_for_update(of=RefillRequest)
+    return (await session.exec(statement)).first()
+
+
+async def archived_status_conflict(session: AsyncSession, request_id: int) -> Optional[HTTPException]:
+    """409 for a request that was archived (reviewed long ago and unchangeable), else None."""
+    archived_status = (await session.exec(
+        select(ArchivedRefillRequest.status).where(ArchivedRefillRequest.id == request_id)
+    )).first()
+    if archived_status:
+        return HTTPException(
+            status_code=409,
+            detail=f"Refill request was already reviewed ({archived_status.value})"
+        )
+    return None
+
+
+async def load_archived_refill_request(session: AsyncSession, request_id: int) -> Optional[ArchivedRefillRequest]:
+    """Load an archived refill request with its patient and protocol."""
+    statement = (
+        select(ArchivedRefillRequest)
+        .where(ArchivedRefillRequest.id == request_id)
+        .options(selectinload(ArchivedRefillRequest.patient), selectinload(ArchivedRefillRequest.protocol))
+    )
+    return (await session.exec(statement)).first()
+
+
+@router.post("/refill-requests:batch", response_model=List[RefillRequestRead], status_code=202)
+def create_refill_requests_batch(
+    payload: RefillRequestBatchCreate,
+    session: Session = Depends(get_session)
+):
+    """
+    Submit refill requests for AI review.
+    
+    Inserts every request as PENDING_AI_REVIEW in one transaction and hands
+    them to the background worker pool, which moves each one to
+    PENDING_HUMAN_REVIEW once its AI review is stored.
     """
-    Fetch all refill requests pending human review.
-    Sorts to show "Deny" recommendations first.
+    # Validate referenced patients and protocols
+    patient_ids = {item.patient_id for item in payload.requests}
+    protocol_ids = {item.protocol_id for item in payload.requests}
+    found_patients = set(session.exec(select(Patient.id).where(Patient.id.in_(patient_ids))).all())
+    found_protocols = set(session.exec(
+        select(MedicationProtocol.id).where(MedicationProtocol.id.in_(protocol_ids))
+    ).all())
+    
+    missing_patients = sorted(patient_ids - found_patients)
+    missing_protocols = sorted(protocol_ids - found_protocols)
+    if missing_patients or missing_protocols:
+        raise HTTPException(
+            status_code=404,
+            detail={"missing_patient_ids": missing_patients, "missing_protocol_ids": missing_protocols}
+        )
+    
+    # Create the requests
+    requests = [
+        RefillRequest(
+            patient_id=item.patient_id,
+            protocol_id=item.protocol_id,
+            is_urgent=item.is_urgent,
+            status=RefillStatus.PENDING_AI_REVIEW
+        )
+        for item in payload.requests
+    ]
+    session.add_all(requests)
+    session.commit()
+    
+    # Enqueue only after commit so workers can see the rows
+    request_ids = [req.id for req in requests]
+    refill_events.mark_changed()
+    enqueue_ai_reviews(request_ids, urgent_ids={req.id for req in requests if req.is_urgent})
+    
+    # Reload current state with relationships in a single round-trip
+    statement = (
+        select(RefillRequest)
+        .where(RefillRequest.id.in_(request_ids))
+        .options(selectinload(RefillRequest.patient), selectinload(RefillRequest.protocol))
+        .order_by(RefillRequest.id)
+        .execution_options(populate_existing=True)
+    )
+    return session.exec(statement).all()
+
+
+@router.post("/refill-requests:ingest", response_model=RefillIngestResult, status_code=202)
+async def ingest_refill_requests(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Defaults from Content-Type")
+):
+    """
+    Ingest a pharmacy/eRx feed of refill requests keyed by MRN and medication class.
+    
+    The raw request body is a CSV file (header: mrn,medication_class) or
+    NDJSON. New requests are inserted in bulk as PENDING_AI_REVIEW and
+    enqueued for AI review; rows with an unknown MRN or medication class
+    are reported and skipped.
     """
-    # Get all pending human review requests
-    statement = select(RefillRequest).where(
-        RefillRequest.status == RefillStatus.PENDING_HUMAN_REVIEW
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > settings.ingest_max_body_bytes:
+            raise HTTPException(status_code=413, detail="Feed too large")
+    
+    feed_format = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    try:
+        lines = bytes(body).decode("utf-8-sig").splitlines()
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Feed must be UTF-8")
+    
+    # Bulk database work and enqueueing are blocking; keep them off the event loop
+    result = await run_in_threadpool(ingest_rows, parse_feed(lines, feed_format))
+    if result.created:
+        refill_events.mark_changed()
+    return RefillIngestResult(
+        created=result.created,
+        failed=result.failed,
+        request_ids=result.request_ids,
+        errors=result.errors
     )
-    requests = list(session.exec(statement).all())
+
+
+@router.get("/refill-queue", response_model=List[RefillRequestRead])
+async def get_refill_queue(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Fetch one page of refill requests pending human review.
+    Sorts urgent requests first, then "Deny" recommendations, then oldest
+    first.
     
-    # Sort: Deny first, then Approve
-    requests.sort(key=lambda r: (r.ai_decision != "Deny", r.created_at))
+    When more rows are available, the cursor for the next page is returned
+    in the X-Next-Cursor response header.
     
-    # Load relationships
-    for req in requests:
-        req.patient = session.get(Patient, req.patient_id)
-        req.protocol = session.get(MedicationProtocol, req.protocol_id)
+    The ETag changes whenever a refill request changes status or review
+    claim, so clients revalidating with If-None-Match get 304 without a
+    query while the queue is unchanged.
+    """
+    try:
+        cursor = decode_cursor(after) if after else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Read the change counter before the query, so the tag is never newer than the rows
+    change_count = refill_events.change_count
+    etag = None
+    if change_count is not None:
+        etag = queue_etag(change_count, protocol_registry.version, limit, after)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    
+    # Fetch one extra row to know whether there is a next page
+    statement = build_queue_statement(limit + 1, after=cursor)
+    requests = list((await session.exec(statement)).all())
+    
+    if len(requests) > limit:
+        requests = requests[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(requests[-1])
     
     return requests
 
 
+@router.get("/refill-stats", response_model=RefillStatsRead)
+async def get_refill_stats():
+    """
+    Queue statistics: counts by status, AI/human agreement rate, median
+    time-to-review and backlog age.
+    
+    Served from aggregates this process updates from refill events and
+    periodically reconciles with the database, so no table aggregate runs
+    per request.
+    """
+    if not refill_stats.ready:
+        raise HTTPException(
+            status_code=503,
+            detail="Refill statistics are loading",
+            headers={"Retry-After": "5"}
+        )
+    return refill_stats.snapshot()
+
+
+@router.get("/refill-requests:export")
+def export_refill_requests(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[List[RefillStatus]] = Query(None, description="Repeat to include several statuses"),
+    ai_decision: Optional[str] = Query(None, pattern="^(Approve|Deny)$"),
+    final_decision: Optional[str] = Query(None, pattern="^(Approve|Deny)$"),
+    created_from: Optional[datetime] = Query(None, description="Created at or after (inclusive)"),
+    created_to: Optional[datetime] = Query(None, description="Created before (exclusive)")
+):
+    """
+    Stream refill requests matching the filters as NDJSON or CSV, ordered by id.
+    
+    Rows are read with a server-side cursor and written as they arrive, so
+    exports of any size use constant memory.
+    """
+    statement = build_export_statement(
+        statuses=status,
+        ai_decision=ai_decision,
+        final_decision=final_decision,
+        created_from=created_from,
+        created_to=created_to
+    )
+    return StreamingResponse(
+        stream_export(statement, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="refill-requests.{format}"'}
+    )
+
+
+@router.get("/refill-events")
+async def stream_refill_events():
+    """
+    Server-sent events for the review queue.
+    
+    Pushes `added`, `ai_completed` (with the full request), `reviewed` and
+    `updated` events as requests change, instead of clients re-polling the
+    queue. A `resync` event means events were missed and the client should
+    refetch the queue; the stream then closes and EventSource reconnects.
+    """
+    async def event_stream():
+        async with refill_events.subscribe() as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.sse_keepalive_interval)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                yield f"id: {event['sequence']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/refill-request/{request_id}", response_model=RefillDetailData)
-def get_refill_detail(request_id: int, session: Session = Depends(get_session)):
+async def get_refill_detail(
+    request_id: int,
+    response: Response,
+    refresh: bool = Query(False, description="Fetch live EMR data instead of the AI review snapshot"),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_session)
+):
     """
     Fetch a single refill request with all supporting data.
     
     This endpoint:
-    1. Fetches the RefillRequest from DB
-    2. Fetches patient and protocol data
-    3. Calls mock EMR service to get clinical data
-    4. Returns comprehensive detail data
+    1. Fetches the RefillRequest with its patient and protocol from DB
+    2. Returns the EMR data and rule results the AI review decided on
+       (stored snapshot), or
+    3. With refresh=true, or if the request has no snapshot yet, calls the
+       EMR service and evaluates the protocol against live data
+    
+    Snapshot responses carry an ETag built from version columns; a matching
+    If-None-Match is answered with 304 after reading only those columns.
+    
+    Requests no longer in refill_requests are served from the archive.
     """
-    # Get the request
-    request = session.get(RefillRequest, request_id)
+    if if_none_match and not refresh:
+        for model in (RefillRequest, ArchivedRefillRequest):
+            versions = (await session.exec(
+                select(
+                    model.updated_at, model.ai_snapshot_at, model.claimed_by, model.claim_expires_at,
+                    MedicationProtocol.version
+                )
+                .join(MedicationProtocol, MedicationProtocol.id == model.protocol_id)
+                .where(model.id == request_id)
+            )).first()
+            if versions:
+                break
+        if versions and versions.ai_snapshot_at is not None:
+            etag = detail_etag(
+                request_id, versions.updated_at, versions.version, versions.ai_snapshot_at,
+                versions.claimed_by, versions.claim_expires_at
+            )
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    
+    # Get the request with its relationships
+    request = (
+        await load_refill_request(session, request_id)
+        or await load_archived_refill_request(session, request_id)
+    )
     if not request:
         raise HTTPException(status_code=404, detail="Refill request not found")
     
-    # Load relationships
-    patient = session.get(Patient, request.patient_id)
-    protocol = session.get(MedicationProtocol, request.protocol_id)
+    patient = request.patient
+    protocol = request.protocol
     
     if not patient or not protocol:
         raise HTTPException(status_code=404, detail="Related data not found")
     
-    # Get EMR data
-    patient_data = get_patient_data(patient.mrn)
-    clinical_data = get_patient_clinical_data(patient.mrn)
-    
-    # Build protocols_checked list
-    protocols_checked = []
-    
-    # Check last visit
-    if protocol.max_months_since_visit is not None:
-        last_visit_str = clinical_data.get("last_visit_date")
-        if last_visit_str:
-            from datetime import date
-            last_visit = datetime.strptime(last_visit_str, "%Y-%m-%d").date()
-            today = date.today()
-            months_since_visit = (today - last_visit).days / 30.4
-            
-            status = "✅ PASS" if months_since_visit <= protocol.max_months_since_visit else "❌ FAILED"
-            protocols_checked.append({
-                "protocol": f"Last Visit < {protocol.max_months_since_visit}mo",
-                "emr_data": f"{months_since_visit:.1f} months",
-                "status": status
-            })
-    
-    # Check A1c value
-    if protocol.max_a1c_value is not None:
-        labs = clinical_data.get("labs", {})
-        a1c = labs.get("A1c", {})
-        a1c_value = a1c.get("value")
-        
-        if a1c_value is not None:
-            status = "✅ PASS" if a1c_value <= protocol.max_a1c_value else "❌ FAILED"
-            protocols_checked.append({
-                "protocol": f"A1c < {protocol.max_a1c_value}",
-                "emr_data": str(a1c_value),
-                "status": status
-            })
-        else:
-            protocols_checked.append({
-                "protocol": f"A1c < {protocol.max_a1c_value}",
-                "emr_data": "No A1c data",
-                "status": "❌ FAILED"
-            })
-    
-    # Check recent A1c requirement
-    if protocol.require_recent_a1c is not None:
-        labs = clinical_data.get("labs", {})
-        a1c = labs.get("A1c", {})
-        a1c_date_str = a1c.get("date")
-        
-        if a1c_date_str:
-            from datetime import date
-            a1c_date = datetime.strptime(a1c_date_str, "%Y-%m-%d").date()
-            today = date.today()
-            months_since_a1c = (today - a1c_date).days / 30.4
-            
-            status = "✅ PASS" if months_since_a1c <= protocol.require_recent_a1c else "❌ FAILED"
-            protocols_checked.append({
-                "protocol": f"A1c within {protocol.require_recent_a1c}mo",
-                "emr_data": f"{months_since_a1c:.1f} months ago",
-                "status": status
-            })
-        else:
-            protocols_checked.append({
-                "protocol": f"A1c within {protocol.require_recent_a1c}mo",
-                "emr_data": "No A1c date",
-                "status": "❌ FAILED"
-            })
+    snapshot = request.ai_snapshot
+    if snapshot and not refresh:
+        patient_data = snapshot["patient_data"]
+        clinical_data = snapshot["clinical_data"]
+        checked = snapshot["protocols_checked"]
+        source = "snapshot"
+        response.headers["ETag"] = detail_etag(
+            request.id, request.updated_at, protocol.version, request.ai_snapshot_at,
+            request.claimed_by, request.claim_expires_at
+        )
+    else:
+        # Get live EMR data and re-run the rules
+        patient_data, clinical_data = await asyncio.gather(
+            aget_patient_data(patient.mrn),
+            aget_patient_clinical_data(patient.mrn),
+        )
+        with observe_stage("rules"):
+            evaluation = evaluate_protocol(protocol, clinical_data)
+        checked = protocols_checked(evaluation)
+        source = "live"
+    response.headers["Cache-Control"] = CACHE_CONTROL
     
     # Create request read schema
     request_read = RefillRequestRead(
@@ -134,12 +391,17 @@ def get_refill_detail(request_id: int, session: Session = Depends(get_session)):
         patient_id=request.patient_id,
         protocol_id=request.protocol_id,
         status=request.status.value,
+        is_urgent=request.is_urgent,
         ai_decision=request.ai_decision,
         ai_reason=request.ai_reason,
         ai_confidence=request.ai_confidence,
+        ai_decided_by=request.ai_decided_by,
+        ai_cache_hit=request.ai_cache_hit,
         final_decision=request.final_decision,
         reviewed_by=request.reviewed_by,
         reviewed_at=request.reviewed_at,
+        claimed_by=request.claimed_by,
+        claim_expires_at=request.claim_expires_at,
         created_at=request.created_at,
         updated_at=request.updated_at,
         patient=patient,
@@ -150,15 +412,17 @@ def get_refill_detail(request_id: int, session: Session = Depends(get_session)):
         request=request_read,
         patient_data=patient_data,
         clinical_data=clinical_data,
-        protocols_checked=protocols_checked
+        protocols_checked=checked,
+        source=source,
+        snapshot_captured_at=request.ai_snapshot_at if source == "snapshot" else None
     )
 
 
 @router.post("/refill-request/{request_id}/review", response_model=RefillRequestRead)
-def review_refill_request(
+async def review_refill_request(
     request_id: int,
     payload: ReviewPayload,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Submit a human review decision for a refill request.
@@ -168,12 +432,10 @@ def review_refill_request(
     - reviewed_by: User ID
     - reviewed_at: Current timestamp
     - status: Updated based on decision
-    """
-    # Get the request
-    request = session.get(RefillRequest, request_id)
-    if not request:
-        raise HTTPException(status_code=404, detail="Refill request not found")
     
+    The reviewer must hold the request's claim (see the claim endpoints);
+    otherwise, or if it was already reviewed, the response is 409.
+    """
     # Validate decision
     if payload.decision not in ["Approve", "Deny"]:
         raise HTTPException(
@@ -181,6 +443,19 @@ def review_refill_request(
             detail="decision must be either 'Approve' or 'Deny'"
         )
     
+    # Get the request, locked until the review is committed
+    request = await load_refill_request(session, request_id, for_update=True)
+    if not request:
+        raise await archived_status_conflict(session, request_id) or HTTPException(
+            status_code=404, detail="Refill request not found"
+        )
+    
+    try:
+        check_can_review(request, payload.user_id)
+    except ClaimConflict as e:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    
     # Update the request
     request.final_decision = payload.decision
     request.reviewed_by = payload.user_id
@@ -193,14 +468,137 @@ def review_refill_request(
         request.status = RefillStatus.DENIED
     
     request.updated_at = datetime.utcnow()
+    request.claimed_by = None
+    request.claim_expires_at = None
     
     session.add(request)
-    session.commit()
-    session.refresh(request)
-    
-    # Load relationships for response
-    request.patient = session.get(Patient, request.patient_id)
-    request.protocol = session.get(MedicationProtocol, request.protocol_id)
+    await session.commit()
+    refill_events.mark_changed()
     
     return request
 
+
+@router.post("/refill-requests:claim", response_model=List[RefillRequestRead])
+async def claim_next_refill_requests(
+    payload: ClaimNextPayload,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Claim the next refill requests of the review queue for a reviewer.
+    
+    Returns up to `limit` requests in queue order, each leased to user_id
+    for settings.claim_lease_seconds. Rows being claimed by concurrent
+    callers are skipped (FOR UPDATE SKIP LOCKED), so reviewers working the
+    queue at the same time never get the same request. Requests the
+    reviewer already holds are returned again with a renewed lease. An
+    empty list means no request is available.
+    """
+    request_ids = await claim_next(session, payload.user_id, payload.limit)
+    if not request_ids:
+        return []
+    refill_events.mark_changed()
+    
+    statement = (
+        select(RefillRequest)
+        .where(RefillRequest.id.in_(request_ids))
+        .options(selectinload(RefillRequest.patient), selectinload(RefillRequest.protocol))
+        .execution_options(populate_existing=True)
+    )
+    requests = {request.id: request for request in (await session.exec(statement)).all()}
+    return [requests[request_id] for request_id in request_ids if request_id in requests]
+
+
+@router.post("/refill-request/{request_id}/claim", response_model=RefillRequestRead)
+async def claim_refill_request(
+    request_id: int,
+    payload: ClaimPayload,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Claim a pending refill request for a reviewer, or renew their claim.
+    
+    Clients holding a claim call this again before claim_expires_at to keep
+    it. Returns 409 if another reviewer holds an unexpired claim or the
+    request was already reviewed.
+    """
+    try:
+        request = await claim_request(session, request_id, payload.user_id)
+    except ClaimConflict as e:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    if not request:
+        raise await archived_status_conflict(session, request_id) or HTTPException(
+            status_code=404, detail="Refill request not found"
+        )
+    refill_events.mark_changed()
+    
+    return await load_refill_request(session, request_id)
+
+
+@router.delete("/refill-request/{request_id}/claim", status_code=204)
+async def release_refill_request_claim(
+    request_id: int,
+    user_id: str = Query(..., description="Clinical staff member ID"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Release a reviewer's claim so others can review the request.
+    
+    Releasing a claim the reviewer does not hold (or that expired) is a
+    no-op; 409 if another reviewer holds it.
+    """
+    try:
+        released = await release_claim(session, request_id, user_id)
+    except ClaimConflict as e:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    if released is None and not await archived_status_conflict(session, request_id):
+        # Archived requests hold no claim: nothing to release
+        raise HTTPException(status_code=404, detail="Refill request not found")
+    if released:
+        refill_events.mark_changed()
+    
+    return Response(status_code=204)
+
+
+@router.post("/refill-requests/review:bulk", response_model=BulkReviewResult)
+async def bulk_review_refill_requests(
+    payload: BulkReviewPayload,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Submit human review decisions for many refill requests at once.
+    
+    Decisions are applied in one transaction with one UPDATE per decision.
+    Requests that do not exist, were already reviewed or are not claimed by
+    user_id are reported per item and left untouched. With
+    all_or_nothing=true, any such request makes the whole batch fail with
+    409 and nothing is applied.
+    """
+    outcomes = await apply_bulk_review(
+        session,
+        {item.id: item.decision for item in payload.items},
+        payload.user_id,
+        all_or_nothing=payload.all_or_nothing
+    )
+    
+    counts = {"reviewed": 0, "not_found": 0, "already_reviewed": 0, "not_claimed": 0, "skipped": 0}
+    for outcome in outcomes:
+        counts[outcome.outcome] += 1
+    result = BulkReviewResult(
+        reviewed=counts["reviewed"],
+        not_found=counts["not_found"],
+        already_reviewed=counts["already_reviewed"],
+        not_claimed=counts["not_claimed"],
+        results=[
+            BulkReviewItemResult(id=o.id, outcome=o.outcome, status=o.status)
+            for o in outcomes
+        ]
+    )
+    
+    if counts["skipped"]:
+        raise HTTPException(status_code=409, detail=result.model_dump())
+    if counts["reviewed"]:
+        refill_events.mark_changed()
+    
+    return result
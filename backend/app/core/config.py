@@ -0,0 +1,122 @@
+"""
+Application settings loaded from environment variables.
+"""
+from typing import Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """
+    Runtime configuration for MedRefills AI.
+
+    Every field can be overridden with an environment variable of the same
+    name (case-insensitive), e.g. AI_REVIEW_MODE=agent.
+    """
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Database connection pools (per process; sync and async engines each get one)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # seconds before a connection is replaced
+    db_pool_pre_ping: bool = True
+
+    # Rows fetched per server-side cursor batch when streaming exports
+    export_batch_size: int = 1000
+
+    # Bulk ingestion of refill requests from pharmacy feeds
+    ingest_batch_size: int = 1000  # rows per INSERT/commit/enqueue chunk
+    ingest_max_body_bytes: int = 50 * 1024 * 1024  # upload limit of the ingest endpoint
+
+    # Live refill events (SSE)
+    refill_events_queue_size: int = 1000  # undelivered events per subscriber before it must resync
+    sse_keepalive_interval: float = 15.0  # seconds between keep-alive comments
+
+    # Queue statistics (GET /api/v1/refill-stats)
+    refill_stats_reconcile_interval: float = 300.0  # seconds between recounts that correct drift
+    refill_stats_review_window_hours: float = 24.0  # median time-to-review covers reviews this recent
+    refill_stats_max_review_samples: int = 100_000  # review durations kept for the median
+
+    # Review claims (leases on pending refill requests)
+    claim_lease_seconds: float = 300.0  # a claim expires unless renewed within this time
+
+    # Archive of reviewed refill requests (refill_requests_archive)
+    archive_after_hours: float = 24.0  # reviewed requests older than this leave refill_requests
+    archive_batch_size: int = 5000  # requests moved per transaction
+    archive_max_batches: int = 100  # batches per archiver run, so each run stays short
+    archive_interval: float = 600.0  # seconds between archiver runs (Celery beat)
+
+    # Prometheus metrics
+    metrics_queue_depth_ttl: float = 15.0  # seconds a queue depth count is reused across scrapes
+    worker_metrics_port: Optional[int] = None  # Celery workers serve /metrics on this port when set
+
+    # AI review
+    ai_review_mode: str = "rules_first"  # 'rules_first' or 'agent'
+    # Margins around protocol thresholds inside which the rules engine
+    # considers a result borderline and escalates to the agent
+    rules_months_margin: float = 0.5
+    rules_a1c_margin: float = 0.2
+    # How the agent decides: 'react' (tool-calling loop, 2+ LLM calls) or
+    # 'structured' (one call with the precomputed protocol results)
+    ai_agent_mode: str = "react"
+    # Reuse agent decisions for identical inputs (see app/services/decision_cache.py)
+    ai_decision_cache_enabled: bool = True
+    ai_decision_cache_maxsize: int = 10000  # entries per process
+    ai_decision_cache_ttl: float = 21600  # seconds
+    ai_decision_cache_redis_url: Optional[str] = None  # share decisions across workers when set
+
+    # LLM / agent pool
+    llm_provider: str = "gemini"  # 'gemini' or 'fake' (offline runs and benchmarks)
+    fake_llm_latency: float = 0.0  # seconds per call of the fake LLM
+    gemini_model: str = "gemini-pro"
+    gemini_transport: str = "grpc"  # 'grpc' or 'rest'; the channel is kept open and shared
+    agent_pool_size: int = 4  # pre-built executors per process
+    agent_pool_timeout: float = 60.0  # seconds to wait for a free executor
+
+    # LLM scheduler (see app/services/llm_scheduler.py)
+    llm_requests_per_minute: Optional[float] = 60  # provider quota; None disables the rate limit
+    llm_burst: int = 10  # calls that may start back to back after an idle period
+    llm_max_concurrency: int = 8  # in-flight LLM calls (per process, or overall with Redis)
+    llm_max_queue: int = 100  # callers waiting for a slot per process before rejecting new ones
+    llm_queue_timeout: float = 30.0  # seconds a call waits for a slot before backpressure
+    llm_urgent_reserve: int = 2  # tokens only urgent calls may take (Redis scheduler)
+    llm_lease_ttl: float = 120.0  # seconds before a slot held by a crashed process is reclaimed
+    llm_scheduler_redis_url: Optional[str] = None  # share the limits across processes when set
+
+    # Background workers (Celery)
+    redis_url: str = "redis://localhost:6379/0"
+    celery_broker_url: Optional[str] = None  # defaults to redis_url; 'memory://' for tests
+    celery_task_always_eager: bool = False  # run tasks in-process (tests, local dev)
+    celery_worker_concurrency: int = 4
+    celery_visibility_timeout: int = 3600  # seconds before an unacked task is redelivered
+    ai_review_max_retries: int = 3
+    ai_review_retry_backoff: int = 10  # seconds, doubled on each retry
+    ai_review_backpressure_max_retries: int = 20  # retries while the LLM scheduler pushes back
+    # Sweep re-enqueueing requests left in pending_ai_review (lost tasks,
+    # exhausted retries, broker outages); Celery beat, or the API in eager mode
+    ai_review_requeue_after: float = 1800.0  # seconds without progress before a request is re-enqueued
+    ai_review_requeue_interval: float = 300.0  # seconds between sweeps
+    ai_review_requeue_batch_size: int = 1000  # requests re-enqueued per sweep
+
+    # Protocol registry
+    # Minimum seconds between reloads triggered by lookups of unknown protocols
+    protocol_registry_miss_reload_interval: float = 30.0
+
+    # EMR client
+    emr_base_url: Optional[str] = None  # unset: use the in-process fake EMR
+    emr_timeout: float = 10.0  # seconds
+    emr_max_connections: int = 100
+    emr_max_keepalive_connections: int = 20
+    emr_per_host_concurrency: int = 20  # in-flight requests per EMR host
+    emr_fake_latency: float = 0.0  # seconds added to each fake EMR response
+    emr_fixtures_path: Optional[str] = None  # synthetic EMR data served by the fake EMR
+
+    # EMR cache
+    emr_cache_enabled: bool = True
+    emr_cache_maxsize: int = 10000  # entries per process
+    emr_patient_ttl: float = 3600  # seconds
+    emr_clinical_ttl: float = 300  # seconds
+    emr_cache_redis_url: Optional[str] = None  # share entries across workers when set
+
+
+settings = Settings()
@@ -0,0 +1,301 @@
+"""
+Prometheus metrics.
+
+Latency histograms and error counters per request route and per stage
+(database statements, EMR calls, rule evaluation, protocol tool, LLM calls,
+whole AI reviews), LLM calls per review, and scrape-time gauges for queue
+depth by status, DB pool usage and EMR cache counters.
+
+Label children are resolved once and kept in plain dicts, so recording a
+value only takes the lock of that one series, never a registry-wide lock.
+Queue depth and pool usage are read when /metrics is scraped, not on the
+request path.
+
+With several processes (uvicorn workers, Celery prefork children) set
+PROMETHEUS_MULTIPROC_DIR to a shared empty directory so each process's
+samples are aggregated on scrape.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event, func, select
+
+from app.core.config import settings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "medrefills_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "medrefills_stage_duration_seconds",
+    "Latency of one stage: db, emr.patient, emr.clinical, rules, protocol_tool, llm, ai_review",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "medrefills_stage_errors_total",
+    "Stage executions that raised",
+    ["stage"],
+)
+AI_REVIEWS = Counter(
+    "medrefills_ai_reviews_total",
+    "Completed AI reviews",
+    ["decided_by", "cache_hit"],
+)
+LLM_CALLS_PER_REVIEW = Histogram(
+    "medrefills_llm_calls_per_review",
+    "LLM calls made by one AI review",
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20),
+)
+
+_stage_children: Dict[str, tuple] = {}
+_http_children: Dict[tuple, object] = {}
+# LLM calls made by the AI review running in this context
+_review_llm_calls: ContextVar[Optional[List[int]]] = ContextVar("review_llm_calls", default=None)
+
+
+def _stage(stage: str) -> tuple:
+    children = _stage_children.get(stage)
+    if children is None:
+        children = _stage_children[stage] = (STAGE_SECONDS.labels(stage), STAGE_ERRORS.labels(stage))
+    return children
+
+
+def observe_stage_seconds(stage: str, seconds: float, error: bool = False) -> None:
+    """Record one execution of a stage."""
+    histogram, errors = _stage(stage)
+    histogram.observe(seconds)
+    if error:
+        errors.inc()
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """Time the enclosed block as one execution of a stage; exceptions count as errors."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        observe_stage_seconds(stage, time.perf_counter() - started, error=True)
+        raise
+    observe_stage_seconds(stage, time.perf_counter() - started)
+
+
+class ReviewTracker:
+    """Collects the LLM calls and outcome of one AI review."""
+
+    def __init__(self):
+        self.llm_calls = [0]
+        self.result: Optional[Dict] = None
+
+    def record(self, result: Dict) -> None:
+        self.result = result
+
+
+@contextmanager
+def track_ai_review() -> Iterator[ReviewTracker]:
+    """Time an AI review and count the LLM calls made inside it."""
+    tracker = ReviewTracker()
+    token = _review_llm_calls.set(tracker.llm_calls)
+    try:
+        with observe_stage("ai_review"):
+            yield tracker
+    finally:
+        _review_llm_calls.reset(token)
+        LLM_CALLS_PER_REVIEW.observe(tracker.llm_calls[0])
+    if tracker.result is not None:
+        AI_REVIEWS.labels(
+            tracker.result.get("decided_by") or "unknown",
+            str(bool(tracker.result.get("cache_hit"))).lower(),
+        ).inc()
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """LangChain callback recording LLM call latency, errors and calls per review."""
+
+    def __init__(self):
+        self._started: Dict = {}
+
+    def _start(self, run_id) -> None:
+        self._started[run_id] = time.perf_counter()
+        calls = _review_llm_calls.get()
+        if calls is not None:
+            calls[0] += 1
+
+    def _end(self, run_id, error: bool = False) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            observe_stage_seconds("llm", time.perf_counter() - started, error=error)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        self._end(run_id, error=True)
+
+
+llm_metrics_handler = LLMMetricsHandler()
+
+
+def instrument_engine(engine) -> None:
+    """Record the latency and errors of every statement run on a (sync) engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        observe_stage_seconds("db", time.perf_counter() - conn.info["metrics_query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection else None
+        if starts:
+            observe_stage_seconds("db", time.perf_counter() - starts.pop(), error=True)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing HTTP requests by route template (not raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            key = (scope["method"], route.path if route is not None else "unmatched", str(status))
+            child = _http_children.get(key)
+            if child is None:
+                child = _http_children[key] = HTTP_REQUEST_SECONDS.labels(*key)
+            child.observe(time.perf_counter() - started)
+
+
+class RuntimeCollector:
+    """Scrape-time gauges: queue depth by status, DB pool usage, EMR cache counters."""
+
+    def __init__(self, engines: Dict[str, object]):
+        self.engines = engines
+        self._depth_lock = threading.Lock()
+        self._depth: Dict[str, int] = {}
+        self._depth_at = 0.0
+
+    def _queue_depth(self) -> Dict[str, int]:
+        from app.models import RefillRequest
+        from app.services.refill_stats import refill_stats
+
+        # API processes maintain the counts; others count by status, which
+        # scans the table, so the result is reused for a while
+        if refill_stats.ready:
+            return {status.value: count for status, count in refill_stats.counts().items()}
+        with self._depth_lock:
+            if time.monotonic() - self._depth_at >= settings.metrics_queue_depth_ttl:
+                with self.engines["sync"].connect() as conn:
+                    rows = conn.execute(
+                        select(RefillRequest.status, func.count()).group_by(RefillRequest.status)
+                    ).all()
+                self._depth = {status.value: count for status, count in rows}
+                self._depth_at = time.monotonic()
+            return self._depth
+
+    def collect(self):
+        from app.models import RefillStatus
+
+        depth = GaugeMetricFamily("medrefills_refill_requests", "Refill requests by status", labels=["status"])
+        try:
+            counts = self._queue_depth()
+        except Exception:
+            counts = None
+        if counts is not None:
+            for status in RefillStatus:
+                depth.add_metric([status.value], counts.get(status.value, 0))
+            yield depth
+
+        checked_out = GaugeMetricFamily("medrefills_db_pool_checked_out", "Connections in use", labels=["engine"])
+        idle = GaugeMetricFamily("medrefills_db_pool_checked_in", "Idle connections in the pool", labels=["engine"])
+        size = GaugeMetricFamily("medrefills_db_pool_size", "Configured pool size", labels=["engine"])
+        overflow = GaugeMetricFamily("medrefills_db_pool_overflow", "Connections above pool size", labels=["engine"])
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue
+            checked_out.add_metric([name], pool.checkedout())
+            idle.add_metric([name], pool.checkedin())
+            size.add_metric([name], pool.size())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+        yield from (checked_out, idle, size, overflow)
+
+        from app.services.emr_service import get_emr_cache_stats
+
+        stats = get_emr_cache_stats()
+        for key in ("hits", "misses"):
+            if key in stats:
+                counter = CounterMetricFamily(f"medrefills_emr_cache_{key}", f"EMR cache {key} in this process")
+                counter.add_metric([], stats[key])
+                yield counter
+
+
+_runtime_registry = CollectorRegistry(auto_describe=False)
+
+
+def register_runtime_collector(engines: Dict[str, object]) -> None:
+    """Expose queue depth and pool usage for these engines (name -> sync Engine)."""
+    _runtime_registry.register(RuntimeCollector(engines))
+
+
+def get_registry() -> CollectorRegistry:
+    """Registry of the recorded metrics, aggregated across processes in multiprocess mode."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> bytes:
+    """Metrics in the Prometheus text format."""
+    return generate_latest(get_registry()) + generate_latest(_runtime_registry)
+
+
+def start_metrics_server(port: int) -> None:
+    """Serve the recorded metrics on their own port (Celery workers)."""
+    start_http_server(port, registry=get_registry())
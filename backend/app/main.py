@@ -1,12 +1,34 @@
 """
 FastAPI application entrypoint for MedRefills AI.
 """
-from fastapi import FastAPI
+import asyncio
+import logging
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from prometheus_client import CONTENT_TYPE_LATEST
 
-from app.core.db import create_db_and_tables
-from app.api.v1 import refill_requests
+from app.core.config import settings
+from app.core.db import async_engine, create_db_and_tables, engine
+from app.core.metrics import MetricsMiddleware, register_runtime_collector, render_metrics
+from app.services.emr_service import close_emr_client
+from app.services.refill_events import refill_events
+from app.services.refill_stats import refill_stats
+from app.api.v1 import emr, protocols, refill_requests
+from app.worker.tasks import requeue_stale_ai_reviews
+
+logger = logging.getLogger(__name__)
+
+
+async def requeue_stale_ai_reviews_periodically():
+    """Run the stuck AI review sweep in this process (eager mode has no Celery beat)."""
+    while True:
+        await asyncio.sleep(settings.ai_review_requeue_interval)
+        try:
+            await run_in_threadpool(requeue_stale_ai_reviews)
+        except Exception:
+            logger.exception("Re-enqueueing stale AI reviews failed")
 
 
 @asynccontextmanager
@@ -14,8 +36,21 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown events."""
     # Startup
     create_db_and_tables()
+    await refill_events.start()
+    await refill_stats.start()
+    sweeper = (
+        asyncio.create_task(requeue_stale_ai_reviews_periodically())
+        if settings.celery_task_always_eager else None
+    )
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    if sweeper is not None:
+        sweeper.cancel()
+        await asyncio.gather(sweeper, return_exceptions=True)
+    await refill_stats.stop()
+    await refill_events.stop()
+    await close_emr_client()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -36,10 +71,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Protocol-Registry-Version", "ETag"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# Queue depth and DB pool usage, read on scrape
+register_runtime_collector({"sync": engine, "async": async_engine.sync_engine})
 
 # Include routers
 app.include_router(refill_requests.router)
+app.include_router(protocols.router)
+app.include_router(emr.router)
 
 
 @app.get("/")
@@ -53,3 +95,9 @@ def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics."""
+    return Response(render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
@@ -3,7 +3,9 @@ Database models for MedRefills AI using SQLModel.
 """
 from datetime import date, datetime
 from typing import Optional
-from sqlmodel import SQLModel, Field, Relationship, Column, JSON
+from sqlalchemy import Index, false, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import SQLModel, Field, Relationship, JSON
 from enum import Enum
 
 
@@ -15,6 +17,12 @@ class RefillStatus(str, Enum):
     DENIED = "denied"
 
 
+# Statuses after a human decision
+REVIEWED_STATUSES = frozenset({RefillStatus.APPROVED, RefillStatus.DENIED})
+# Statuses still waiting on a review
+PENDING_STATUSES = frozenset({RefillStatus.PENDING_AI_REVIEW, RefillStatus.PENDING_HUMAN_REVIEW})
+
+
 class Patient(SQLModel, table=True):
     """Patient model representing a patient in the EMR system."""
     __tablename__ = "patients"
@@ -48,36 +56,116 @@ class MedicationProtocol(SQLModel, table=True):
         default=None,
         description="A1c must be within this many months"
     )
+    version: int = Field(default=1, description="Incremented on every rule change")
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     # Relationship
     refill_requests: list["RefillRequest"] = Relationship(back_populates="protocol")
 
 
-class RefillRequest(SQLModel, table=True):
-    """Refill request record."""
-    __tablename__ = "refill_requests"
+# Status values as stored in the database (SQLAlchemy persists enum names)
+PENDING_STATUSES_SQL = "status IN ('PENDING_AI_REVIEW', 'PENDING_HUMAN_REVIEW')"
+QUEUE_STATUS_SQL = "status = 'PENDING_HUMAN_REVIEW'"
+# Rendered like queue_rank in app/services/refill_queue.py, so the planner
+# matches the expression index
+QUEUE_RANK_SQL = (
+    "(CASE WHEN (is_urgent = true AND ai_decision = 'Deny') THEN 0"
+    " WHEN (is_urgent = true) THEN 1"
+    " WHEN (ai_decision = 'Deny') THEN 2 ELSE 3 END)"
+)
 
-    id: Optional[int] = Field(default=None, primary_key=True)
-    patient_id: int = Field(foreign_key="patients.id")
-    protocol_id: int = Field(foreign_key="medication_protocols.id")
+
+class RefillRequestBase(SQLModel):
+    """Columns shared by refill requests and their archived copies."""
+    patient_id: int = Field(foreign_key="patients.id", index=True)
+    protocol_id: int = Field(foreign_key="medication_protocols.id", index=True)
     
     status: RefillStatus = Field(default=RefillStatus.PENDING_AI_REVIEW)
+    is_urgent: bool = Field(
+        default=False,
+        description="AI review is scheduled ahead of normal requests",
+        sa_column_kwargs={"server_default": false()}
+    )
     
     # AI decision data
     ai_decision: Optional[str] = Field(default=None, description="'Approve' or 'Deny'")
     ai_reason: Optional[str] = Field(default=None, description="Reasoning from AI")
     ai_confidence: Optional[float] = Field(default=None, description="Confidence score 0-100")
+    ai_decided_by: Optional[str] = Field(
+        default=None,
+        description="Which review path decided: 'rules' or 'agent'"
+    )
+    ai_cache_hit: bool = Field(
+        default=False,
+        description="Agent decision reused from the decision cache",
+        sa_column_kwargs={"server_default": false()}
+    )
+    # EMR data, protocol and rule results the AI decision was based on
+    ai_snapshot: Optional[dict] = Field(
+        default=None,
+        sa_type=JSON().with_variant(JSONB(), "postgresql")
+    )
+    ai_snapshot_at: Optional[datetime] = Field(default=None)
     
     # Human review data
     final_decision: Optional[str] = Field(default=None, description="Final decision after human review")
     reviewed_by: Optional[str] = Field(default=None, description="User ID of reviewer")
-    reviewed_at: Optional[datetime] = Field(default=None)
+    reviewed_at: Optional[datetime] = Field(default=None, index=True)
+    # Review lease: only this reviewer may review until it expires (app/services/refill_claims.py)
+    claimed_by: Optional[str] = Field(default=None, description="User ID of the reviewer holding the claim")
+    claim_expires_at: Optional[datetime] = Field(default=None)
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+
+class RefillRequest(RefillRequestBase, table=True):
+    """
+    Refill request record.
+
+    The working table: pending requests and recently reviewed ones.
+    Reviewed requests are moved to refill_requests_archive after
+    settings.archive_after_hours (see app/services/refill_archive.py).
+    """
+    __tablename__ = "refill_requests"
+    __table_args__ = (
+        # Pending work by status/decision (AI worker backlog, queue counts)
+        Index(
+            "ix_refill_requests_pending_status_decision_created",
+            "status", "ai_decision", "created_at",
+            postgresql_where=text(PENDING_STATUSES_SQL),
+            sqlite_where=text(PENDING_STATUSES_SQL),
+        ),
+        # Human review queue order: urgent first, then "Deny" first, then
+        # oldest first. Must match queue_rank in app/services/refill_queue.py
+        Index(
+            "ix_refill_requests_queue_order",
+            text(QUEUE_RANK_SQL), "created_at", "id",
+            postgresql_where=text(QUEUE_STATUS_SQL),
+            sqlite_where=text(QUEUE_STATUS_SQL),
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
     # Relationships
     patient: Patient = Relationship(back_populates="refill_requests")
     protocol: MedicationProtocol = Relationship(back_populates="refill_requests")
 
+
+class ArchivedRefillRequest(RefillRequestBase, table=True):
+    """
+    Reviewed refill request moved out of refill_requests.
+
+    Rows keep their original id. On PostgreSQL the table is partitioned by
+    month of reviewed_at, which is why it is part of the primary key.
+    """
+    __tablename__ = "refill_requests_archive"
+
+    id: int = Field(primary_key=True)
+    reviewed_at: datetime = Field(primary_key=True, index=True)
+
+    # Relationships
+    patient: Patient = Relationship()
+    protocol: MedicationProtocol = Relationship()
@@ -3,7 +3,7 @@ Pydantic schemas for API data transfer.
 """
 from datetime import date, datetime
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class PatientRead(BaseModel):
@@ -25,23 +25,61 @@ class MedicationProtocolRead(BaseModel):
     max_months_since_visit: Optional[int] = None
     max_a1c_value: Optional[float] = None
     require_recent_a1c: Optional[int] = None
+    version: int = 1
 
     class Config:
         from_attributes = True
 
 
+class MedicationProtocolUpdate(BaseModel):
+    """Payload for changing a medication protocol's rules."""
+    max_months_since_visit: Optional[int] = None
+    max_a1c_value: Optional[float] = None
+    require_recent_a1c: Optional[int] = None
+
+
+class PopulationScreenRequest(BaseModel):
+    """Columnar clinical data for screening many patients against a protocol."""
+    as_of: Optional[date] = Field(default=None, description="Evaluation date (defaults to today)")
+    mrns: list[str]
+    last_visit_dates: list[Optional[date]]
+    a1c_values: list[Optional[float]]
+    a1c_dates: list[Optional[date]]
+    include_failures: bool = Field(default=True, description="List failing patients with reasons")
+
+
+class PopulationScreenFailure(BaseModel):
+    """A patient that fails the protocol and why."""
+    mrn: str
+    reasons: list[str]
+
+
+class PopulationScreenResult(BaseModel):
+    """Outcome of a population screening."""
+    protocol_id: int
+    protocol_version: int
+    as_of: date
+    summary: dict[str, int]
+    failures: list[PopulationScreenFailure] = []
+
+
 class RefillRequestRead(BaseModel):
     """Refill request read schema."""
     id: int
     patient_id: int
     protocol_id: int
     status: str
+    is_urgent: bool = False
     ai_decision: Optional[str] = None
     ai_reason: Optional[str] = None
     ai_confidence: Optional[float] = None
+    ai_decided_by: Optional[str] = None
+    ai_cache_hit: bool = False
     final_decision: Optional[str] = None
     reviewed_by: Optional[str] = None
     reviewed_at: Optional[datetime] = None
+    claimed_by: Optional[str] = None
+    claim_expires_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
@@ -57,6 +95,12 @@ class RefillRequestCreate(BaseModel):
     """Schema for creating a refill request."""
     patient_id: int
     protocol_id: int
+    is_urgent: bool = False
+
+
+class RefillRequestBatchCreate(BaseModel):
+    """Payload for submitting many refill requests for AI review."""
+    requests: list[RefillRequestCreate] = Field(..., min_length=1, max_length=1000)
 
 
 class ReviewPayload(BaseModel):
@@ -65,6 +109,98 @@ class ReviewPayload(BaseModel):
     user_id: str = Field(..., description="Clinical staff member ID")
 
 
+class ClaimPayload(BaseModel):
+    """Payload for claiming, renewing or releasing one refill request."""
+    user_id: str = Field(..., description="Clinical staff member ID")
+
+
+class ClaimNextPayload(BaseModel):
+    """Payload for claiming the next refill requests of the review queue."""
+    user_id: str = Field(..., description="Clinical staff member ID")
+    limit: int = Field(1, ge=1, le=50, description="Maximum number of requests to claim")
+
+
+class RefillIngestError(BaseModel):
+    """A feed row that was not ingested."""
+    line: int
+    mrn: Optional[str] = None
+    medication_class: Optional[str] = None
+    error: str
+
+
+class RefillIngestResult(BaseModel):
+    """Result of ingesting a pharmacy feed."""
+    created: int
+    failed: int
+    request_ids: list[int]
+    errors: list[RefillIngestError]
+
+
+class BulkReviewItem(BaseModel):
+    """One decision in a bulk review."""
+    id: int
+    decision: str = Field(..., pattern="^(Approve|Deny)$", description="'Approve' or 'Deny'")
+
+
+class BulkReviewPayload(BaseModel):
+    """Payload for reviewing many refill requests at once."""
+    items: list[BulkReviewItem] = Field(..., min_length=1, max_length=1000)
+    user_id: str = Field(..., description="Clinical staff member ID")
+    all_or_nothing: bool = Field(
+        False,
+        description="Apply no decision unless every request can be reviewed"
+    )
+
+    @field_validator("items")
+    @classmethod
+    def unique_ids(cls, items: list[BulkReviewItem]) -> list[BulkReviewItem]:
+        if len({item.id for item in items}) != len(items):
+            raise ValueError("each request id may appear only once")
+        return items
+
+
+class BulkReviewItemResult(BaseModel):
+    """Outcome for one request of a bulk review."""
+    id: int
+    outcome: str = Field(
+        ...,
+        description=(
+            "'reviewed', 'not_found', 'already_reviewed', 'not_claimed' (the reviewer holds no claim), "
+            "or 'skipped' (all_or_nothing rollback)"
+        )
+    )
+    status: Optional[str] = None
+
+
+class BulkReviewResult(BaseModel):
+    """Result of a bulk review, in request order."""
+    reviewed: int
+    not_found: int
+    already_reviewed: int
+    not_claimed: int
+    results: list[BulkReviewItemResult]
+
+
+class RefillStatsRead(BaseModel):
+    """Refill queue statistics for the operations dashboard."""
+    counts: dict[str, int] = Field(..., description="Requests by status")
+    total: int
+    agreement_rate: Optional[float] = Field(
+        None, description="Share of reviewed requests whose final decision matches the AI decision"
+    )
+    compared_reviews: int = Field(..., description="Reviewed requests with both an AI and a final decision")
+    median_time_to_review_seconds: Optional[float] = Field(
+        None, description="Creation to human review, over reviews in the window"
+    )
+    reviews_in_window: int
+    review_window_hours: float
+    backlog_age_seconds: dict[str, Optional[float]] = Field(
+        ..., description="Age of the oldest request in each pending status"
+    )
+    as_of: datetime
+    reconciled_at: datetime = Field(..., description="Last recount from the database")
+
+
 class RefillDetailData(BaseModel):
     """Comprehensive data for a refill request detail page."""
     request: RefillRequestRead
@@ -74,4 +210,6 @@ class RefillDetailData(BaseModel):
         ...,
         description="List of protocol checks with status and EMR data"
     )
+    source: str = Field("live", description="'snapshot' (data the AI review saw) or 'live' (fetched now)")
+    snapshot_captured_at: Optional[datetime] = Field(None, description="When the snapshot was captured")
 
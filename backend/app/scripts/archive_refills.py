@@ -0,0 +1,43 @@
+"""
+Move reviewed refill requests to the archive.
+
+The Celery beat schedule does this every ARCHIVE_INTERVAL seconds, a
+bounded number of batches at a time. Use this script for a one-off run,
+e.g. to drain a large backlog of reviewed requests after upgrading.
+
+Usage:
+    python -m app.scripts.archive_refills
+    python -m app.scripts.archive_refills --older-than-hours 720 --all
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.core.config import settings
+from app.services.refill_archive import archive_reviewed_requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-hours", type=float, default=settings.archive_after_hours,
+                        help="Archive requests reviewed longer ago than this")
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    parser.add_argument("--all", action="store_true", help="Keep going until nothing is left to archive")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    moved = archive_reviewed_requests(
+        older_than_hours=args.older_than_hours,
+        batch_size=args.batch_size,
+        max_batches=0 if args.all else None,
+    )
+    print(json.dumps({"archived": moved, "seconds": round(time.perf_counter() - started, 1)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
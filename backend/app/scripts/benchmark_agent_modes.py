@@ -0,0 +1,82 @@
+"""
+Compare the ReAct and structured agent modes with a fake LLM.
+
+Runs the same agent reviews in both modes against CountingFakeChatModel
+(no network or API key needed) and reports LLM calls, approximate tokens
+and latency per review, and how often each mode agreed with the rules
+engine. The decision cache is disabled so every review reaches the model.
+
+Usage:
+    python -m app.scripts.benchmark_agent_modes --reviews 200 --latency 0.3
+    python -m app.scripts.benchmark_agent_modes --output agent_modes.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.agents.fake_llm import CountingFakeChatModel
+from app.agents.medrefill_agents import configure_llm, run_ai_review
+from app.core.config import settings
+
+AGENT_MODES = ("react", "structured")
+
+
+def benchmark_mode(agent_mode: str, cases, latency: float) -> dict:
+    """Run every case through the agent in one mode and summarize."""
+    llm = CountingFakeChatModel(latency=latency)
+    configure_llm(llm)
+
+    durations, agreed = [], 0
+    for mrn, medication_class in cases:
+        started = time.perf_counter()
+        result = run_ai_review(mrn, medication_class, mode="agent", agent_mode=agent_mode)
+        durations.append(time.perf_counter() - started)
+        if result["snapshot"] and result["decision"] == result["snapshot"]["decision"]:
+            agreed += 1
+
+    usage = llm.usage()
+    reviews = len(cases)
+    return {
+        "reviews": reviews,
+        "llm_calls": usage["calls"],
+        "llm_calls_per_review": round(usage["calls"] / reviews, 2),
+        "prompt_tokens_per_review": round(usage["prompt_tokens"] / reviews, 1),
+        "completion_tokens_per_review": round(usage["completion_tokens"] / reviews, 1),
+        "latency_p50_ms": round(statistics.median(durations) * 1000, 1),
+        "latency_mean_ms": round(statistics.fmean(durations) * 1000, 1),
+        "agreement_with_rules": round(agreed / reviews, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=50, help="Reviews per mode")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake LLM latency per call (seconds)")
+    parser.add_argument("--medication-class", default="SGLT2 Inhibitor", help="Protocol to review against")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    settings.ai_decision_cache_enabled = False
+    # The fake EMR returns a failing ("12345"), a passing ("67890") and a default profile
+    mrns = ["12345", "67890", "00000"]
+    cases = [(mrns[i % len(mrns)], args.medication_class) for i in range(args.reviews)]
+
+    results = {
+        "latency_s": args.latency,
+        "modes": {mode: benchmark_mode(mode, cases, args.latency) for mode in AGENT_MODES},
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"Wrote results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
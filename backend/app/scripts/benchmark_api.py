@@ -0,0 +1,336 @@
+"""
+Load and latency benchmark for the refill API and the AI review pipeline.
+
+Seeds a database at a given scale (patients, protocols and refill requests
+in every status), then drives the FastAPI app in-process with concurrent
+clients and reports p50/p95/p99 latency and throughput for:
+- GET  /api/v1/refill-queue (following X-Next-Cursor pages)
+- GET  /api/v1/refill-request/{id}
+- POST /api/v1/refill-requests:claim, then POST /api/v1/refill-request/{id}/review
+  (each concurrent client is a reviewer working the queue)
+- end-to-end AI reviews (process_ai_review on a thread pool, as the
+  Celery workers run it)
+
+The LLM and the EMR are replaced by fakes with configurable latency, so
+runs are offline and repeatable against SQLite or a local PostgreSQL.
+Results are written as JSON so runs can be compared.
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/bench.db python -m app.scripts.benchmark_api --scale 10k
+    DATABASE_URL=postgresql://... python -m app.scripts.benchmark_api --scale 1m \\
+        --llm-latency 0.5 --emr-latency 0.05 --output results/1m.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import httpx
+import numpy as np
+from sqlalchemy import func, insert
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import create_db_and_tables, engine
+from app.models import MedicationProtocol, Patient, RefillRequest, RefillStatus
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+PROTOCOLS = [
+    {"medication_class": "SGLT2 Inhibitor", "max_months_since_visit": 12, "max_a1c_value": 8.0, "require_recent_a1c": 6},
+    {"medication_class": "GLP-1 Agonist", "max_months_since_visit": 6, "max_a1c_value": 7.5, "require_recent_a1c": 3},
+    {"medication_class": "Statin", "max_months_since_visit": 12, "max_a1c_value": None, "require_recent_a1c": None},
+    {"medication_class": "ACE Inhibitor", "max_months_since_visit": 12, "max_a1c_value": None, "require_recent_a1c": None},
+]
+
+# Share of seeded requests per status
+STATUS_MIX = [
+    (RefillStatus.PENDING_HUMAN_REVIEW, 0.5),
+    (RefillStatus.PENDING_AI_REVIEW, 0.1),
+    (RefillStatus.APPROVED, 0.25),
+    (RefillStatus.DENIED, 0.15),
+]
+
+SEED_CHUNK = 10_000
+
+
+def parse_scale(value: str) -> int:
+    """Parse a scale like '10k', '100k', '1m' or a plain number."""
+    return SCALES.get(value.lower()) or int(value)
+
+
+def seed(requests: int, rng: random.Random) -> None:
+    """Seed patients (one per 10 requests), protocols and refill requests in bulk."""
+    create_db_and_tables()
+    with Session(engine) as session:
+        if session.exec(select(func.count()).select_from(RefillRequest)).one() >= requests:
+            print(f"Database already has >= {requests} refill requests; skipping seed")
+            return
+
+    patients = max(1, requests // 10)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        protocol_ids = list(conn.execute(
+            insert(MedicationProtocol).returning(MedicationProtocol.id),
+            [dict(p, version=1, created_at=now, updated_at=now) for p in PROTOCOLS],
+        ).scalars())
+        patient_ids = []
+        for start in range(0, patients, SEED_CHUNK):
+            patient_ids += conn.execute(insert(Patient).returning(Patient.id), [
+                {
+                    "mrn": f"B{index:08d}",
+                    "first_name": "Bench",
+                    "last_name": f"Patient{index}",
+                    "date_of_birth": date(1950, 1, 1) + timedelta(days=index % 20000),
+                    "created_at": now,
+                }
+                for index in range(start, min(start + SEED_CHUNK, patients))
+            ]).scalars().all()
+
+    statuses = [status for status, _ in STATUS_MIX]
+    weights = [weight for _, weight in STATUS_MIX]
+    for start in range(0, requests, SEED_CHUNK):
+        rows = []
+        for index in range(start, min(start + SEED_CHUNK, requests)):
+            status = rng.choices(statuses, weights)[0]
+            created_at = now - timedelta(minutes=requests - index)
+            ai_decision = None if status == RefillStatus.PENDING_AI_REVIEW else rng.choice(["Approve", "Deny"])
+            reviewed = status in (RefillStatus.APPROVED, RefillStatus.DENIED)
+            rows.append({
+                "patient_id": rng.choice(patient_ids),
+                "protocol_id": rng.choice(protocol_ids),
+                "status": status,
+                "ai_decision": ai_decision,
+                "ai_reason": "Seeded for benchmark" if ai_decision else None,
+                "ai_confidence": 100.0 if ai_decision else None,
+                "ai_decided_by": "rules" if ai_decision else None,
+                "final_decision": ("Approve" if status == RefillStatus.APPROVED else "Deny") if reviewed else None,
+                "reviewed_by": "benchmark" if reviewed else None,
+                "reviewed_at": created_at + timedelta(hours=1) if reviewed else None,
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(RefillRequest), rows)
+        print(f"Seeded {min(start + SEED_CHUNK, requests)}/{requests} refill requests", flush=True)
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> Dict:
+    """Latency percentiles (ms) and throughput for one scenario."""
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    send: Callable[[httpx.AsyncClient, int, Dict], Awaitable[httpx.Response]],
+    total: int,
+    concurrency: int,
+) -> Dict:
+    """Send `total` requests from `concurrency` concurrent clients."""
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+
+    async def client_loop():
+        nonlocal errors
+        state: Dict = {}
+        while (index := next(counter)) < total:
+            started = time.perf_counter()
+            response = await send(client, index, state)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def run_http_benchmarks(args, rng: random.Random) -> Dict:
+    """Queue, detail and review scenarios against the in-process app."""
+    from app.main import app
+
+    with Session(engine) as session:
+        max_id = session.exec(select(func.max(RefillRequest.id))).one()
+        reviewable = session.exec(
+            select(func.count()).where(RefillRequest.status == RefillStatus.PENDING_HUMAN_REVIEW)
+        ).one()
+
+    async def queue_page(client, index, state):
+        params = {"limit": args.page_size}
+        if state.get("cursor"):
+            params["after"] = state["cursor"]
+        response = await client.get("/api/v1/refill-queue", params=params)
+        # Page through the queue, starting over after --pages pages
+        state["pages"] = (state.get("pages", 0) + 1) % args.pages
+        state["cursor"] = response.headers.get("x-next-cursor") if state["pages"] else None
+        return response
+
+    async def detail(client, index, state):
+        return await client.get(f"/api/v1/refill-request/{rng.randint(1, max_id)}")
+
+    async def claim_and_review(client, index, state):
+        user_id = state.setdefault("user_id", f"benchmark-{index}")
+        claimed = await client.post("/api/v1/refill-requests:claim", json={"user_id": user_id})
+        if claimed.status_code >= 400 or not claimed.json():
+            return claimed
+        return await client.post(
+            f"/api/v1/refill-request/{claimed.json()[0]['id']}/review",
+            json={"decision": rng.choice(["Approve", "Deny"]), "user_id": user_id},
+        )
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            # Warm caches, pools and the protocol registry
+            await drive(client, detail, min(50, args.requests), args.concurrency)
+
+            results["refill_queue"] = await drive(client, queue_page, args.requests, args.concurrency)
+            results["refill_detail"] = await drive(client, detail, args.requests, args.concurrency)
+            results["claim_and_review"] = await drive(
+                client, claim_and_review, min(args.requests, reviewable), args.concurrency
+            )
+    return results
+
+
+def run_ai_review_benchmark(args) -> Dict:
+    """End-to-end AI review throughput, run like the Celery worker pool."""
+    from app.agents.medrefill_agents import get_llm
+    from app.services.ai_review import process_ai_review
+
+    with Session(engine) as session:
+        request_ids = list(session.exec(
+            select(RefillRequest.id)
+            .where(RefillRequest.status == RefillStatus.PENDING_AI_REVIEW)
+            .order_by(RefillRequest.id)
+            .limit(args.ai_reviews)
+        ).all())
+
+    latencies: List[float] = []
+
+    def review(request_id: int):
+        started = time.perf_counter()
+        decision = process_ai_review(request_id)
+        latencies.append(time.perf_counter() - started)
+        return decision
+
+    # The shared model is wrapped by the LLM scheduler; count on the fake inside
+    llm = getattr(get_llm(), "llm", get_llm())
+    if hasattr(llm, "reset"):
+        llm.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.ai_workers) as pool:
+        decisions = list(pool.map(review, request_ids))
+    elapsed = time.perf_counter() - started
+
+    with Session(engine) as session:
+        decided_by = dict(session.exec(
+            select(RefillRequest.ai_decided_by, func.count())
+            .where(RefillRequest.id.in_(request_ids))
+            .group_by(RefillRequest.ai_decided_by)
+        ).all())
+
+    result = summarize(latencies, elapsed, errors=sum(1 for d in decisions if d is None))
+    result["reviews_per_s"] = result.pop("rps", 0)
+    result["workers"] = args.ai_workers
+    result["decided_by"] = decided_by
+    if hasattr(llm, "usage"):
+        result["llm"] = llm.usage()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=parse_scale, default=SCALES["10k"], help="Refill requests to seed: 10k, 100k, 1m or a number")
+    parser.add_argument("--skip-seed", action="store_true", help="Use the data already in the database")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per HTTP scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent HTTP clients")
+    parser.add_argument("--page-size", type=int, default=100, help="Queue page size")
+    parser.add_argument("--pages", type=int, default=5, help="Queue pages each client follows before starting over")
+    parser.add_argument("--ai-reviews", type=int, default=200, help="AI reviews to run (0 to skip)")
+    parser.add_argument("--ai-workers", type=int, default=settings.celery_worker_concurrency, help="Concurrent AI reviews")
+    parser.add_argument("--ai-review-mode", choices=["rules_first", "agent"], default=settings.ai_review_mode)
+    parser.add_argument("--ai-agent-mode", choices=["react", "structured"], default=settings.ai_agent_mode)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM latency per call (seconds)")
+    parser.add_argument("--llm-rpm", type=float, help="LLM scheduler rate limit in calls per minute (default: unlimited)")
+    parser.add_argument("--emr-latency", type=float, default=0.02, help="Fake EMR latency per call (seconds)")
+    parser.add_argument("--no-decision-cache", action="store_true", help="Send every agent review to the LLM")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"), help="JSON results file")
+    args = parser.parse_args()
+
+    # Offline fakes and run configuration
+    settings.llm_provider = "fake"
+    settings.fake_llm_latency = args.llm_latency
+    # Before the LLM scheduler is first imported, which reads its limits once
+    settings.llm_requests_per_minute = args.llm_rpm
+    settings.emr_base_url = None
+    settings.emr_fake_latency = args.emr_latency
+    settings.ai_review_mode = args.ai_review_mode
+    settings.ai_agent_mode = args.ai_agent_mode
+    settings.celery_task_always_eager = True
+    if args.no_decision_cache:
+        settings.ai_decision_cache_enabled = False
+
+    rng = random.Random(args.seed)
+    if not args.skip_seed:
+        started = time.perf_counter()
+        seed(args.scale, rng)
+        print(f"Seed finished in {time.perf_counter() - started:.1f}s")
+
+    results = asyncio.run(run_http_benchmarks(args, rng))
+    if args.ai_reviews:
+        results["ai_review"] = run_ai_review_benchmark(args)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "database": engine.dialect.name,
+            "database_url": engine.url.render_as_string(hide_password=True),
+            "python": platform.python_version(),
+            "scale": args.scale,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "ai_review_mode": args.ai_review_mode,
+            "ai_agent_mode": args.ai_agent_mode,
+            "llm_latency_s": args.llm_latency,
+            "llm_rpm": args.llm_rpm,
+            "emr_latency_s": args.emr_latency,
+            "emr_cache_enabled": settings.emr_cache_enabled,
+            "ai_decision_cache_enabled": settings.ai_decision_cache_enabled,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    print(f"Wrote results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Query-plan check for the refill queue.
+
+Seeds refill_requests up to a target size (mostly finalized rows, a small
+pending slice, like production), runs ANALYZE and EXPLAINs the first and a
+later page of the queue query. Exits with status 1 if PostgreSQL plans a
+sequential scan on refill_requests.
+
+Usage:
+    python -m app.scripts.check_queue_plan --rows 500000
+"""
+import argparse
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+from app.core.db import engine, create_db_and_tables
+from app.models import Patient, MedicationProtocol, RefillRequest
+from app.services.refill_queue import build_queue_statement, decode_cursor, encode_cursor
+
+SEED_SQL = """
+INSERT INTO refill_requests (patient_id, protocol_id, status, ai_decision, created_at, updated_at)
+SELECT :patient_id, :protocol_id,
+       (CASE WHEN g % 20 = 0 THEN 'PENDING_HUMAN_REVIEW'
+             WHEN g % 20 = 1 THEN 'PENDING_AI_REVIEW'
+             WHEN g % 2 = 0 THEN 'APPROVED'
+             ELSE 'DENIED' END)::refillstatus,
+       CASE WHEN g % 3 = 0 THEN 'Deny' ELSE 'Approve' END,
+       now() - make_interval(secs => g),
+       now()
+FROM generate_series(1, :count) AS g
+"""
+
+
+def seed_rows(session: Session, target_rows: int) -> None:
+    """Insert synthetic refill requests until the table has target_rows rows."""
+    existing = session.exec(select(func.count()).select_from(RefillRequest)).one()
+    missing = target_rows - existing
+    if missing <= 0:
+        return
+
+    patient = session.exec(select(Patient).where(Patient.mrn == "PLAN-CHECK")).first()
+    if not patient:
+        patient = Patient(mrn="PLAN-CHECK", first_name="Plan", last_name="Check", date_of_birth=date(1970, 1, 1))
+        session.add(patient)
+    protocol = session.exec(select(MedicationProtocol)).first()
+    if not protocol:
+        protocol = MedicationProtocol(medication_class="Plan Check", max_months_since_visit=12)
+        session.add(protocol)
+    session.commit()
+
+    print(f"Seeding {missing} refill requests...")
+    session.execute(
+        text(SEED_SQL),
+        {"patient_id": patient.id, "protocol_id": protocol.id, "count": missing}
+    )
+    session.commit()
+
+
+def explain(session: Session, statement) -> dict:
+    """Return the JSON plan PostgreSQL chooses for a statement."""
+    compiled = statement.compile(dialect=engine.dialect)
+    result = session.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+    )
+    return result.scalar()[0]["Plan"]
+
+
+def find_seq_scans(plan: dict, table: str) -> list[dict]:
+    """Return all Seq Scan nodes on `table` in a plan tree."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == table:
+        found.append(plan)
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child, table))
+    return found
+
+
+def check_queue_plan(rows: int, limit: int) -> bool:
+    """
+    Seed, analyze and check the queue query plans.
+
+    Returns:
+        True if no plan sequentially scans refill_requests
+    """
+    create_db_and_tables()
+
+    with Session(engine) as session:
+        seed_rows(session, rows)
+        session.execute(text("ANALYZE refill_requests"))
+        session.commit()
+
+        pages = {"first page": build_queue_statement(limit + 1)}
+        page = session.exec(build_queue_statement(limit)).all()
+        if page:
+            cursor = decode_cursor(encode_cursor(page[-1]))
+            pages["next page"] = build_queue_statement(limit + 1, after=cursor)
+
+        ok = True
+        for name, statement in pages.items():
+            plan = explain(session, statement)
+            seq_scans = find_seq_scans(plan, RefillRequest.__tablename__)
+            status = "FAIL (sequential scan)" if seq_scans else "ok"
+            print(f"{name}: {status}")
+            print(json.dumps(plan, indent=2))
+            ok = ok and not seq_scans
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="Minimum table size to seed")
+    parser.add_argument("--limit", type=int, default=100, help="Queue page size")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("The queue plan check requires PostgreSQL (DATABASE_URL).")
+        sys.exit(2)
+
+    if not check_queue_plan(args.rows, args.limit):
+        sys.exit(1)
+    print("\n✅ Queue query uses indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Generate production-scale synthetic data for load testing.
+
+Creates patients, medication protocols and refill requests in bulk (COPY
+on PostgreSQL, multi-row INSERTs elsewhere) with controlled distributions,
+and writes the matching EMR data to a fixture database that the fake EMR
+serves when EMR_FIXTURES_PATH points to it.
+
+Each patient refills one chronic medication class and gets an EMR profile
+(last visit, A1c value and date) drawn to meet the target deny ratio. AI
+decisions are computed from that profile by the rules engine, so database
+rows, EMR fixtures and rule results agree, and the LLM is never called.
+Borderline profiles, which production escalates to the agent, are labelled
+as agent decisions. The same --seed always produces the same data.
+
+Usage:
+    python -m app.scripts.generate_synthetic_data --patients 100000 --requests 1000000
+    EMR_FIXTURES_PATH=emr_fixtures.sqlite uvicorn app.main:app
+"""
+import argparse
+import csv
+import io
+import json
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+from sqlalchemy import delete, insert, text
+from sqlmodel import Session, select
+
+from app.core.db import create_db_and_tables, engine
+from app.models import ArchivedRefillRequest, MedicationProtocol, Patient, RefillRequest, RefillStatus
+from app.schemas import MedicationProtocolRead
+from app.services.emr_fake import FIXTURE_COLUMNS
+from app.services.protocol_rules import DAYS_PER_MONTH, evaluate_protocol
+from app.services.review_snapshot import build_snapshot
+
+# medication_class, max_months_since_visit, max_a1c_value, require_recent_a1c, share of patients
+PROTOCOLS = [
+    ("SGLT2 Inhibitor", 12, 8.0, 6, 0.25),
+    ("GLP-1 Agonist", 12, 8.0, 6, 0.20),
+    ("DPP-4 Inhibitor", 12, 8.5, 6, 0.10),
+    ("Metformin", 12, 9.0, 12, 0.20),
+    ("Statin", 12, None, None, 0.15),
+    ("ACE Inhibitor", 12, None, None, 0.10),
+]
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Maria",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Lee",
+]
+
+REQUEST_COLUMNS = [
+    "patient_id", "protocol_id", "status", "is_urgent",
+    "ai_decision", "ai_reason", "ai_confidence", "ai_decided_by", "ai_cache_hit",
+    "ai_snapshot", "ai_snapshot_at",
+    "final_decision", "reviewed_by", "reviewed_at", "created_at", "updated_at",
+]
+PATIENT_COLUMNS = ["mrn", "first_name", "last_name", "date_of_birth", "created_at"]
+
+REVIEWERS = [f"synthetic-reviewer-{index:02d}" for index in range(20)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--deny-ratio", type=float, default=0.3, help="Share of patients whose EMR data violate their protocol")
+    parser.add_argument("--a1c-mean", type=float, default=7.0, help="Mean A1c of patients within protocol")
+    parser.add_argument("--a1c-sd", type=float, default=0.8, help="A1c standard deviation")
+    parser.add_argument("--visit-recency-days", type=float, default=120, help="Mean days since the last visit of patients within protocol")
+    parser.add_argument("--missing-a1c-ratio", type=float, default=0.02, help="Share of patients without an A1c on file")
+    parser.add_argument("--pending-ai-ratio", type=float, default=0.01, help="Share of requests awaiting AI review (newest)")
+    parser.add_argument("--pending-human-ratio", type=float, default=0.05, help="Share of requests awaiting human review")
+    parser.add_argument("--override-ratio", type=float, default=0.03, help="Share of reviews where the reviewer overrode the AI")
+    parser.add_argument("--urgent-ratio", type=float, default=0.02)
+    parser.add_argument("--days", type=int, default=365, help="Spread request creation over this many days")
+    parser.add_argument("--snapshots", action="store_true", help="Store EMR snapshots on AI-reviewed requests (larger, slower)")
+    parser.add_argument("--mrn-prefix", default="SYN", help="Prefix of generated MRNs")
+    parser.add_argument("--emr-fixtures", type=Path, default=Path("emr_fixtures.sqlite"), help="EMR fixture database to write")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows per COPY/INSERT batch")
+    parser.add_argument("--reset", action="store_true", help="Delete previously generated rows with the same MRN prefix first")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def bulk_insert(table, columns, rows) -> None:
+    """Insert rows (tuples in column order) with COPY on PostgreSQL, executemany elsewhere."""
+    if engine.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        raw = engine.raw_connection()
+        try:
+            raw.cursor().copy_expert(
+                f"COPY {table.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            raw.commit()
+        finally:
+            raw.close()
+    else:
+        with engine.begin() as conn:
+            conn.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+
+def upsert_protocols(session: Session):
+    """Create missing protocols; return them in PROTOCOLS order with their shares."""
+    protocols = []
+    for medication_class, months, a1c, recent, _ in PROTOCOLS:
+        protocol = session.exec(
+            select(MedicationProtocol).where(MedicationProtocol.medication_class == medication_class)
+        ).first()
+        if not protocol:
+            protocol = MedicationProtocol(
+                medication_class=medication_class,
+                max_months_since_visit=months,
+                max_a1c_value=a1c,
+                require_recent_a1c=recent,
+            )
+            session.add(protocol)
+            session.commit()
+            session.refresh(protocol)
+        protocols.append(MedicationProtocolRead.model_validate(protocol))
+    return protocols
+
+
+def reset(prefix: str) -> None:
+    """Delete generated patients and their refill requests, archived ones included."""
+    synthetic = select(Patient.id).where(Patient.mrn.startswith(prefix))
+    with engine.begin() as conn:
+        conn.execute(delete(RefillRequest).where(RefillRequest.patient_id.in_(synthetic)))
+        conn.execute(delete(ArchivedRefillRequest).where(ArchivedRefillRequest.patient_id.in_(synthetic)))
+        conn.execute(delete(Patient).where(Patient.mrn.startswith(prefix)))
+
+
+def generate_profiles(args, protocols, rng: np.random.Generator):
+    """
+    Draw each patient's medication class and EMR profile.
+
+    Returns:
+        Arrays of protocol index, days since last visit, A1c value (NaN if
+        missing) and days since the A1c, one entry per patient
+    """
+    n = args.patients
+    shares = np.array([share for *_, share in PROTOCOLS])
+    protocol_index = rng.choice(len(protocols), size=n, p=shares / shares.sum())
+    max_visit_days = np.array([p.max_months_since_visit * DAYS_PER_MONTH for p in protocols])[protocol_index]
+    max_a1c = np.array([p.max_a1c_value or np.nan for p in protocols])[protocol_index]
+    recent_a1c_days = np.array([(p.require_recent_a1c or 12) * DAYS_PER_MONTH for p in protocols])[protocol_index]
+    has_a1c_rule = ~np.isnan(max_a1c)
+
+    # Within protocol: recent visit, A1c below the threshold (reflected), recent A1c
+    visit_days = np.minimum(rng.exponential(args.visit_recency_days, n) + 1, max_visit_days - 7)
+    a1c = rng.normal(args.a1c_mean, args.a1c_sd, n)
+    above = has_a1c_rule & (a1c > max_a1c)
+    a1c[above] = 2 * max_a1c[above] - a1c[above]
+    a1c_days = rng.uniform(7, recent_a1c_days - 7)
+
+    # Violations: a stale visit, or for A1c protocols a high or outdated A1c
+    deny = rng.random(n) < args.deny_ratio
+    violation = rng.choice(3, size=n, p=[0.5, 0.35, 0.15])
+    violation[~has_a1c_rule] = 0
+    stale = deny & (violation == 0)
+    high = deny & (violation == 1)
+    outdated = deny & (violation == 2)
+    visit_days[stale] = max_visit_days[stale] + rng.uniform(30, 400, stale.sum())
+    a1c[high] = max_a1c[high] + 0.3 + np.abs(rng.normal(0.8, 0.5, high.sum()))
+    a1c_days[outdated] = recent_a1c_days[outdated] + rng.uniform(30, 200, outdated.sum())
+
+    a1c = np.clip(np.round(a1c, 1), 4.5, 14.0)
+    a1c[~deny & (rng.random(n) < args.missing_a1c_ratio)] = np.nan
+    return protocol_index, np.round(visit_days).astype(int), a1c, np.round(a1c_days).astype(int)
+
+
+def write_emr_fixtures(path: Path, mrns, first_names, last_names, dobs, visit_days, a1c, a1c_days) -> None:
+    """Write the fixture database served by the fake EMR."""
+    path.unlink(missing_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        "CREATE TABLE emr_patients (mrn TEXT PRIMARY KEY, first_name TEXT, last_name TEXT, dob TEXT, "
+        "last_visit_days_ago INTEGER, a1c_value REAL, a1c_days_ago INTEGER)"
+    )
+    conn.executemany(
+        f"INSERT INTO emr_patients ({', '.join(FIXTURE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                mrns[i], first_names[i], last_names[i], dobs[i], int(visit_days[i]),
+                None if np.isnan(a1c[i]) else float(a1c[i]),
+                None if np.isnan(a1c[i]) else int(a1c_days[i]),
+            )
+            for i in range(len(mrns))
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    today = date.today()
+
+    create_db_and_tables()
+    if args.reset:
+        reset(args.mrn_prefix)
+    with Session(engine) as session:
+        if session.exec(select(Patient.id).where(Patient.mrn.startswith(args.mrn_prefix)).limit(1)).first():
+            sys.exit(f"Patients with MRN prefix {args.mrn_prefix!r} already exist; use --reset or another --mrn-prefix")
+        protocols = upsert_protocols(session)
+
+    # Patients and their EMR profiles
+    n = args.patients
+    width = len(str(n))
+    mrns = [f"{args.mrn_prefix}{index:0{width}d}" for index in range(n)]
+    first_names = [FIRST_NAMES[i] for i in rng.integers(len(FIRST_NAMES), size=n)]
+    last_names = [LAST_NAMES[i] for i in rng.integers(len(LAST_NAMES), size=n)]
+    dobs = [(date(1940, 1, 1) + timedelta(days=int(d))).isoformat() for d in rng.integers(0, 60 * 365, size=n)]
+    protocol_index, visit_days, a1c, a1c_days = generate_profiles(args, protocols, rng)
+
+    write_emr_fixtures(args.emr_fixtures, mrns, first_names, last_names, dobs, visit_days, a1c, a1c_days)
+    print(f"Wrote EMR fixtures for {n} patients to {args.emr_fixtures}")
+
+    for start in range(0, n, args.chunk_size):
+        end = min(start + args.chunk_size, n)
+        bulk_insert(Patient, PATIENT_COLUMNS, [
+            (mrns[i], first_names[i], last_names[i], date.fromisoformat(dobs[i]), now) for i in range(start, end)
+        ])
+    with engine.connect() as conn:
+        ids_by_mrn = dict(conn.execute(
+            select(Patient.mrn, Patient.id).where(Patient.mrn.startswith(args.mrn_prefix))
+        ).all())
+    patient_ids = np.array([ids_by_mrn[mrn] for mrn in mrns])
+    print(f"Inserted {n} patients")
+
+    # AI decision per patient from the rules engine (never the LLM)
+    decisions = []
+    for i in range(n):
+        clinical_data = {
+            "last_visit_date": (today - timedelta(days=int(visit_days[i]))).isoformat(),
+            "labs": {} if np.isnan(a1c[i]) else {
+                "A1c": {"value": float(a1c[i]), "date": (today - timedelta(days=int(a1c_days[i]))).isoformat()}
+            },
+        }
+        protocol = protocols[protocol_index[i]]
+        evaluation = evaluate_protocol(protocol, clinical_data, today)
+        snapshot = None
+        if args.snapshots:
+            patient_data = {"mrn": mrns[i], "first_name": first_names[i], "last_name": last_names[i], "dob": dobs[i]}
+            snapshot = json.dumps(build_snapshot(patient_data, clinical_data, protocol, evaluation))
+        decided_by = "rules" if evaluation.conclusive else "agent"
+        decisions.append((evaluation.decision, evaluation.reason, 100.0 if decided_by == "rules" else 85.0, decided_by, snapshot))
+    denied = sum(1 for decision in decisions if decision[0] == "Deny")
+    print(f"Evaluated protocols: {denied / max(n, 1):.1%} of patients denied")
+
+    # Refill requests: ids follow creation time; the newest are still pending
+    m = args.requests
+    request_patients = rng.integers(0, n, size=m)
+    seconds_ago = np.sort(rng.uniform(0, args.days * 86400, size=m))[::-1]
+    pending_ai = int(m * args.pending_ai_ratio)
+    pending_human = int(m * args.pending_human_ratio)
+    reviewed = m - pending_ai - pending_human
+    override = rng.random(m) < args.override_ratio
+    urgent = rng.random(m) < args.urgent_ratio
+    review_delay = rng.uniform(3600, 72 * 3600, size=m)
+    reviewers = rng.integers(len(REVIEWERS), size=m)
+
+    for start in range(0, m, args.chunk_size):
+        rows = []
+        for j in range(start, min(start + args.chunk_size, m)):
+            patient = request_patients[j]
+            created_at = now - timedelta(seconds=float(seconds_ago[j]))
+            row = [int(patient_ids[patient]), protocols[protocol_index[patient]].id]
+            if j >= reviewed + pending_human:
+                rows.append(row + [
+                    RefillStatus.PENDING_AI_REVIEW.name, bool(urgent[j]),
+                    None, None, None, None, False, None, None, None, None, None, created_at, created_at,
+                ])
+                continue
+            decision, reason, confidence, decided_by, snapshot = decisions[patient]
+            ai_done_at = created_at + timedelta(minutes=2)
+            if j >= reviewed:
+                status, final_decision, reviewed_by, reviewed_at = RefillStatus.PENDING_HUMAN_REVIEW, None, None, None
+            else:
+                final_decision = decision
+                if override[j]:
+                    final_decision = "Approve" if decision == "Deny" else "Deny"
+                status = RefillStatus.APPROVED if final_decision == "Approve" else RefillStatus.DENIED
+                reviewed_by = REVIEWERS[reviewers[j]]
+                reviewed_at = created_at + timedelta(seconds=float(review_delay[j]))
+            rows.append(row + [
+                status.name, bool(urgent[j]),
+                decision, reason, confidence, decided_by, False,
+                snapshot, ai_done_at if snapshot else None,
+                final_decision, reviewed_by, reviewed_at, created_at, reviewed_at or ai_done_at,
+            ])
+        if engine.dialect.name != "postgresql":
+            # JSON columns take Python objects outside COPY
+            snapshot_column = REQUEST_COLUMNS.index("ai_snapshot")
+            for row in rows:
+                if row[snapshot_column]:
+                    row[snapshot_column] = json.loads(row[snapshot_column])
+        bulk_insert(RefillRequest, REQUEST_COLUMNS, rows)
+        print(f"Inserted {min(start + args.chunk_size, m)}/{m} refill requests", flush=True)
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE patients"))
+            conn.execute(text("ANALYZE refill_requests"))
+
+    print(f"\nDone in {time.perf_counter() - started:.1f}s")
+    print(f"   - {n} patients (MRN prefix {args.mrn_prefix!r}), {len(protocols)} protocols")
+    print(f"   - {m} refill requests: {pending_ai} pending AI review, {pending_human} pending human review, {reviewed} reviewed")
+    print(f"   - Serve the EMR data with EMR_FIXTURES_PATH={args.emr_fixtures.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
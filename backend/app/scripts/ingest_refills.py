@@ -0,0 +1,46 @@
+"""
+Ingest a pharmacy/eRx feed of refill requests.
+
+Reads a CSV file (header: mrn,medication_class) or an NDJSON file (one
+{"mrn": ..., "medication_class": ...} object per line), creates the refill
+requests in bulk and enqueues them for AI review. The file is streamed, so
+feeds of any size are ingested in constant memory.
+
+Usage:
+    python -m app.scripts.ingest_refills feed.csv
+    python -m app.scripts.ingest_refills feed.ndjson --errors rejected.ndjson
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.services.refill_ingest import INGEST_FORMATS, ingest_rows, parse_feed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("feed", type=Path, help="CSV or NDJSON feed file")
+    parser.add_argument("--format", choices=INGEST_FORMATS, help="Feed format (defaults from the file extension)")
+    parser.add_argument("--no-enqueue", action="store_true", help="Create the requests without enqueueing AI reviews")
+    parser.add_argument("--errors", type=Path, help="Write rejected rows to this NDJSON file")
+    args = parser.parse_args()
+
+    feed_format = args.format or ("csv" if args.feed.suffix.lower() == ".csv" else "ndjson")
+    with open(args.feed, newline="", encoding="utf-8-sig") as f:
+        result = ingest_rows(parse_feed(f, feed_format), enqueue=not args.no_enqueue)
+
+    print(json.dumps({"created": result.created, "failed": result.failed}, indent=2))
+
+    if args.errors:
+        with open(args.errors, "w") as f:
+            for error in result.errors:
+                f.write(json.dumps(error) + "\n")
+        print(f"Wrote rejected rows to {args.errors}")
+
+
+if __name__ == "__main__":
+    main()
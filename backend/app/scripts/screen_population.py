@@ -0,0 +1,97 @@
+"""
+Screen a patient population against a medication protocol.
+
+Reads columnar clinical data from a CSV file (columns: mrn,
+last_visit_date, a1c_value, a1c_date; empty cells for missing data), or
+fetches it from the EMR for every patient in the database, and reports who
+would fail the protocol on a given date.
+
+Usage:
+    python -m app.scripts.screen_population "SGLT2 Inhibitor" --input patients.csv \\
+        --as-of 2026-11-16 --output denied.csv
+    python -m app.scripts.screen_population "SGLT2 Inhibitor" --from-emr
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.core.db import engine
+from app.models import Patient
+from app.services.emr_service import get_clinical_data_many
+from app.services.population_screening import (
+    clinical_columns,
+    screen_population,
+    to_date_array,
+    to_float_array,
+)
+from app.services.protocol_registry import protocol_registry
+
+
+def read_csv_columns(path: Path):
+    """Read screening columns from a CSV file."""
+    mrns, visits, values, a1c_dates = [], [], [], []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            mrns.append(row["mrn"])
+            visits.append(row.get("last_visit_date") or None)
+            values.append(float(row["a1c_value"]) if row.get("a1c_value") else None)
+            a1c_dates.append(row.get("a1c_date") or None)
+    return np.array(mrns), to_date_array(visits), to_float_array(values), to_date_array(a1c_dates)
+
+
+def fetch_emr_columns():
+    """Fetch screening columns from the EMR for every patient in the database."""
+    with Session(engine) as session:
+        mrns = list(session.exec(select(Patient.mrn).order_by(Patient.id)).all())
+    records = asyncio.run(get_clinical_data_many(mrns))
+    return (np.array(mrns), *clinical_columns(records[mrn] for mrn in mrns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("medication_class", help="Protocol to screen against, e.g. 'SGLT2 Inhibitor'")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", type=Path, help="CSV with mrn,last_visit_date,a1c_value,a1c_date")
+    source.add_argument("--from-emr", action="store_true", help="Fetch data from the EMR for all patients")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=date.today(), help="Evaluation date (YYYY-MM-DD)")
+    parser.add_argument("--output", type=Path, help="Write failing patients and reasons to this CSV")
+    args = parser.parse_args()
+
+    protocol = protocol_registry.get(args.medication_class)
+    if not protocol:
+        print(f"No protocol found for medication class: {args.medication_class}")
+        sys.exit(1)
+
+    mrns, last_visits, a1c_values, a1c_dates = (
+        read_csv_columns(args.input) if args.input else fetch_emr_columns()
+    )
+    result = screen_population(protocol, last_visits, a1c_values, a1c_dates, as_of=args.as_of)
+
+    print(json.dumps({
+        "medication_class": protocol.medication_class,
+        "protocol_version": protocol.version,
+        "as_of": args.as_of.isoformat(),
+        **result.summary(),
+    }, indent=2))
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["mrn", "reasons"])
+            for index in np.flatnonzero(~result.passed):
+                writer.writerow([mrns[index], ";".join(result.reasons(index))])
+        print(f"Wrote failing patients to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ from sqlmodel import Session, select
 from app.core.db import engine, create_db_and_tables
 from app.models import Patient, MedicationProtocol, RefillRequest, RefillStatus
 from app.agents.medrefill_agents import run_ai_review
+from app.services.ai_review import apply_ai_result
 from datetime import date, datetime
 
 
@@ -93,10 +94,7 @@ def seed_database():
         # Run AI review
         print(f"Running AI review for request {request1.id}...")
         ai_result = run_ai_review(patient1.mrn, protocol1.medication_class)
-        request1.ai_decision = ai_result["decision"]
-        request1.ai_reason = ai_result["reason"]
-        request1.ai_confidence = ai_result["confidence"]
-        request1.status = RefillStatus.PENDING_HUMAN_REVIEW
+        apply_ai_result(request1, ai_result)
         session.add(request1)
         
         # Request 2: Patient 2 (Approve case)
@@ -112,10 +110,7 @@ def seed_database():
         # Run AI review
         print(f"Running AI review for request {request2.id}...")
         ai_result = run_ai_review(patient2.mrn, protocol2.medication_class)
-        request2.ai_decision = ai_result["decision"]
-        request2.ai_reason = ai_result["reason"]
-        request2.ai_confidence = ai_result["confidence"]
-        request2.status = RefillStatus.PENDING_HUMAN_REVIEW
+        apply_ai_result(request2, ai_result)
         session.add(request2)
         
         session.commit()
@@ -0,0 +1,116 @@
+"""
+AI review pipeline for refill requests.
+
+Moves a RefillRequest from PENDING_AI_REVIEW to PENDING_HUMAN_REVIEW by
+running the AI review and storing its decision. Used by the Celery worker
+and the seed script.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app.agents.medrefill_agents import run_ai_review
+from app.core.db import engine
+from app.models import RefillRequest, Patient, MedicationProtocol, RefillStatus
+
+
+def apply_ai_result(request: RefillRequest, ai_result: Dict) -> None:
+    """
+    Store an AI review result on a refill request and hand it to human review.
+
+    Args:
+        request: RefillRequest to update (not committed)
+        ai_result: Dictionary returned by run_ai_review
+    """
+    request.ai_decision = ai_result["decision"]
+    request.ai_reason = ai_result["reason"]
+    request.ai_confidence = ai_result["confidence"]
+    request.ai_decided_by = ai_result["decided_by"]
+    request.ai_cache_hit = ai_result.get("cache_hit", False)
+    request.ai_snapshot = ai_result.get("snapshot")
+    request.ai_snapshot_at = datetime.utcnow() if request.ai_snapshot else None
+    request.status = RefillStatus.PENDING_HUMAN_REVIEW
+    request.updated_at = datetime.utcnow()
+
+
+def process_ai_review(request_id: int) -> Optional[str]:
+    """
+    Run the AI review for a pending refill request and persist the result.
+
+    The database session is only held while reading the request and while
+    writing the result, never across the review itself. Requests that are
+    no longer PENDING_AI_REVIEW (e.g. a redelivered task) are skipped.
+
+    Args:
+        request_id: ID of the RefillRequest to review
+
+    Returns:
+        The AI decision, or None if the request was missing or already reviewed
+    
+    Raises:
+        LLMBackpressureError: If the LLM had no capacity; the request stays
+            PENDING_AI_REVIEW
+    """
+    with Session(engine) as session:
+        request = session.get(RefillRequest, request_id)
+        if not request or request.status != RefillStatus.PENDING_AI_REVIEW:
+            return None
+        patient = session.get(Patient, request.patient_id)
+        protocol = session.get(MedicationProtocol, request.protocol_id)
+        patient_mrn = patient.mrn
+        medication_class = protocol.medication_class
+        urgent = request.is_urgent
+
+    ai_result = run_ai_review(patient_mrn, medication_class, urgent=urgent)
+
+    with Session(engine) as session:
+        request = session.get(RefillRequest, request_id, with_for_update=True)
+        if not request or request.status != RefillStatus.PENDING_AI_REVIEW:
+            return None
+        apply_ai_result(request, ai_result)
+        session.add(request)
+        session.commit()
+
+    return ai_result["decision"]
+
+
+def claim_stale_ai_reviews(older_than: float, limit: int) -> Tuple[List[int], Set[int]]:
+    """
+    Pick refill requests stuck in PENDING_AI_REVIEW for re-enqueueing.
+
+    A request is stuck when its updated_at is older than `older_than`
+    seconds: its task was lost (broker outage at enqueue, eager mode
+    backpressure) or ran out of retries. The picked requests' updated_at
+    is bumped, so each one is re-enqueued at most once per period.
+
+    Args:
+        older_than: Seconds without progress before a request counts as stuck
+        limit: Maximum number of requests to pick
+
+    Returns:
+        Tuple of the picked request IDs (urgent and oldest first) and the urgent ones among them
+    """
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        rows = session.exec(
+            select(RefillRequest.id, RefillRequest.is_urgent)
+            .where(
+                RefillRequest.status == RefillStatus.PENDING_AI_REVIEW,
+                RefillRequest.updated_at < now - timedelta(seconds=older_than),
+            )
+            .order_by(RefillRequest.is_urgent.desc(), RefillRequest.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        request_ids = [row.id for row in rows]
+        if request_ids:
+            session.execute(
+                update(RefillRequest)
+                .where(RefillRequest.id.in_(request_ids))
+                .values(updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        session.commit()
+    return request_ids, {row.id for row in rows if row.is_urgent}
@@ -0,0 +1,126 @@
+"""
+Bulk human review of refill requests.
+
+Applies many decisions in one transaction: one SELECT ... FOR UPDATE to
+lock and classify the requests, then one UPDATE per decision ("Approve",
+"Deny"), instead of a commit and refresh per request. As with single
+reviews, only requests the reviewer holds a claim on
+(app/services/refill_claims.py) are reviewed.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import REVIEWED_STATUSES, ArchivedRefillRequest, RefillRequest, RefillStatus
+from app.services.refill_claims import active_claim_holder
+from app.services.refill_events import record_change
+
+DECISION_STATUSES = {
+    "Approve": RefillStatus.APPROVED,
+    "Deny": RefillStatus.DENIED,
+}
+
+
+@dataclass
+class BulkReviewOutcome:
+    """Outcome for one request of a bulk review."""
+    id: int
+    outcome: str  # 'reviewed', 'not_found', 'already_reviewed', 'not_claimed' or 'skipped'
+    status: Optional[str] = None
+
+
+async def apply_bulk_review(
+    session: AsyncSession,
+    decisions: Dict[int, str],
+    user_id: str,
+    all_or_nothing: bool = False,
+) -> List[BulkReviewOutcome]:
+    """
+    Apply human decisions to many refill requests and commit.
+
+    Requests that do not exist, were already approved/denied (including
+    archived ones) or are not claimed by the reviewer are reported and
+    left untouched. With all_or_nothing,
+    any such request rolls the whole batch back and the requests that
+    could have been reviewed are reported as 'skipped'.
+
+    Args:
+        session: Async database session
+        decisions: Decision ("Approve" or "Deny") by request id, in request order
+        user_id: Reviewer ID
+        all_or_nothing: Apply nothing unless every request can be reviewed
+
+    Returns:
+        One outcome per request, in the order of decisions
+    """
+    ids = list(decisions)
+    rows = (await session.execute(
+        select(
+            RefillRequest.id, RefillRequest.status, RefillRequest.ai_decision, RefillRequest.created_at,
+            RefillRequest.claimed_by, RefillRequest.claim_expires_at,
+        )
+        .where(RefillRequest.id.in_(ids))
+        .with_for_update()
+    )).all()
+    current = {row.id: row for row in rows}
+    # Requests missing from refill_requests may have been archived (reviewed long ago)
+    archived = {}
+    if len(current) < len(ids):
+        archived = dict((await session.execute(
+            select(ArchivedRefillRequest.id, ArchivedRefillRequest.status)
+            .where(ArchivedRefillRequest.id.in_([request_id for request_id in ids if request_id not in current]))
+        )).all())
+
+    now = datetime.utcnow()
+    outcomes: Dict[int, BulkReviewOutcome] = {}
+    groups = defaultdict(list)
+    for request_id in ids:
+        row = current.get(request_id)
+        if row is None and request_id in archived:
+            outcomes[request_id] = BulkReviewOutcome(request_id, "already_reviewed", archived[request_id].value)
+        elif row is None:
+            outcomes[request_id] = BulkReviewOutcome(request_id, "not_found")
+        elif row.status in REVIEWED_STATUSES:
+            outcomes[request_id] = BulkReviewOutcome(request_id, "already_reviewed", row.status.value)
+        elif active_claim_holder(row, now) != user_id:
+            outcomes[request_id] = BulkReviewOutcome(request_id, "not_claimed", row.status.value)
+        else:
+            groups[decisions[request_id]].append(request_id)
+
+    if all_or_nothing and outcomes:
+        await session.rollback()
+        for group in groups.values():
+            for request_id in group:
+                outcomes[request_id] = BulkReviewOutcome(request_id, "skipped", current[request_id].status.value)
+        return [outcomes[request_id] for request_id in ids]
+
+    for decision, group in groups.items():
+        status = DECISION_STATUSES[decision]
+        await session.execute(
+            update(RefillRequest)
+            .where(RefillRequest.id.in_(group))
+            .values(
+                final_decision=decision,
+                reviewed_by=user_id,
+                reviewed_at=now,
+                status=status,
+                updated_at=now,
+                claimed_by=None,
+                claim_expires_at=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        for request_id in group:
+            outcomes[request_id] = BulkReviewOutcome(request_id, "reviewed", status.value)
+            record_change(
+                session.sync_session, request_id, status, current[request_id].status,
+                current[request_id].ai_decision, decision, user_id,
+                current[request_id].created_at, now,
+            )
+
+    await session.commit()
+    return [outcomes[request_id] for request_id in ids]
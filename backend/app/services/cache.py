@@ -0,0 +1,337 @@
+"""
+Bounded TTL/LRU cache with single-flight loading.
+
+Used to avoid repeated slow calls to remote systems (e.g. the EMR). Each
+cache keeps an in-process LRU tier and can optionally share entries across
+processes through Redis. Cached values are shared between callers and must
+be treated as read-only.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+@dataclass
+class CacheStats:
+    """Counters for a cache instance."""
+    hits: int = 0
+    shared_hits: int = 0  # served from Redis after a local miss
+    misses: int = 0
+    loads: int = 0
+    load_errors: int = 0
+    coalesced: int = 0  # concurrent misses that waited for another caller's load
+    evictions: int = 0
+    invalidations: int = 0
+
+
+@dataclass
+class _Flight:
+    """An in-progress load that concurrent callers can wait on."""
+    done: threading.Event = field(default_factory=threading.Event)
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+class RedisCacheBackend:
+    """
+    Shared cache tier stored in Redis as JSON.
+
+    Invalidations are published on a channel so other processes can drop
+    their local copies immediately instead of waiting for the TTL.
+    """
+
+    def __init__(self, url: str, prefix: str):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self.channel = f"{prefix}:invalidate"
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}:{key}"
+
+    def get(self, key: str) -> Any:
+        raw = self._redis.get(self._key(key))
+        return _MISSING if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._redis.set(self._key(key), json.dumps(value), px=int(ttl * 1000))
+
+    def delete(self, key: Optional[str]) -> None:
+        """Delete one key (or every key of this cache when key is None) and notify peers."""
+        if key is None:
+            for redis_key in self._redis.scan_iter(match=self._key("*")):
+                self._redis.delete(redis_key)
+        else:
+            self._redis.delete(self._key(key))
+        self._redis.publish(self.channel, "" if key is None else key)
+
+    def listen(self, on_invalidate: Callable[[Optional[str]], None]) -> None:
+        """Call on_invalidate for every invalidation published by any process."""
+        def run():
+            while True:
+                try:
+                    pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.channel)
+                    for message in pubsub.listen():
+                        data = message["data"].decode()
+                        on_invalidate(data or None)
+                except Exception:
+                    logger.exception("Cache invalidation listener failed; reconnecting")
+                    time.sleep(1)
+
+        threading.Thread(target=run, name=f"{self._prefix}-invalidation", daemon=True).start()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and single-flight loading.
+
+    Concurrent misses for the same key are coalesced: one caller runs the
+    loader while the others wait for its result. A value whose key was
+    invalidated while it loaded is returned to the waiting callers but not
+    cached, so invalidations are never undone by an older load.
+    """
+
+    def __init__(self, name: str, maxsize: int, backend: Optional[RedisCacheBackend] = None):
+        """
+        Args:
+            name: Cache name (used in logs and stats)
+            maxsize: Maximum number of entries kept in process
+            backend: Optional shared tier (Redis)
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        self._backend = backend
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        # Invalidation generations of keys being loaded (sync or async), and
+        # of the whole cache; a load only stores its value if they did not move
+        self._loading: Dict[str, int] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        # Per event loop: key -> task loading it
+        self._async_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        if backend is not None:
+            backend.listen(self._drop_local)
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for key, or None if absent or expired."""
+        value = self._get_local(key)
+        return None if value is _MISSING else value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for ttl seconds."""
+        self._set_local(key, value, ttl)
+        self._backend_call("set", key, value, ttl)
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], ttl: float) -> Any:
+        """
+        Return the cached value for key, loading and caching it on a miss.
+
+        Args:
+            key: Cache key
+            loader: Callable producing the value on a miss
+            ttl: Seconds to keep a loaded value
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        value = self._get_local(key)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.stats.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        generation = self._begin_load(key)
+        try:
+            value = self._backend_call("get", key)
+            shared = value is not None and value is not _MISSING
+            if shared:
+                self._count("shared_hits")
+            else:
+                self._count("loads")
+                value = loader()
+            if self._store_loaded(key, value, ttl, generation) and not shared:
+                self._backend_call("set", key, value, ttl)
+            flight.value = value
+            return value
+        except BaseException as e:
+            self._count("load_errors")
+            flight.error = e
+            raise
+        finally:
+            self._end_load(key)
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    async def aget_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        """
+        Async version of get_or_load.
+
+        Concurrent misses on the same event loop share one load task, which
+        keeps running even if the caller that started it is cancelled.
+
+        Args:
+            key: Cache key
+            loader: Callable returning an awaitable that produces the value
+            ttl: Seconds to keep a loaded value
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        value = self._get_local(key)
+        if value is not _MISSING:
+            return value
+
+        loop = asyncio.get_running_loop()
+        flights = self._async_inflight.setdefault(loop, {})
+        task = flights.get(key)
+        if task is None:
+            task = flights[key] = loop.create_task(self._aload(key, loader, ttl))
+            task.add_done_callback(lambda _: flights.pop(key, None))
+        else:
+            self._count("coalesced")
+        return await asyncio.shield(task)
+
+    async def _aload(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        generation = self._begin_load(key)
+        try:
+            value = await self._abackend_call("get", key)
+            shared = value is not None and value is not _MISSING
+            if shared:
+                self._count("shared_hits")
+            else:
+                self._count("loads")
+                try:
+                    value = await loader()
+                except BaseException:
+                    self._count("load_errors")
+                    raise
+            if self._store_loaded(key, value, ttl, generation) and not shared:
+                await self._abackend_call("set", key, value, ttl)
+            return value
+        finally:
+            self._end_load(key)
+
+    def invalidate(self, key: str) -> None:
+        """Remove a key from this process and the shared tier."""
+        self._drop_local(key)
+        self._backend_call("delete", key)
+
+    def clear(self) -> None:
+        """Remove every entry from this process and the shared tier."""
+        self._drop_local(None)
+        self._backend_call("delete", None)
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        """Return counters and current size as a dictionary."""
+        with self._lock:
+            size = len(self._entries)
+            counters = dict(self.stats.__dict__)
+        return {"name": self.name, "size": size, "maxsize": self.maxsize, **counters}
+
+    def _get_local(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return value
+                del self._entries[key]
+            self.stats.misses += 1
+            return _MISSING
+
+    def _set_local(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._put(key, value, ttl)
+
+    def _put(self, key: str, value: Any, ttl: float) -> None:
+        """Store a local entry (caller holds self._lock)."""
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _drop_local(self, key: Optional[str]) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._epoch += 1
+            else:
+                self._entries.pop(key, None)
+                if key in self._generations:
+                    self._generations[key] += 1
+            self.stats.invalidations += 1
+
+    def _begin_load(self, key: str) -> Tuple[int, int]:
+        """Track invalidations of key during a load; returns the current generation."""
+        with self._lock:
+            self._loading[key] = self._loading.get(key, 0) + 1
+            return self._epoch, self._generations.setdefault(key, 0)
+
+    def _store_loaded(self, key: str, value: Any, ttl: float, generation: Tuple[int, int]) -> bool:
+        """Cache a loaded value locally unless key was invalidated since the load began."""
+        with self._lock:
+            if (self._epoch, self._generations[key]) != generation:
+                return False
+            self._put(key, value, ttl)
+            return True
+
+    def _end_load(self, key: str) -> None:
+        with self._lock:
+            self._loading[key] -= 1
+            if not self._loading[key]:
+                del self._loading[key]
+                del self._generations[key]
+
+    def _count(self, counter: str) -> None:
+        """Increment a stats counter (callers may run on several threads)."""
+        with self._lock:
+            setattr(self.stats, counter, getattr(self.stats, counter) + 1)
+
+    def _backend_call(self, method: str, *args) -> Any:
+        """Call the shared tier, treating Redis failures as a miss."""
+        if self._backend is None:
+            return _MISSING
+        try:
+            return getattr(self._backend, method)(*args)
+        except Exception:
+            logger.warning("Shared cache %s.%s failed for %s", self.name, method, args[:1], exc_info=True)
+            return _MISSING
+
+    async def _abackend_call(self, method: str, *args) -> Any:
+        """_backend_call on a worker thread, so a slow Redis does not block the event loop."""
+        if self._backend is None:
+            return _MISSING
+        return await asyncio.to_thread(self._backend_call, method, *args)
@@ -0,0 +1,123 @@
+"""
+Cache of agent decisions keyed by the inputs they were based on.
+
+Two reviews with the same relevant EMR values, the same protocol (values
+and version), the same model and prompt version, on the same day, reach
+the same decision. The second one is served from this cache instead of
+running another LLM conversation. The evaluation date is part of the key
+because "months since" rules change from one day to the next.
+
+Entries are shared between patients, so only the decision and confidence
+are cached. The agent's free-text reason may name the patient it reviewed
+(the ReAct prompt includes the MRN); a request served from the cache gets
+a reason built from its own rule results instead.
+"""
+import hashlib
+import json
+from datetime import date
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.cache import RedisCacheBackend, TTLCache
+
+decision_cache = TTLCache(
+    name="ai_decisions",
+    maxsize=settings.ai_decision_cache_maxsize,
+    backend=(
+        RedisCacheBackend(settings.ai_decision_cache_redis_url, prefix="ai_decisions")
+        if settings.ai_decision_cache_redis_url else None
+    ),
+)
+
+
+class _UncacheableResult(Exception):
+    """Carries a result that must not be cached out of the cache loader."""
+
+    def __init__(self, result: Dict):
+        super().__init__("uncacheable review result")
+        self.result = result
+
+
+def decision_fingerprint(
+    snapshot: Dict,
+    model: str,
+    prompt_version: str,
+    as_of: Optional[date] = None,
+) -> str:
+    """
+    Stable hash of everything an agent decision depends on.
+
+    Args:
+        snapshot: Review snapshot from build_snapshot (clinical data and protocol)
+        model: LLM model name
+        prompt_version: Version of the agent prompt
+        as_of: Evaluation date (defaults to today)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    clinical_data = snapshot.get("clinical_data") or {}
+    a1c = (clinical_data.get("labs") or {}).get("A1c") or {}
+    key = {
+        "last_visit_date": clinical_data.get("last_visit_date"),
+        "a1c_value": a1c.get("value"),
+        "a1c_date": a1c.get("date"),
+        "protocol": snapshot.get("protocol"),
+        "model": model,
+        "prompt_version": prompt_version,
+        "as_of": (as_of or date.today()).isoformat(),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def reason_from_snapshot(snapshot: Dict) -> str:
+    """Reason for a cached decision, built from the request's own rule results."""
+    parts = [snapshot.get("reason") or "No protocol results available."]
+    if snapshot.get("escalation_reasons"):
+        parts.append("Escalated for review: " + " ".join(snapshot["escalation_reasons"]))
+    parts.append("Decision reused from an agent review of identical clinical data.")
+    return " ".join(parts)
+
+
+def get_or_review(fingerprint: str, review: Callable[[], Dict], snapshot: Dict) -> Tuple[Dict, bool]:
+    """
+    Return the cached decision for a fingerprint, running the review on a miss.
+
+    Only confident results (confidence > 0) are cached, so agent errors and
+    unparseable answers are retried next time. Concurrent reviews with the
+    same fingerprint share one review. The reviewer whose review ran gets
+    its full result; everyone else gets the cached decision and confidence
+    with a reason from reason_from_snapshot.
+
+    Args:
+        fingerprint: Key from decision_fingerprint
+        review: Callable returning a dictionary with decision, reason, confidence
+        snapshot: This request's review snapshot (for the reason of cached decisions)
+
+    Returns:
+        Tuple of the result and whether it came from the cache
+    """
+    reviewed: Optional[Dict] = None
+
+    def load() -> Dict:
+        nonlocal reviewed
+        reviewed = review()
+        if not reviewed.get("confidence"):
+            raise _UncacheableResult(reviewed)
+        # Nothing patient-specific goes into the shared entry
+        return {"decision": reviewed["decision"], "confidence": reviewed["confidence"]}
+
+    try:
+        cached = decision_cache.get_or_load(fingerprint, load, ttl=settings.ai_decision_cache_ttl)
+    except _UncacheableResult as e:
+        if e.result is not reviewed:
+            # Another request's review failed; run this one's own
+            return review(), False
+        return dict(e.result), False
+    if reviewed is not None:
+        return dict(reviewed), False
+    return {
+        "decision": cached["decision"],
+        "reason": reason_from_snapshot(snapshot),
+        "confidence": cached["confidence"],
+    }, True
@@ -0,0 +1,119 @@
+"""
+Async HTTP client for the EMR.
+
+Uses one pooled httpx.AsyncClient (keep-alive connections) per event loop
+and limits concurrent requests per EMR host, so bulk lookups can fan out
+to hundreds of patients without overwhelming the EMR.
+"""
+import asyncio
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+# Base URL used when talking to the in-process fake EMR
+FAKE_EMR_BASE_URL = "http://emr.local"
+
+
+class EMRError(Exception):
+    """Raised when the EMR returns an error or cannot be reached."""
+
+
+class EMRClient:
+    """
+    Async EMR API client.
+
+    Instances are bound to the event loop they are first used on.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        per_host_concurrency: int = 20,
+        timeout: float = 10.0,
+    ):
+        """
+        Args:
+            base_url: EMR API base URL
+            transport: Custom transport (e.g. the in-process fake EMR)
+            max_connections: Size of the HTTP connection pool
+            max_keepalive_connections: Idle connections kept open for reuse
+            per_host_concurrency: Maximum in-flight requests per EMR host
+            timeout: Request timeout in seconds
+        """
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+        )
+        self._per_host_concurrency = per_host_concurrency
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def _get_json(self, path: str) -> Dict:
+        host = urlsplit(str(self._client.base_url.join(path))).netloc
+        limit = self._host_limits.setdefault(host, asyncio.Semaphore(self._per_host_concurrency))
+        async with limit:
+            try:
+                response = await self._client.get(path)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                raise EMRError(f"EMR request {path} failed: {e}") from e
+        return response.json()
+
+    async def get_patient_data(self, mrn: str) -> Dict:
+        """Fetch patient demographics."""
+        return await self._get_json(f"/patients/{mrn}")
+
+    async def get_clinical_data(self, mrn: str) -> Dict:
+        """Fetch patient clinical data (last visit, labs)."""
+        return await self._get_json(f"/patients/{mrn}/clinical")
+
+    async def get_clinical_data_many(self, mrns: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Fetch clinical data for many patients concurrently.
+
+        Args:
+            mrns: Medical Record Numbers (duplicates are fetched once)
+
+        Returns:
+            Dictionary of MRN to clinical data
+        """
+        unique = list(dict.fromkeys(mrns))
+        results = await asyncio.gather(*(self.get_clinical_data(mrn) for mrn in unique))
+        return dict(zip(unique, results))
+
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        await self._client.aclose()
+
+
+def create_emr_client() -> EMRClient:
+    """
+    Create an EMR client from settings.
+
+    Without EMR_BASE_URL the client is wired to the in-process fake EMR.
+    """
+    if settings.emr_base_url:
+        base_url, transport = settings.emr_base_url, None
+    else:
+        from app.services.emr_fake import app as fake_emr_app
+
+        base_url, transport = FAKE_EMR_BASE_URL, httpx.ASGITransport(app=fake_emr_app)
+
+    return EMRClient(
+        base_url=base_url,
+        transport=transport,
+        max_connections=settings.emr_max_connections,
+        max_keepalive_connections=settings.emr_max_keepalive_connections,
+        per_host_concurrency=settings.emr_per_host_concurrency,
+        timeout=settings.emr_timeout,
+    )
@@ -0,0 +1,184 @@
+"""
+In-process fake of the EMR HTTP API.
+
+Serves the mock patient and clinical data used for local development and
+tests. The EMR client talks to it in-process (no network) when EMR_BASE_URL
+is not set, and it can also be run as a standalone stub server. Every
+response is delayed by settings.emr_fake_latency seconds to simulate a
+remote EMR in benchmarks:
+
+    uvicorn app.services.emr_fake:app --port 8001
+
+When settings.emr_fixtures_path points to a fixture database written by
+app/scripts/generate_synthetic_data.py, patients found there are served
+from it (dates are stored relative to today, so fixtures do not age).
+"""
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+from datetime import date, timedelta
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+app = FastAPI(title="Fake EMR")
+
+# Columns of the fixture table, in order
+FIXTURE_COLUMNS = (
+    "mrn", "first_name", "last_name", "dob",
+    "last_visit_days_ago", "a1c_value", "a1c_days_ago",
+)
+
+_fixture_connections = threading.local()
+
+
+def _fixture(mrn: str) -> Optional[Tuple]:
+    """Fixture row for an MRN, or None (one read-only connection per thread)."""
+    if not settings.emr_fixtures_path:
+        return None
+    conn = getattr(_fixture_connections, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(f"file:{settings.emr_fixtures_path}?mode=ro", uri=True)
+        _fixture_connections.conn = conn
+    return conn.execute(
+        f"SELECT {', '.join(FIXTURE_COLUMNS)} FROM emr_patients WHERE mrn = ?", (mrn,)
+    ).fetchone()
+
+
+async def _respond(mock, mrn: str) -> Dict:
+    """Delay like a remote EMR, then build the response."""
+    if settings.emr_fake_latency:
+        await asyncio.sleep(settings.emr_fake_latency)
+    if settings.emr_fixtures_path:
+        # Fixture lookups are blocking sqlite3 reads; keep them off the event loop
+        return await run_in_threadpool(mock, mrn)
+    return mock(mrn)
+
+
+@app.get("/patients/{mrn}")
+async def read_patient(mrn: str) -> Dict:
+    """Patient demographics."""
+    return await _respond(mock_patient_data, mrn)
+
+
+@app.get("/patients/{mrn}/clinical")
+async def read_clinical_data(mrn: str) -> Dict:
+    """Patient clinical data (last visit, labs)."""
+    return await _respond(mock_clinical_data, mrn)
+
+
+def mock_patient_data(mrn: str) -> Dict:
+    """
+    Mock function to retrieve patient demographics.
+    
+    Args:
+        mrn: Medical Record Number
+        
+    Returns:
+        Dictionary with patient information
+    """
+    fixture = _fixture(mrn)
+    if fixture:
+        return {"mrn": fixture[0], "first_name": fixture[1], "last_name": fixture[2], "dob": fixture[3]}
+    
+    # Mock patient data - "Deny" case
+    if mrn == "12345":
+        return {
+            "mrn": "12345",
+            "first_name": "John",
+            "last_name": "Doe",
+            "dob": "1975-04-10"
+        }
+    
+    # Mock patient data - "Approve" case
+    elif mrn == "67890":
+        return {
+            "mrn": "67890",
+            "first_name": "Jane",
+            "last_name": "Smith",
+            "dob": "1980-06-15"
+        }
+    
+    # Default mock patient
+    return {
+        "mrn": mrn,
+        "first_name": "Patient",
+        "last_name": "Unknown",
+        "dob": "1970-01-01"
+    }
+
+
+def mock_clinical_data(mrn: str) -> Dict:
+    """
+    Mock function to retrieve patient clinical data (visits, labs, etc.).
+    
+    This returns different data based on MRN to simulate different scenarios:
+    - MRN "12345": Returns data that violates protocols (DENY case)
+    - MRN "67890": Returns data that passes protocols (APPROVE case)
+    
+    Args:
+        mrn: Medical Record Number
+        
+    Returns:
+        Dictionary with clinical data including:
+        - last_visit_date: Last visit date (string YYYY-MM-DD)
+        - labs: Dictionary of lab results with values and dates
+    """
+    today = date.today()
+    
+    fixture = _fixture(mrn)
+    if fixture:
+        _, _, _, _, last_visit_days_ago, a1c_value, a1c_days_ago = fixture
+        labs = {}
+        if a1c_value is not None:
+            labs["A1c"] = {
+                "value": a1c_value,
+                "date": (today - timedelta(days=a1c_days_ago)).strftime("%Y-%m-%d")
+            }
+        return {
+            "last_visit_date": (today - timedelta(days=last_visit_days_ago)).strftime("%Y-%m-%d"),
+            "labs": labs
+        }
+    
+    # Mock clinical data for "Deny" case (MRN 12345)
+    if mrn == "12345":
+        # Last visit was more than 12 months ago
+        last_visit = today - timedelta(days=575)  # ~18.85 months
+        return {
+            "last_visit_date": last_visit.strftime("%Y-%m-%d"),
+            "labs": {
+                "A1c": {
+                    "value": 7.8,
+                    "date": (today - timedelta(days=30)).strftime("%Y-%m-%d")
+                }
+            }
+        }
+    
+    # Mock clinical data for "Approve" case (MRN 67890)
+    elif mrn == "67890":
+        # Recent visit and good A1c
+        last_visit = today - timedelta(days=60)  # ~2 months ago
+        return {
+            "last_visit_date": last_visit.strftime("%Y-%m-%d"),
+            "labs": {
+                "A1c": {
+                    "value": 6.5,
+                    "date": (today - timedelta(days=30)).strftime("%Y-%m-%d")
+                }
+            }
+        }
+    
+    # Default mock clinical data
+    return {
+        "last_visit_date": (today - timedelta(days=180)).strftime("%Y-%m-%d"),
+        "labs": {
+            "A1c": {
+                "value": 7.0,
+                "date": (today - timedelta(days=90)).strftime("%Y-%m-%d")
+            }
+        }
+    }
+
@@ -1,102 +1,158 @@
 """
-Mock EMR service for patient and clinical data.
-In production, this would connect to a real EMR system.
+EMR service for patient and clinical data.
+
+Data comes from the EMR API through the pooled async EMRClient (the
+in-process fake EMR unless EMR_BASE_URL is set). Lookups go through a
+bounded TTL cache keyed by MRN, so repeated views and protocol checks for
+the same patient do not hit the EMR again.
+
+Async callers use the `aget_*` functions and get_clinical_data_many; sync
+callers (agent tools, Celery tasks, scripts) use the plain functions, which
+run the client on a dedicated background event loop.
 """
-from typing import Dict
-from datetime import date, datetime, timedelta
+import asyncio
+import threading
+import weakref
+from typing import Dict, Iterable, Optional
 
+from app.core.config import settings
+from app.core.metrics import observe_stage
+from app.services.cache import RedisCacheBackend, TTLCache
+from app.services.emr_client import EMRClient, create_emr_client
 
-def get_patient_data(mrn: str) -> Dict:
+emr_cache = TTLCache(
+    name="emr",
+    maxsize=settings.emr_cache_maxsize,
+    backend=RedisCacheBackend(settings.emr_cache_redis_url, prefix="emr") if settings.emr_cache_redis_url else None,
+)
+
+# One pooled client per event loop (httpx clients are loop-bound)
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, EMRClient]" = weakref.WeakKeyDictionary()
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def get_emr_client() -> EMRClient:
+    """Return the EMR client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = create_emr_client()
+    return client
+
+
+async def close_emr_client() -> None:
+    """Close the EMR client of the running event loop (app shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _run_sync(coro):
+    """Run a coroutine on the background EMR loop and wait for its result."""
+    global _sync_loop
+    if _sync_loop is None:
+        with _sync_loop_lock:
+            if _sync_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="emr-client", daemon=True).start()
+                _sync_loop = loop
+    return asyncio.run_coroutine_threadsafe(coro, _sync_loop).result()
+
+
+async def _fetch_patient_data(mrn: str) -> Dict:
+    with observe_stage("emr.patient"):
+        return await get_emr_client().get_patient_data(mrn)
+
+
+async def _fetch_clinical_data(mrn: str) -> Dict:
+    with observe_stage("emr.clinical"):
+        return await get_emr_client().get_clinical_data(mrn)
+
+
+async def aget_patient_data(mrn: str) -> Dict:
     """
-    Mock function to retrieve patient demographics.
-    
+    Retrieve patient demographics (cached for settings.emr_patient_ttl seconds).
+
     Args:
         mrn: Medical Record Number
-        
+
     Returns:
-        Dictionary with patient information
+        Dictionary with patient information (mrn, first_name, last_name, dob)
     """
-    # Mock patient data - "Deny" case
-    if mrn == "12345":
-        return {
-            "mrn": "12345",
-            "first_name": "John",
-            "last_name": "Doe",
-            "dob": "1975-04-10"
-        }
-    
-    # Mock patient data - "Approve" case
-    elif mrn == "67890":
-        return {
-            "mrn": "67890",
-            "first_name": "Jane",
-            "last_name": "Smith",
-            "dob": "1980-06-15"
-        }
-    
-    # Default mock patient
-    return {
-        "mrn": mrn,
-        "first_name": "Patient",
-        "last_name": "Unknown",
-        "dob": "1970-01-01"
-    }
+    if not settings.emr_cache_enabled:
+        return await _fetch_patient_data(mrn)
+    return await emr_cache.aget_or_load(
+        f"patient:{mrn}", lambda: _fetch_patient_data(mrn), ttl=settings.emr_patient_ttl
+    )
 
 
-def get_patient_clinical_data(mrn: str) -> Dict:
+async def aget_patient_clinical_data(mrn: str) -> Dict:
     """
-    Mock function to retrieve patient clinical data (visits, labs, etc.).
-    
-    This returns different data based on MRN to simulate different scenarios:
-    - MRN "12345": Returns data that violates protocols (DENY case)
-    - MRN "67890": Returns data that passes protocols (APPROVE case)
-    
+    Retrieve patient clinical data (cached for settings.emr_clinical_ttl seconds).
+
     Args:
         mrn: Medical Record Number
-        
+
     Returns:
         Dictionary with clinical data including:
         - last_visit_date: Last visit date (string YYYY-MM-DD)
         - labs: Dictionary of lab results with values and dates
     """
-    today = date.today()
-    
-    # Mock clinical data for "Deny" case (MRN 12345)
-    if mrn == "12345":
-        # Last visit was more than 12 months ago
-        last_visit = today - timedelta(days=575)  # ~18.85 months
-        return {
-            "last_visit_date": last_visit.strftime("%Y-%m-%d"),
-            "labs": {
-                "A1c": {
-                    "value": 7.8,
-                    "date": (today - timedelta(days=30)).strftime("%Y-%m-%d")
-                }
-            }
-        }
-    
-    # Mock clinical data for "Approve" case (MRN 67890)
-    elif mrn == "67890":
-        # Recent visit and good A1c
-        last_visit = today - timedelta(days=60)  # ~2 months ago
-        return {
-            "last_visit_date": last_visit.strftime("%Y-%m-%d"),
-            "labs": {
-                "A1c": {
-                    "value": 6.5,
-                    "date": (today - timedelta(days=30)).strftime("%Y-%m-%d")
-                }
-            }
-        }
-    
-    # Default mock clinical data
-    return {
-        "last_visit_date": (today - timedelta(days=180)).strftime("%Y-%m-%d"),
-        "labs": {
-            "A1c": {
-                "value": 7.0,
-                "date": (today - timedelta(days=90)).strftime("%Y-%m-%d")
-            }
-        }
-    }
+    if not settings.emr_cache_enabled:
+        return await _fetch_clinical_data(mrn)
+    return await emr_cache.aget_or_load(
+        f"clinical:{mrn}", lambda: _fetch_clinical_data(mrn), ttl=settings.emr_clinical_ttl
+    )
+
+
+async def get_clinical_data_many(mrns: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Retrieve clinical data for many patients concurrently.
+
+    Cached patients are served from the cache; the rest are fetched in
+    parallel, bounded by the client's per-host concurrency limit.
+
+    Args:
+        mrns: Medical Record Numbers (duplicates are fetched once)
+
+    Returns:
+        Dictionary of MRN to clinical data
+    """
+    unique = list(dict.fromkeys(mrns))
+    results = await asyncio.gather(*(aget_patient_clinical_data(mrn) for mrn in unique))
+    return dict(zip(unique, results))
+
+
+def get_patient_data(mrn: str) -> Dict:
+    """Sync version of aget_patient_data."""
+    if not settings.emr_cache_enabled:
+        return _run_sync(_fetch_patient_data(mrn))
+    return emr_cache.get_or_load(
+        f"patient:{mrn}", lambda: _run_sync(_fetch_patient_data(mrn)), ttl=settings.emr_patient_ttl
+    )
+
+
+def get_patient_clinical_data(mrn: str) -> Dict:
+    """Sync version of aget_patient_clinical_data."""
+    if not settings.emr_cache_enabled:
+        return _run_sync(_fetch_clinical_data(mrn))
+    return emr_cache.get_or_load(
+        f"clinical:{mrn}", lambda: _run_sync(_fetch_clinical_data(mrn)), ttl=settings.emr_clinical_ttl
+    )
+
+
+def invalidate_patient(mrn: str) -> None:
+    """Drop cached demographics and clinical data for a patient (all workers)."""
+    emr_cache.invalidate(f"patient:{mrn}")
+    emr_cache.invalidate(f"clinical:{mrn}")
+
+
+def clear_emr_cache() -> None:
+    """Drop all cached EMR data (all workers)."""
+    emr_cache.clear()
+
 
+def get_emr_cache_stats() -> Dict:
+    """Return hit/miss counters for the EMR cache of this process."""
+    return emr_cache.snapshot_stats()
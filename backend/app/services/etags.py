@@ -0,0 +1,59 @@
+"""
+ETags for conditional GETs of the refill queue and refill details.
+
+Tags are computed from version values that are cheap to read, so a
+matching If-None-Match can be answered with 304 before the response is
+built:
+- detail: the request's updated_at, its protocol's version, when its
+  EMR snapshot was captured and its review claim
+- queue: a per-process nonce plus the process's refill change counter
+  (refill_events.change_count), the protocol registry version and the page
+
+Tags are weak (W/"...") because proxies may re-encode the JSON body.
+"""
+import hashlib
+import uuid
+from datetime import datetime
+from typing import Optional
+
+# Change counters are per process and restart from zero, so tags carry a
+# nonce to never match a tag issued by another worker or before a restart
+PROCESS_NONCE = uuid.uuid4().hex[:12]
+
+# Responses contain PHI: only the browser may store them, and it must revalidate
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag from version values."""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def detail_etag(
+    request_id: int,
+    updated_at: datetime,
+    protocol_version: int,
+    snapshot_at: Optional[datetime],
+    claimed_by: Optional[str] = None,
+    claim_expires_at: Optional[datetime] = None,
+) -> str:
+    """ETag of a refill detail served from its EMR snapshot."""
+    return make_etag(
+        "detail", request_id, updated_at.isoformat(), protocol_version, snapshot_at, claimed_by, claim_expires_at
+    )
+
+
+def queue_etag(change_count: int, registry_version: int, limit: int, after: Optional[str]) -> str:
+    """ETag of one queue page at a change count."""
+    return make_etag("queue", PROCESS_NONCE, change_count, registry_version, limit, after)
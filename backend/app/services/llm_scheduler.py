@@ -0,0 +1,301 @@
+"""
+Scheduler for LLM calls: shared rate limit, concurrency cap, priorities
+and backpressure.
+
+Every LLM call takes a slot first. A slot needs a token from a bucket
+refilled at settings.llm_requests_per_minute (so bursts stay under the
+provider's per-minute quota) and one of settings.llm_max_concurrency
+in-flight places. Callers that cannot get a slot within
+settings.llm_queue_timeout, or that find settings.llm_max_queue callers
+already waiting in their process, get LLMBackpressureError with a retry
+hint instead of a response, so a saturated LLM never turns into denials.
+
+In process, waiting callers are served by priority, then arrival order.
+With settings.llm_scheduler_redis_url the bucket and the in-flight leases
+live in Redis and are updated atomically by a Lua script, so every API and
+worker process shares one budget. There is no global queue across
+processes: instead the last settings.llm_urgent_reserve tokens can only be
+taken by urgent calls, and urgent callers poll more often. If Redis is
+unreachable, calls get LLMBackpressureError rather than failing the review.
+"""
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.core.config import settings
+from app.core.metrics import observe_stage_seconds
+
+logger = logging.getLogger(__name__)
+
+# Seconds to back off while the Redis limiter is unreachable
+LIMITER_UNAVAILABLE_RETRY_AFTER = 5.0
+
+# Lower value is served first
+PRIORITIES = {"urgent": 0, "normal": 1}
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default="normal")
+
+
+class LLMBackpressureError(Exception):
+    """The LLM has no capacity for this call now; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def llm_priority(priority: str) -> Iterator[None]:
+    """Run LLM calls made inside the block with this priority ('urgent' or 'normal')."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class LocalLimiter:
+    """In-process token bucket and concurrency cap with a priority queue."""
+
+    def __init__(self, requests_per_minute: Optional[float], burst: int, max_concurrency: int):
+        self.rate = requests_per_minute / 60.0 if requests_per_minute else None  # tokens per second
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._waiters = []  # heap of (priority, arrival)
+        self._arrivals = itertools.count()
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def retry_after(self) -> float:
+        """Seconds until the callers waiting now have likely been served."""
+        if not self.rate:
+            return 1.0
+        return round((len(self._waiters) + 1) / self.rate, 3)
+
+    def acquire(self, priority: int, deadline: float) -> None:
+        """Block until a slot is free (in priority order) or raise at the deadline."""
+        with self._cond:
+            entry = (priority, next(self._arrivals))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    has_token = not self.rate or self._tokens >= 1
+                    if self._waiters[0] == entry and has_token and self._in_flight < self.max_concurrency:
+                        heapq.heappop(self._waiters)
+                        if self.rate:
+                            self._tokens -= 1
+                        self._in_flight += 1
+                        # The next waiter may be able to go too
+                        self._cond.notify_all()
+                        return
+                    if now >= deadline:
+                        raise LLMBackpressureError(
+                            "Timed out waiting for LLM capacity", retry_after=self.retry_after()
+                        )
+                    wait = deadline - now
+                    if not has_token:
+                        wait = min(wait, (1 - self._tokens) / self.rate)
+                    self._cond.wait(wait)
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                raise
+
+    def release(self, lease: Optional[str] = None) -> None:
+        """Return a slot."""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+
+# KEYS: bucket hash, lease sorted set
+# ARGV: tokens per ms, burst, max concurrency, urgent reserve, lease id, lease ttl ms, urgent (0/1)
+# Returns 0 when the lease was taken, ms until enough tokens, or -1 when all slots are in use
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or burst)
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or now)
+if rate > 0 then
+    tokens = math.min(burst, tokens + (now - updated) * rate)
+end
+local needed = 1
+if ARGV[7] == '0' then
+    needed = 1 + tonumber(ARGV[4])
+end
+local wait = 0
+if rate > 0 and tokens < needed then
+    wait = math.ceil((needed - tokens) / rate)
+elseif redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[3]) then
+    wait = -1
+else
+    if rate > 0 then
+        tokens = tokens - 1
+    end
+    redis.call('ZADD', KEYS[2], now + tonumber(ARGV[6]), ARGV[5])
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], 3600000)
+return wait
+"""
+
+# Seconds between attempts while every slot is in use
+_SLOT_POLL = {0: 0.05, 1: 0.2}
+
+
+class RedisLimiter:
+    """Token bucket and concurrency cap shared by all processes through Redis."""
+
+    def __init__(
+        self,
+        url: str,
+        requests_per_minute: Optional[float],
+        burst: int,
+        max_concurrency: int,
+        urgent_reserve: int,
+        lease_ttl: float,
+        prefix: str = "llm_scheduler",
+    ):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._redis_errors = redis.RedisError
+        self._acquire = self._redis.register_script(_ACQUIRE_SCRIPT)
+        self._keys = [f"{prefix}:bucket", f"{prefix}:leases"]
+        self.rate = requests_per_minute / 60.0 if requests_per_minute else None
+        self._args = [
+            (requests_per_minute or 0) / 60000.0,
+            burst,
+            max_concurrency,
+            urgent_reserve,
+        ]
+        self._lease_ttl_ms = int(lease_ttl * 1000)
+
+    def retry_after(self) -> float:
+        """Seconds until a token is likely available to a normal call."""
+        return round(1 / self.rate, 3) if self.rate else 1.0
+
+    def acquire(self, priority: int, deadline: float) -> str:
+        """Poll Redis until a slot is taken or raise at the deadline. Returns the lease id."""
+        lease = uuid.uuid4().hex
+        urgent = priority == PRIORITIES["urgent"]
+        while True:
+            try:
+                wait_ms = int(self._acquire(
+                    keys=self._keys,
+                    args=[*self._args, lease, self._lease_ttl_ms, 1 if urgent else 0],
+                ))
+            except self._redis_errors as e:
+                raise LLMBackpressureError(
+                    f"LLM scheduler unavailable: {e}", retry_after=LIMITER_UNAVAILABLE_RETRY_AFTER
+                ) from e
+            if wait_ms == 0:
+                return lease
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                retry_after = wait_ms / 1000 if wait_ms > 0 else self.retry_after()
+                raise LLMBackpressureError("Timed out waiting for LLM capacity", retry_after=retry_after)
+            wait = wait_ms / 1000 if wait_ms > 0 else _SLOT_POLL.get(priority, 0.2)
+            # Jitter so processes waiting on the same token do not all retry at once
+            time.sleep(min(remaining, wait + random.uniform(0, 0.05 if urgent else 0.2)))
+
+    def release(self, lease: str) -> None:
+        """Return a slot (if Redis is unreachable, the lease expires after its TTL)."""
+        try:
+            self._redis.zrem(self._keys[1], lease)
+        except self._redis_errors:
+            logger.warning("Could not release LLM lease %s; it expires after its TTL", lease, exc_info=True)
+
+
+class LLMScheduler:
+    """Admits LLM calls through a limiter, bounding the number of waiting callers."""
+
+    def __init__(self, limiter, max_queue: int):
+        self.limiter = limiter
+        self.max_queue = max_queue
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Hold an LLM slot for the duration of the block.
+
+        Args:
+            priority: 'urgent' or 'normal' (defaults to the llm_priority context)
+            timeout: Seconds to wait for a slot (defaults to settings.llm_queue_timeout)
+
+        Raises:
+            LLMBackpressureError: If too many callers are waiting or no slot
+                became free in time
+        """
+        priority = PRIORITIES[priority or _priority.get()]
+        timeout = settings.llm_queue_timeout if timeout is None else timeout
+
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                observe_stage_seconds("llm_queue", 0.0, error=True)
+                raise LLMBackpressureError("LLM queue is full", retry_after=self.limiter.retry_after())
+            self._waiting += 1
+
+        started = time.perf_counter()
+        try:
+            lease = self.limiter.acquire(priority, time.monotonic() + timeout)
+        except LLMBackpressureError:
+            observe_stage_seconds("llm_queue", time.perf_counter() - started, error=True)
+            raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        observe_stage_seconds("llm_queue", time.perf_counter() - started)
+
+        try:
+            yield
+        finally:
+            self.limiter.release(lease)
+
+
+def create_llm_scheduler() -> LLMScheduler:
+    """Build the scheduler from settings (shared through Redis when configured)."""
+    if settings.llm_scheduler_redis_url:
+        limiter = RedisLimiter(
+            settings.llm_scheduler_redis_url,
+            requests_per_minute=settings.llm_requests_per_minute,
+            burst=settings.llm_burst,
+            max_concurrency=settings.llm_max_concurrency,
+            urgent_reserve=settings.llm_urgent_reserve,
+            lease_ttl=settings.llm_lease_ttl,
+        )
+    else:
+        limiter = LocalLimiter(
+            requests_per_minute=settings.llm_requests_per_minute,
+            burst=settings.llm_burst,
+            max_concurrency=settings.llm_max_concurrency,
+        )
+    return LLMScheduler(limiter, max_queue=settings.llm_max_queue)
+
+
+llm_scheduler = create_llm_scheduler()
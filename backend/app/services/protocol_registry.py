@@ -0,0 +1,140 @@
+"""
+Process-local registry of medication protocols.
+
+Protocols change rarely but are read on every protocol check, so each
+process keeps an immutable snapshot of all MedicationProtocol rows keyed
+by medication class and id. Lookups never touch the database; the snapshot
+is reloaded when:
+- a protocol is changed through the API in this process,
+- PostgreSQL sends a `medication_protocols_changed` notification (emitted
+  by a trigger on every change, from any writer), or
+- an unknown medication class is requested and the last load is older than
+  settings.protocol_registry_miss_reload_interval.
+"""
+import logging
+import select as select_module
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import MedicationProtocol
+from app.schemas import MedicationProtocolRead
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "medication_protocols_changed"
+
+
+class ProtocolRegistry:
+    """In-memory, versioned snapshot of all medication protocols."""
+
+    def __init__(self):
+        self._by_class: Dict[str, MedicationProtocolRead] = {}
+        self._by_id: Dict[int, MedicationProtocolRead] = {}
+        self._version = 0
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._listener_started = False
+
+    @property
+    def version(self) -> int:
+        """Registry version, incremented whenever the loaded protocols change."""
+        self._ensure_loaded()
+        return self._version
+
+    def get(self, medication_class: str) -> Optional[MedicationProtocolRead]:
+        """Return the protocol for a medication class, or None if there is none."""
+        self._ensure_loaded()
+        protocol = self._by_class.get(medication_class)
+        if protocol is None and self._miss_reload_due():
+            self.load()
+            protocol = self._by_class.get(medication_class)
+        return protocol
+
+    def get_by_id(self, protocol_id: int) -> Optional[MedicationProtocolRead]:
+        """Return a protocol by id, or None if there is none."""
+        self._ensure_loaded()
+        protocol = self._by_id.get(protocol_id)
+        if protocol is None and self._miss_reload_due():
+            self.load()
+            protocol = self._by_id.get(protocol_id)
+        return protocol
+
+    def all(self) -> List[MedicationProtocolRead]:
+        """Return all protocols ordered by id."""
+        self._ensure_loaded()
+        return [self._by_id[key] for key in sorted(self._by_id)]
+
+    def load(self) -> None:
+        """Reload all protocols from the database (one SELECT)."""
+        from app.core.db import engine
+
+        with Session(engine) as session:
+            rows = session.exec(select(MedicationProtocol).order_by(MedicationProtocol.id)).all()
+            protocols = [MedicationProtocolRead.model_validate(row) for row in rows]
+
+        by_id = {p.id: p for p in protocols}
+        by_class: Dict[str, MedicationProtocolRead] = {}
+        for protocol in protocols:
+            # Lowest id wins if a class has several rows
+            by_class.setdefault(protocol.medication_class, protocol)
+
+        with self._lock:
+            if by_id != self._by_id:
+                self._version += 1
+            # Swap whole dicts so readers never see a partial update
+            self._by_id = by_id
+            self._by_class = by_class
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded_at is None:
+            with self._lock:
+                loaded = self._loaded_at is not None
+            if not loaded:
+                self.load()
+                self._start_listener()
+
+    def _miss_reload_due(self) -> bool:
+        return time.monotonic() - (self._loaded_at or 0) > settings.protocol_registry_miss_reload_interval
+
+    def _start_listener(self) -> None:
+        """Reload on PostgreSQL notifications (no-op for other databases)."""
+        from app.core.db import engine
+
+        with self._lock:
+            if self._listener_started or engine.dialect.name != "postgresql":
+                return
+            self._listener_started = True
+
+        threading.Thread(target=self._listen, name="protocol-registry-listener", daemon=True).start()
+
+    def _listen(self) -> None:
+        import psycopg2
+        from app.core.db import engine
+
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            try:
+                conn = psycopg2.connect(dsn)
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # Changes may have been missed while (re)connecting
+                self.load()
+                while True:
+                    if select_module.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self.load()
+            except Exception:
+                logger.exception("Protocol registry listener failed; reconnecting")
+                time.sleep(5)
+
+
+protocol_registry = ProtocolRegistry()
@@ -0,0 +1,172 @@
+"""
+Deterministic protocol rules engine.
+
+Evaluates MedicationProtocol rules against EMR clinical data. This is the
+single source of truth for rule logic: the ProtocolCheckTool relays its
+result to the agent, and the rules-first review path uses it to decide
+clear-cut requests without calling the LLM.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+# Average days per month used for all "months since" calculations
+DAYS_PER_MONTH = 30.4
+
+
+@dataclass
+class RuleResult:
+    """Outcome of a single protocol rule."""
+    rule: str
+    label: str
+    emr_data: str
+    passed: Optional[bool]  # None when the EMR data needed is missing
+    # Set whenever the rule contributes to a Deny (including missing data)
+    violation: Optional[str] = None
+    borderline: bool = False
+
+
+@dataclass
+class ProtocolEvaluation:
+    """Outcome of evaluating all rules of a protocol for one patient."""
+    decision: str
+    reason: str
+    results: List[RuleResult] = field(default_factory=list)
+    # Why the result should not be trusted without the agent (empty if conclusive)
+    escalation_reasons: List[str] = field(default_factory=list)
+
+    @property
+    def conclusive(self) -> bool:
+        """True when the rules alone are enough to decide."""
+        return not self.escalation_reasons
+
+
+def months_since(date_str: str, today: Optional[date] = None) -> float:
+    """Return the number of months between a YYYY-MM-DD date and today."""
+    today = today or date.today()
+    value = datetime.strptime(date_str, "%Y-%m-%d").date()
+    return (today - value).days / DAYS_PER_MONTH
+
+
+def evaluate_protocol(protocol, emr_data: Dict, today: Optional[date] = None) -> ProtocolEvaluation:
+    """
+    Evaluate protocol rules against patient clinical data.
+
+    A Deny is conclusive as soon as one rule clearly fails. An Approve is
+    conclusive only when every rule clearly passes; missing data or values
+    within the configured margin of a threshold escalate instead.
+
+    Args:
+        protocol: MedicationProtocol (or any object with the same rule fields)
+        emr_data: Clinical data as returned by the EMR service
+        today: Reference date (defaults to today)
+
+    Returns:
+        ProtocolEvaluation with decision, reason and per-rule results
+    """
+    results: List[RuleResult] = []
+    escalations: List[str] = []
+
+    a1c = emr_data.get("labs", {}).get("A1c", {})
+
+    # Rule 1: Check max_months_since_visit
+    if protocol.max_months_since_visit is not None:
+        label = f"Last Visit < {protocol.max_months_since_visit}mo"
+        last_visit_str = emr_data.get("last_visit_date")
+        if last_visit_str:
+            months = months_since(last_visit_str, today)
+            passed = months <= protocol.max_months_since_visit
+            results.append(RuleResult(
+                rule="max_months_since_visit",
+                label=label,
+                emr_data=f"{months:.1f} months",
+                passed=passed,
+                violation=None if passed else (
+                    f"Patient last visit was {months:.1f} months ago. "
+                    f"Protocol violation (max {protocol.max_months_since_visit})."
+                ),
+                borderline=abs(months - protocol.max_months_since_visit) <= settings.rules_months_margin,
+            ))
+        else:
+            results.append(RuleResult(
+                rule="max_months_since_visit", label=label, emr_data="No visit data", passed=None
+            ))
+            escalations.append("No last visit date in EMR data.")
+
+    # Rule 2: Check max_a1c_value
+    if protocol.max_a1c_value is not None:
+        label = f"A1c < {protocol.max_a1c_value}"
+        a1c_value = a1c.get("value")
+        if a1c_value is not None:
+            passed = a1c_value <= protocol.max_a1c_value
+            results.append(RuleResult(
+                rule="max_a1c_value",
+                label=label,
+                emr_data=str(a1c_value),
+                passed=passed,
+                violation=None if passed else (
+                    f"Patient A1c ({a1c_value}) exceeds protocol maximum ({protocol.max_a1c_value})."
+                ),
+                borderline=abs(a1c_value - protocol.max_a1c_value) <= settings.rules_a1c_margin,
+            ))
+        else:
+            results.append(RuleResult(
+                rule="max_a1c_value", label=label, emr_data="No A1c data", passed=None
+            ))
+            escalations.append("No A1c value in EMR data.")
+
+    # Rule 3: Check require_recent_a1c
+    if protocol.require_recent_a1c is not None:
+        label = f"A1c within {protocol.require_recent_a1c}mo"
+        a1c_date_str = a1c.get("date")
+        if a1c_date_str:
+            months = months_since(a1c_date_str, today)
+            passed = months <= protocol.require_recent_a1c
+            results.append(RuleResult(
+                rule="require_recent_a1c",
+                label=label,
+                emr_data=f"{months:.1f} months ago",
+                passed=passed,
+                violation=None if passed else (
+                    f"Patient A1c is {months:.1f} months old. "
+                    f"Protocol requires A1c within {protocol.require_recent_a1c} months."
+                ),
+                borderline=abs(months - protocol.require_recent_a1c) <= settings.rules_months_margin,
+            ))
+        else:
+            results.append(RuleResult(
+                rule="require_recent_a1c",
+                label=label,
+                emr_data="No A1c date",
+                passed=None,
+                violation="No A1c lab result found. Protocol requires recent A1c.",
+            ))
+            escalations.append("No A1c date in EMR data.")
+
+    # Make decision
+    violations = [r.violation for r in results if r.violation]
+    if violations:
+        decision = "Deny"
+        reason = " | ".join(violations)
+    else:
+        decision = "Approve"
+        reason = "All protocols passed."
+
+    # A clear failure decides on its own; anything else needs every rule to be clear
+    clear_failure = any(r.passed is False and not r.borderline for r in results)
+    if not clear_failure:
+        escalations.extend(
+            f"{r.label} is within the borderline margin ({r.emr_data})."
+            for r in results if r.borderline
+        )
+    else:
+        escalations = []
+
+    return ProtocolEvaluation(
+        decision=decision,
+        reason=reason,
+        results=results,
+        escalation_reasons=escalations,
+    )
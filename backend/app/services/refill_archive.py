@@ -0,0 +1,133 @@
+"""
+Archive of reviewed refill requests.
+
+refill_requests is the working table: pending requests, plus requests
+reviewed in the last settings.archive_after_hours. Older reviewed
+requests are moved to refill_requests_archive in batches, so the working
+table and its indexes stay small however much history accumulates.
+
+On PostgreSQL the archive is range-partitioned by month of reviewed_at.
+Partitions are created here before rows are moved into them, and old
+months can be detached or dropped without touching the others.
+
+Archived rows keep their id. Readers that do not find an id in
+refill_requests look it up in the archive.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Set
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import observe_stage
+from app.models import REVIEWED_STATUSES, ArchivedRefillRequest, RefillRequest
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_TABLE = ArchivedRefillRequest.__tablename__
+# Both tables have the same columns
+ARCHIVE_COLUMNS = [column.name for column in ArchivedRefillRequest.__table__.columns]
+
+# Partitions this process knows exist
+_partitions: Set[date] = set()
+
+
+def month_start(value: datetime) -> date:
+    """First day of the month of a timestamp."""
+    return date(value.year, value.month, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the archive partition for a month."""
+    return f"{ARCHIVE_TABLE}_{month:%Y_%m}"
+
+
+def ensure_partitions(conn: Connection, reviewed_at: Iterable[datetime]) -> None:
+    """Create the monthly archive partitions these timestamps fall in (PostgreSQL only)."""
+    months = {month_start(value) for value in reviewed_at} - _partitions
+    if not months:
+        return
+    # Concurrent archivers would race on CREATE TABLE IF NOT EXISTS
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": ARCHIVE_TABLE})
+    for month in sorted(months):
+        next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {ARCHIVE_TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        ))
+    _partitions.update(months)
+
+
+def archive_batch(cutoff: datetime, batch_size: int) -> int:
+    """
+    Move one batch of requests reviewed before cutoff to the archive.
+
+    Rows are copied and deleted in one transaction. Rows locked by another
+    transaction are skipped, so concurrent archivers do not block each other.
+
+    Args:
+        cutoff: Move requests reviewed before this time
+        batch_size: Maximum number of requests to move
+
+    Returns:
+        Number of requests moved
+    """
+    hot = RefillRequest.__table__
+    with observe_stage("archive"), engine.begin() as conn:
+        rows = conn.execute(
+            select(hot.c.id, hot.c.reviewed_at)
+            .where(hot.c.reviewed_at < cutoff, hot.c.status.in_(REVIEWED_STATUSES))
+            .order_by(hot.c.reviewed_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            return 0
+        if conn.dialect.name == "postgresql":
+            ensure_partitions(conn, [reviewed_at for _, reviewed_at in rows])
+        ids = [request_id for request_id, _ in rows]
+        conn.execute(
+            insert(ArchivedRefillRequest.__table__).from_select(
+                ARCHIVE_COLUMNS,
+                select(*(hot.c[name] for name in ARCHIVE_COLUMNS)).where(hot.c.id.in_(ids)),
+            )
+        )
+        conn.execute(delete(hot).where(hot.c.id.in_(ids)))
+    return len(ids)
+
+
+def archive_reviewed_requests(
+    older_than_hours: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None,
+) -> int:
+    """
+    Move requests reviewed more than older_than_hours ago to the archive.
+
+    Args:
+        older_than_hours: Defaults to settings.archive_after_hours
+        batch_size: Requests per transaction (default settings.archive_batch_size)
+        max_batches: Stop after this many batches (default
+            settings.archive_max_batches; 0 for no limit)
+
+    Returns:
+        Number of requests moved
+    """
+    hours = settings.archive_after_hours if older_than_hours is None else older_than_hours
+    batch_size = batch_size or settings.archive_batch_size
+    max_batches = settings.archive_max_batches if max_batches is None else max_batches
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+
+    moved = batches = 0
+    while not max_batches or batches < max_batches:
+        count = archive_batch(cutoff, batch_size)
+        moved += count
+        batches += 1
+        if count < batch_size:
+            break
+    if moved:
+        logger.info("Archived %s reviewed refill requests (reviewed before %s)", moved, cutoff.isoformat())
+    return moved
@@ -0,0 +1,185 @@
+"""
+Review claims: short leases that reserve a pending refill request for one
+reviewer.
+
+Reviewers claim requests pending human review before deciding them,
+either the next ones in queue order (claim_next) or a specific one, e.g.
+when opening its detail page (claim_request). claim_next locks candidate
+rows with FOR UPDATE SKIP LOCKED, so concurrent reviewers are handed
+different requests without waiting on each other. A claim lasts
+settings.claim_lease_seconds; claiming again renews it, and an expired
+claim can be taken by anyone. Reviews are only accepted from the reviewer
+holding the claim (check_can_review), so two reviewers never decide the
+same request.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.models import REVIEWED_STATUSES, RefillRequest, RefillStatus
+from app.services.refill_queue import QUEUE_STATUS, queue_rank
+
+
+class ClaimConflict(Exception):
+    """Raised when a request cannot be claimed or reviewed by a reviewer."""
+
+    def __init__(self, message: str, claimed_by: Optional[str] = None):
+        super().__init__(message)
+        self.claimed_by = claimed_by
+
+
+def active_claim_holder(request, now: Optional[datetime] = None) -> Optional[str]:
+    """Reviewer holding an unexpired claim on the request, if any."""
+    now = now or datetime.utcnow()
+    if request.claimed_by and request.claim_expires_at and request.claim_expires_at > now:
+        return request.claimed_by
+    return None
+
+
+def check_can_review(request, user_id: str, now: Optional[datetime] = None) -> None:
+    """
+    Check that a reviewer may decide a request.
+
+    Args:
+        request: RefillRequest (or a row with status, claimed_by, claim_expires_at)
+        user_id: Reviewer ID
+
+    Raises:
+        ClaimConflict: If the request was already reviewed, or the reviewer
+            does not hold an unexpired claim on it
+    """
+    if request.status in REVIEWED_STATUSES:
+        raise ClaimConflict(f"Refill request was already reviewed ({request.status.value})")
+    holder = active_claim_holder(request, now)
+    if holder is None:
+        raise ClaimConflict("Claim the refill request before reviewing it")
+    if holder != user_id:
+        raise ClaimConflict(f"Refill request is claimed by {holder}", claimed_by=holder)
+
+
+def _claimable(user_id: str, now: datetime):
+    """Unclaimed, expired, or already claimed by this reviewer."""
+    return or_(
+        RefillRequest.claim_expires_at.is_(None),
+        RefillRequest.claim_expires_at <= now,
+        RefillRequest.claimed_by == user_id,
+    )
+
+
+async def claim_next(session: AsyncSession, user_id: str, limit: int) -> List[int]:
+    """
+    Claim the next requests of the human review queue and commit.
+
+    Requests the reviewer already holds count towards the limit and are
+    renewed, so calling again after a reload returns the same work.
+
+    Args:
+        session: Async database session
+        user_id: Reviewer ID
+        limit: Maximum number of requests to claim
+
+    Returns:
+        IDs of the claimed requests, in queue order
+    """
+    now = datetime.utcnow()
+    candidates = list((await session.exec(
+        select(RefillRequest.id)
+        .where(RefillRequest.status == QUEUE_STATUS, _claimable(user_id, now))
+        .order_by(queue_rank, RefillRequest.created_at, RefillRequest.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )).all())
+    if not candidates:
+        await session.commit()
+        return []
+    # Re-check on update for databases without row locks (SQLite): a
+    # candidate may have been claimed, or claimed and reviewed, meanwhile
+    claimed = set((await session.execute(
+        update(RefillRequest)
+        .where(RefillRequest.id.in_(candidates), RefillRequest.status == QUEUE_STATUS, _claimable(user_id, now))
+        .values(claimed_by=user_id, claim_expires_at=now + timedelta(seconds=settings.claim_lease_seconds))
+        .returning(RefillRequest.id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all())
+    await session.commit()
+    return [request_id for request_id in candidates if request_id in claimed]
+
+
+async def claim_request(session: AsyncSession, request_id: int, user_id: str) -> Optional[RefillRequest]:
+    """
+    Claim one request pending human review, or renew the reviewer's claim
+    on it, and commit.
+
+    Like claim_next, requests still awaiting the AI review cannot be
+    claimed: they are not in the queue yet and have no recommendation to
+    review.
+
+    Args:
+        session: Async database session
+        request_id: ID of the RefillRequest
+        user_id: Reviewer ID
+
+    Returns:
+        The claimed request, or None if it is not in refill_requests
+
+    Raises:
+        ClaimConflict: If the request is awaiting AI review, was already
+            reviewed, or another reviewer holds an unexpired claim
+    """
+    request = (await session.exec(
+        select(RefillRequest).where(RefillRequest.id == request_id).with_for_update()
+    )).first()
+    if request is None:
+        return None
+    if request.status == RefillStatus.PENDING_AI_REVIEW:
+        raise ClaimConflict("Refill request is awaiting AI review")
+    if request.status in REVIEWED_STATUSES:
+        raise ClaimConflict(f"Refill request was already reviewed ({request.status.value})")
+    holder = active_claim_holder(request)
+    if holder is not None and holder != user_id:
+        raise ClaimConflict(f"Refill request is claimed by {holder}", claimed_by=holder)
+
+    request.claimed_by = user_id
+    request.claim_expires_at = datetime.utcnow() + timedelta(seconds=settings.claim_lease_seconds)
+    session.add(request)
+    await session.commit()
+    return request
+
+
+async def release_claim(session: AsyncSession, request_id: int, user_id: str) -> Optional[bool]:
+    """
+    Give up the reviewer's claim on a request and commit.
+
+    Args:
+        session: Async database session
+        request_id: ID of the RefillRequest
+        user_id: Reviewer ID
+
+    Returns:
+        True if a claim was released, False if the reviewer held none,
+        None if the request is not in refill_requests
+
+    Raises:
+        ClaimConflict: If another reviewer holds an unexpired claim
+    """
+    request = (await session.exec(
+        select(RefillRequest).where(RefillRequest.id == request_id).with_for_update()
+    )).first()
+    if request is None:
+        return None
+    holder = active_claim_holder(request)
+    if holder is not None and holder != user_id:
+        raise ClaimConflict(f"Refill request is claimed by {holder}", claimed_by=holder)
+    if request.claimed_by != user_id:
+        await session.commit()
+        return False
+
+    request.claimed_by = None
+    request.claim_expires_at = None
+    session.add(request)
+    await session.commit()
+    return True
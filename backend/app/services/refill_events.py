@@ -0,0 +1,327 @@
+"""
+Live refill request events for connected reviewers.
+
+On PostgreSQL a trigger on refill_requests sends a `refill_events`
+notification whenever a request is inserted or changes status, from any
+writer (API, Celery worker, scripts). Claim changes (claimed_by,
+claim_expires_at) send a `claim` notification, which only bumps
+change_count and is not published as an event. Each API process holds a
+single LISTEN connection and fans the events out to its subscribers (the
+SSE endpoint). Other databases fall back to in-process events published after
+commit by the ORM, which only covers writes made by the same process.
+
+Event types:
+- added: a new request was created
+- ai_completed: the AI review finished (now pending human review); the
+  event carries the full request so clients can insert it into the queue
+- reviewed: a reviewer approved or denied the request
+- updated: any other status change
+- resync: events may have been missed; clients should refetch the queue
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import DATABASE_URL, async_engine
+from app.models import REVIEWED_STATUSES, RefillRequest, RefillStatus
+from app.schemas import RefillRequestRead
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "refill_events"
+
+
+def _status(name: Optional[str]) -> Optional[RefillStatus]:
+    """Map a stored status (enum name, e.g. 'PENDING_HUMAN_REVIEW') to RefillStatus."""
+    return RefillStatus[name] if name else None
+
+
+def event_type(old_status: Optional[RefillStatus], status: RefillStatus) -> str:
+    """Classify a status change."""
+    if old_status is None:
+        return "added"
+    if status == RefillStatus.PENDING_HUMAN_REVIEW and old_status == RefillStatus.PENDING_AI_REVIEW:
+        return "ai_completed"
+    if status in REVIEWED_STATUSES:
+        return "reviewed"
+    return "updated"
+
+
+class RefillEventBroker:
+    """Fans refill request events out to the subscribers of one process."""
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._incoming: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks = []
+        self._sequence = itertools.count(1)
+        self._changes = 0
+        self._changes_lock = threading.Lock()
+        self._listening = False
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of connected subscribers in this process."""
+        return len(self._subscribers)
+
+    @property
+    def change_count(self) -> Optional[int]:
+        """
+        Number of refill request changes this process has seen.
+
+        Used as a queue-wide version (e.g. for ETags): it is bumped when a
+        change notification arrives and when this process commits a change.
+        None when changes may be going unseen (not started, the LISTEN
+        connection is down, or the in-process fallback is in use, which
+        misses writes from other processes), so callers must not treat it
+        as current.
+        """
+        if self._loop is None or not self._listening:
+            return None
+        return self._changes
+
+    def mark_changed(self) -> None:
+        """Bump change_count after committing a change. Thread-safe."""
+        with self._changes_lock:
+            self._changes += 1
+
+    async def start(self) -> None:
+        """Start dispatching events (call once from the app's event loop)."""
+        self._loop = asyncio.get_running_loop()
+        self._incoming = asyncio.Queue()
+        self._tasks.append(asyncio.create_task(self._dispatch()))
+        if make_url(DATABASE_URL).get_backend_name() == "postgresql":
+            self._tasks.append(asyncio.create_task(self._listen()))
+        else:
+            # Events only; change_count stays None (see above)
+            install_local_publisher()
+
+    async def stop(self) -> None:
+        """Stop the listener and dispatcher."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        self._listening = False
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        """
+        Subscribe to events.
+
+        Yields a queue of event dictionaries. None is queued when the
+        subscriber fell too far behind and was dropped; it should resync.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.refill_events_queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    def publish(self, payload: Dict) -> None:
+        """Queue a raw change (id, status, old_status, ...) for dispatch. Thread-safe."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._incoming.put_nowait(payload)
+        else:
+            loop.call_soon_threadsafe(self._incoming.put_nowait, payload)
+
+    async def _dispatch(self) -> None:
+        """Turn raw changes into events, in arrival order, and fan them out."""
+        while True:
+            payload = await self._incoming.get()
+            # Count before building, so a change is never missed because its event failed
+            self.mark_changed()
+            if payload.get("type") == "claim":
+                continue
+            try:
+                event = await self._build_event(payload)
+            except Exception:
+                logger.exception("Could not build refill event for %s", payload)
+                continue
+            self._fan_out(event)
+
+    async def _build_event(self, payload: Dict) -> Dict:
+        if payload.get("type") == "resync":
+            return {"type": "resync"}
+
+        status = _status(payload["status"])
+        old_status = _status(payload.get("old_status"))
+        event = {
+            "type": event_type(old_status, status),
+            "id": payload["id"],
+            "status": status.value,
+            "old_status": old_status.value if old_status else None,
+            "ai_decision": payload.get("ai_decision"),
+            "final_decision": payload.get("final_decision"),
+            "reviewed_by": payload.get("reviewed_by"),
+            "created_at": payload.get("created_at"),
+            "reviewed_at": payload.get("reviewed_at"),
+        }
+        if status == RefillStatus.PENDING_HUMAN_REVIEW:
+            # Loaded once per process, not once per subscriber
+            event["request"] = await self._load_request(payload["id"])
+        return event
+
+    async def _load_request(self, request_id: int) -> Optional[Dict]:
+        async with AsyncSession(async_engine) as session:
+            request = (await session.exec(
+                select(RefillRequest)
+                .where(RefillRequest.id == request_id)
+                .options(selectinload(RefillRequest.patient), selectinload(RefillRequest.protocol))
+            )).first()
+            if request is None:
+                return None
+            return RefillRequestRead.model_validate(request).model_dump(mode="json")
+
+    def _fan_out(self, event: Dict) -> None:
+        event["sequence"] = next(self._sequence)
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: drop its backlog and ask it to resync
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _listen(self) -> None:
+        """Hold one LISTEN connection, reconnecting on failure."""
+        import asyncpg
+
+        dsn = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        first = True
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                await conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                self._listening = True
+                # Changes made while not listening are unaccounted for
+                self.mark_changed()
+                if not first:
+                    # Changes may have been missed while reconnecting
+                    self.publish({"type": "resync"})
+                first = False
+                while not conn.is_closed():
+                    await asyncio.sleep(settings.sse_keepalive_interval)
+                    await conn.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._listening = False
+                logger.exception("Refill event listener failed; reconnecting")
+                await asyncio.sleep(5)
+            finally:
+                self._listening = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        self.publish(json.loads(payload))
+
+
+refill_events = RefillEventBroker()
+
+
+# In-process fallback for databases without LISTEN/NOTIFY
+
+_local_publisher_installed = False
+_local_publisher_lock = threading.Lock()
+
+
+def record_change(
+    session: Session,
+    request_id: int,
+    status: RefillStatus,
+    old_status: Optional[RefillStatus],
+    ai_decision: Optional[str] = None,
+    final_decision: Optional[str] = None,
+    reviewed_by: Optional[str] = None,
+    created_at: Optional[datetime] = None,
+    reviewed_at: Optional[datetime] = None,
+) -> None:
+    """
+    Record a status change to publish when the session commits.
+
+    ORM flushes are recorded automatically; writers that bypass the ORM
+    (bulk UPDATE/INSERT statements) call this for each changed row. A no-op
+    unless the in-process fallback is installed.
+    """
+    if not _local_publisher_installed:
+        return
+    session.info.setdefault("refill_events", []).append({
+        "id": request_id,
+        "status": status.name,
+        "old_status": old_status.name if old_status else None,
+        "ai_decision": ai_decision,
+        "final_decision": final_decision,
+        "reviewed_by": reviewed_by,
+        "created_at": created_at.isoformat() if created_at else None,
+        "reviewed_at": reviewed_at.isoformat() if reviewed_at else None,
+    })
+
+
+def _record_target(session: Session, target: RefillRequest, old_status: Optional[RefillStatus]) -> None:
+    record_change(
+        session, target.id, target.status, old_status,
+        target.ai_decision, target.final_decision, target.reviewed_by,
+        target.created_at, target.reviewed_at,
+    )
+
+
+def _after_insert(mapper, connection, target: RefillRequest) -> None:
+    session = inspect(target).session
+    if session is not None:
+        _record_target(session, target, None)
+
+
+def _after_update(mapper, connection, target: RefillRequest) -> None:
+    history = inspect(target).attrs.status.history
+    session = inspect(target).session
+    if session is not None and history.deleted and history.deleted[0] != target.status:
+        _record_target(session, target, history.deleted[0])
+
+
+def _after_commit(session: Session) -> None:
+    for payload in session.info.pop("refill_events", []):
+        refill_events.publish(payload)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop("refill_events", None)
+
+
+def install_local_publisher() -> None:
+    """Publish refill request changes committed through the ORM in this process."""
+    global _local_publisher_installed
+    with _local_publisher_lock:
+        if _local_publisher_installed:
+            return
+        event.listen(RefillRequest, "after_insert", _after_insert)
+        event.listen(RefillRequest, "after_update", _after_update)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+        _local_publisher_installed = True
@@ -0,0 +1,150 @@
+"""
+Streaming export of refill requests for audits.
+
+Rows are read through a server-side cursor in batches of
+settings.export_batch_size and serialized batch by batch, so memory use
+does not grow with the size of the export.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import literal_column, select, union_all
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.models import REVIEWED_STATUSES, ArchivedRefillRequest, MedicationProtocol, Patient, RefillRequest, RefillStatus
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def export_columns(model=RefillRequest) -> list:
+    """Flat export columns of refill requests, read from `model`'s table."""
+    return [
+        model.id.label("id"),
+        model.status,
+        model.is_urgent,
+        model.patient_id,
+        Patient.mrn.label("patient_mrn"),
+        model.protocol_id,
+        MedicationProtocol.medication_class,
+        model.ai_decision,
+        model.ai_reason,
+        model.ai_confidence,
+        model.ai_decided_by,
+        model.ai_cache_hit,
+        model.final_decision,
+        model.reviewed_by,
+        model.reviewed_at,
+        model.created_at,
+        model.updated_at,
+    ]
+
+
+EXPORT_FIELDS = [column.key for column in export_columns()]
+
+
+def _filtered_select(
+    model,
+    statuses: Optional[List[RefillStatus]],
+    ai_decision: Optional[str],
+    final_decision: Optional[str],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+):
+    statement = (
+        select(*export_columns(model))
+        .join(Patient, Patient.id == model.patient_id)
+        .join(MedicationProtocol, MedicationProtocol.id == model.protocol_id)
+    )
+    if statuses:
+        statement = statement.where(model.status.in_(statuses))
+    if ai_decision:
+        statement = statement.where(model.ai_decision == ai_decision)
+    if final_decision:
+        statement = statement.where(model.final_decision == final_decision)
+    if created_from:
+        statement = statement.where(model.created_at >= created_from)
+    if created_to:
+        statement = statement.where(model.created_at < created_to)
+    return statement
+
+
+def build_export_statement(
+    statuses: Optional[List[RefillStatus]] = None,
+    ai_decision: Optional[str] = None,
+    final_decision: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+):
+    """
+    Build the SELECT for an export, ordered by id.
+
+    Archived requests are included unless the status filter only asks for
+    pending ones, which are never archived.
+
+    Args:
+        statuses: Only include these statuses
+        ai_decision: Only include this AI decision ("Approve" or "Deny")
+        final_decision: Only include this human decision ("Approve" or "Deny")
+        created_from: Only include requests created at or after this time
+        created_to: Only include requests created before this time
+
+    Returns:
+        SQLAlchemy select of flat export columns
+    """
+    filters = (statuses, ai_decision, final_decision, created_from, created_to)
+    statement = _filtered_select(RefillRequest, *filters)
+    if not statuses or REVIEWED_STATUSES.intersection(statuses):
+        return union_all(statement, _filtered_select(ArchivedRefillRequest, *filters)).order_by(literal_column("id"))
+    return statement.order_by(RefillRequest.id)
+
+
+def _export_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(
+        json.dumps({field: _export_value(value) for field, value in zip(EXPORT_FIELDS, row)}) + "\n"
+        for row in rows
+    )
+
+
+def _csv_chunk(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows([_export_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_export(statement, export_format: str = "ndjson") -> AsyncIterator[str]:
+    """
+    Yield an export as text chunks, one chunk per batch of rows.
+
+    The generator owns its database connection so it stays open for as long
+    as the response is being streamed.
+
+    Args:
+        statement: Statement from build_export_statement
+        export_format: "ndjson" or "csv"
+    """
+    if export_format == "csv":
+        yield _csv_chunk([], header=True)
+
+    statement = statement.execution_options(yield_per=settings.export_batch_size)
+    async with async_engine.connect() as conn:
+        result = await conn.stream(statement)
+        async for rows in result.partitions():
+            yield _csv_chunk(rows) if export_format == "csv" else _ndjson_chunk(rows)
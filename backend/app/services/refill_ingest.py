@@ -0,0 +1,183 @@
+"""
+Bulk ingestion of refill requests from pharmacy and eRx feeds.
+
+Feeds are CSV (header: mrn,medication_class and optionally is_urgent) or
+NDJSON (one {"mrn": ..., "medication_class": ..., "is_urgent": ...} object
+per line). Rows are processed
+in chunks of settings.ingest_batch_size: patient ids are resolved with one
+SELECT per chunk, protocols from the in-memory protocol registry, and the
+new requests are written with a multi-row INSERT ... RETURNING, committed
+and enqueued for AI review chunk by chunk. Invalid rows are reported with
+their line number and skipped.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Patient, RefillRequest, RefillStatus
+from app.services.protocol_registry import protocol_registry
+from app.services.refill_events import record_change
+from app.worker.tasks import enqueue_ai_reviews
+
+INGEST_FORMATS = ("csv", "ndjson")
+
+
+@dataclass
+class IngestRow:
+    """One parsed feed row (error is set if it could not be parsed)."""
+    line: int
+    mrn: Optional[str] = None
+    medication_class: Optional[str] = None
+    is_urgent: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class IngestResult:
+    """Outcome of an ingest."""
+    request_ids: List[int] = field(default_factory=list)
+    errors: List[Dict] = field(default_factory=list)
+
+    @property
+    def created(self) -> int:
+        """Number of refill requests created."""
+        return len(self.request_ids)
+
+    @property
+    def failed(self) -> int:
+        """Number of rows skipped."""
+        return len(self.errors)
+
+
+def _field(record: Dict, name: str) -> Optional[str]:
+    value = record.get(name)
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+
+def _flag(record: Dict, name: str) -> bool:
+    value = record.get(name)
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "yes", "y")
+
+
+def _row(line: int, record: Dict) -> IngestRow:
+    mrn = _field(record, "mrn")
+    medication_class = _field(record, "medication_class")
+    error = None if mrn and medication_class else "mrn and medication_class are required"
+    return IngestRow(line, mrn, medication_class, _flag(record, "is_urgent"), error)
+
+
+def parse_feed(lines: Iterable[str], feed_format: str) -> Iterator[IngestRow]:
+    """
+    Parse feed lines lazily.
+
+    Args:
+        lines: Lines of a CSV (with header) or NDJSON feed
+        feed_format: "csv" or "ndjson"
+
+    Yields:
+        IngestRow per data row; line numbers are 1-based feed lines
+    """
+    if feed_format == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield _row(reader.line_num, record)
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield IngestRow(line_number, error=f"invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield IngestRow(line_number, error="expected a JSON object")
+            continue
+        yield _row(line_number, record)
+
+
+def _error(row: IngestRow, message: str) -> Dict:
+    return {"line": row.line, "mrn": row.mrn, "medication_class": row.medication_class, "error": message}
+
+
+def _ingest_chunk(session: Session, rows: List[IngestRow], result: IngestResult) -> List[Tuple[int, bool]]:
+    """Resolve, validate and insert one chunk. Returns the new request ids and urgency."""
+    mrns = {row.mrn for row in rows if not row.error}
+    patient_ids = dict(session.exec(select(Patient.mrn, Patient.id).where(Patient.mrn.in_(mrns))).all())
+
+    now = datetime.utcnow()
+    values = []
+    for row in rows:
+        if row.error:
+            result.errors.append(_error(row, row.error))
+            continue
+        patient_id = patient_ids.get(row.mrn)
+        protocol = protocol_registry.get(row.medication_class)
+        if patient_id is None:
+            result.errors.append(_error(row, "unknown mrn"))
+        elif protocol is None:
+            result.errors.append(_error(row, "no protocol for medication_class"))
+        else:
+            values.append({
+                "patient_id": patient_id,
+                "protocol_id": protocol.id,
+                "status": RefillStatus.PENDING_AI_REVIEW,
+                "is_urgent": row.is_urgent,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+    if not values:
+        return []
+
+    created = [
+        (request_id, is_urgent)
+        for request_id, is_urgent in session.execute(
+            insert(RefillRequest).returning(RefillRequest.id, RefillRequest.is_urgent), values
+        )
+    ]
+    for request_id, _ in created:
+        record_change(session, request_id, RefillStatus.PENDING_AI_REVIEW, None, created_at=now)
+    session.commit()
+    return created
+
+
+def ingest_rows(rows: Iterable[IngestRow], enqueue: bool = True) -> IngestResult:
+    """
+    Create refill requests for parsed feed rows.
+
+    Each chunk is committed (and enqueued) on its own, so a failure part way
+    through keeps the chunks already ingested.
+
+    Args:
+        rows: Rows from parse_feed
+        enqueue: Hand the new requests to the AI review workers
+
+    Returns:
+        IngestResult with the new request ids and per-row errors
+    """
+    result = IngestResult()
+    rows = iter(rows)
+    with Session(engine) as session:
+        while chunk := list(islice(rows, settings.ingest_batch_size)):
+            created = _ingest_chunk(session, chunk, result)
+            request_ids = [request_id for request_id, _ in created]
+            result.request_ids.extend(request_ids)
+            if enqueue and request_ids:
+                # Only after commit so workers can see the rows
+                urgent_ids = {request_id for request_id, is_urgent in created if is_urgent}
+                enqueue_ai_reviews(request_ids, urgent_ids=urgent_ids)
+    return result
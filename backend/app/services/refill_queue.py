@@ -0,0 +1,80 @@
+"""
+Query building for the human review queue.
+
+The queue is ordered in SQL (urgent requests first, then "Deny"
+recommendations, then oldest first) and paginated with an opaque keyset
+cursor, so each page is a bounded index range scan regardless of queue
+depth.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, case, literal_column, tuple_
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+
+from app.models import RefillRequest
+
+# Constants are rendered inline rather than as bind parameters so the
+# planner can match the partial expression index ix_refill_requests_queue_order
+QUEUE_STATUS = literal_column("'PENDING_HUMAN_REVIEW'")
+
+_urgent = RefillRequest.is_urgent == literal_column("true")
+_deny = RefillRequest.ai_decision == literal_column("'Deny'")
+
+# Urgent before routine, then "Deny" recommendations first within each
+queue_rank = case(
+    (and_(_urgent, _deny), literal_column("0")),
+    (_urgent, literal_column("1")),
+    (_deny, literal_column("2")),
+    else_=literal_column("3"),
+)
+
+QueueCursor = Tuple[int, datetime, int]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(request: RefillRequest) -> str:
+    """Encode the queue position of a request as an opaque cursor."""
+    rank = (0 if request.is_urgent else 2) + (0 if request.ai_decision == "Deny" else 1)
+    raw = json.dumps([rank, request.created_at.isoformat(), request.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> QueueCursor:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        rank, created_at, request_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(rank), datetime.fromisoformat(created_at), int(request_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def build_queue_statement(limit: int, after: Optional[QueueCursor] = None):
+    """
+    Build the SELECT for one page of the human review queue.
+
+    Args:
+        limit: Maximum number of rows
+        after: Position of the last row of the previous page
+
+    Returns:
+        SQLModel select with patient and protocol eager-loaded
+    """
+    statement = (
+        select(RefillRequest)
+        .where(RefillRequest.status == QUEUE_STATUS)
+        .options(selectinload(RefillRequest.patient), selectinload(RefillRequest.protocol))
+        .order_by(queue_rank, RefillRequest.created_at, RefillRequest.id)
+        .limit(limit)
+    )
+    if after is not None:
+        statement = statement.where(
+            tuple_(queue_rank, RefillRequest.created_at, RefillRequest.id) > tuple_(*after)
+        )
+    return statement
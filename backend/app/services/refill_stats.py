@@ -0,0 +1,267 @@
+"""
+Refill queue statistics, maintained incrementally.
+
+Each API process keeps in-memory aggregates of refill requests (working
+table and archive) and updates them from the refill event stream
+(app/services/refill_events.py) instead of aggregating the tables on
+every request:
+- request counts by status
+- AI/human agreement: reviewed requests whose final decision matches the
+  AI decision
+- median time-to-review (created to reviewed) over recent reviews
+- backlog age: the oldest request in each pending status
+
+The aggregates are rebuilt from the database at startup, every
+settings.refill_stats_reconcile_interval seconds, and whenever events may
+have been missed (listener reconnect, or this consumer fell behind). The
+rebuild corrects any drift, e.g. from writes the in-process fallback
+cannot see.
+"""
+import asyncio
+import heapq
+import logging
+import statistics
+import threading
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.core.metrics import observe_stage
+from app.models import (
+    PENDING_STATUSES,
+    PENDING_STATUSES_SQL,
+    REVIEWED_STATUSES,
+    ArchivedRefillRequest,
+    RefillRequest,
+    RefillStatus,
+)
+from app.services.refill_events import refill_events
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class RefillStats:
+    """In-memory refill request aggregates of one process."""
+
+    def __init__(self):
+        # Written on the event loop, read by the API and by metrics scrapes in threads
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Reviewed (and any other non-pending) statuses are counted...
+        self._counts: Counter = Counter()
+        # ...pending ones are tracked per request, so replayed events are no-ops
+        self._pending: Dict[RefillStatus, Dict[int, datetime]] = {status: {} for status in PENDING_STATUSES}
+        # Min-heaps of (created_at, id); entries no longer pending are dropped lazily
+        self._oldest: Dict[RefillStatus, List[Tuple[datetime, int]]] = {status: [] for status in PENDING_STATUSES}
+        self._compared = 0
+        self._agreed = 0
+        # (reviewed_at, seconds from creation), oldest first
+        self._reviews: Deque[Tuple[datetime, float]] = deque(maxlen=settings.refill_stats_max_review_samples)
+        self.reconciled_at: Optional[datetime] = None
+
+    @property
+    def ready(self) -> bool:
+        """True once the aggregates were loaded from the database."""
+        return self.reconciled_at is not None
+
+    async def start(self) -> None:
+        """Load the aggregates and follow refill events (call after refill_events.start())."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop following events."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def counts(self) -> Dict[RefillStatus, int]:
+        """Request count by status."""
+        with self._lock:
+            return self._status_counts()
+
+    def snapshot(self) -> Dict:
+        """
+        Current statistics.
+
+        Returns:
+            Dictionary matching app.schemas.RefillStatsRead
+        """
+        now = datetime.utcnow()
+        window = timedelta(hours=settings.refill_stats_review_window_hours)
+        with self._lock:
+            while self._reviews and self._reviews[0][0] < now - window:
+                self._reviews.popleft()
+            counts = self._status_counts()
+            durations = [seconds for _, seconds in self._reviews]
+            oldest = {status: self._oldest_created(status) for status in PENDING_STATUSES}
+            compared, agreed = self._compared, self._agreed
+        return {
+            "counts": {status.value: count for status, count in counts.items()},
+            "total": sum(counts.values()),
+            "agreement_rate": agreed / compared if compared else None,
+            "compared_reviews": compared,
+            "median_time_to_review_seconds": statistics.median(durations) if durations else None,
+            "reviews_in_window": len(durations),
+            "review_window_hours": settings.refill_stats_review_window_hours,
+            "backlog_age_seconds": {
+                status.value: (now - created_at).total_seconds() if created_at else None
+                for status, created_at in oldest.items()
+            },
+            "as_of": now,
+            "reconciled_at": self.reconciled_at,
+        }
+
+    def apply(self, event: Dict) -> None:
+        """Update the aggregates with one refill event (see refill_events)."""
+        request_id = event["id"]
+        status = RefillStatus(event["status"])
+        old_status = RefillStatus(event["old_status"]) if event.get("old_status") else None
+        created_at = _timestamp(event.get("created_at")) or datetime.utcnow()
+        with self._lock:
+            if old_status in PENDING_STATUSES:
+                if self._pending[old_status].pop(request_id, None) is None:
+                    # Already counted by the reconciliation that ran since
+                    return
+            elif old_status is not None:
+                self._counts[old_status] -= 1
+
+            if status in PENDING_STATUSES:
+                self._pending[status][request_id] = created_at
+                heap = self._oldest[status]
+                heapq.heappush(heap, (created_at, request_id))
+                if len(heap) > 2 * len(self._pending[status]) + 1024:
+                    self._oldest[status] = self._build_heap(self._pending[status])
+            else:
+                self._counts[status] += 1
+
+            if status in REVIEWED_STATUSES and old_status not in REVIEWED_STATUSES:
+                if event.get("ai_decision") and event.get("final_decision"):
+                    self._compared += 1
+                    self._agreed += event["ai_decision"] == event["final_decision"]
+                reviewed_at = _timestamp(event.get("reviewed_at")) or datetime.utcnow()
+                self._reviews.append((reviewed_at, (reviewed_at - created_at).total_seconds()))
+
+    async def reconcile(self) -> None:
+        """Rebuild the aggregates from the database."""
+        cutoff = datetime.utcnow() - timedelta(hours=settings.refill_stats_review_window_hours)
+        with observe_stage("stats_reconcile"):
+            async with AsyncSession(async_engine) as session:
+                # Reviewed requests may have moved to the archive
+                by_status = []
+                review_rows = []
+                for model in (RefillRequest, ArchivedRefillRequest):
+                    by_status += (await session.exec(
+                        select(
+                            model.status,
+                            func.count(),
+                            func.count(case((model.ai_decision.is_not(None) & model.final_decision.is_not(None), 1))),
+                            func.count(case((model.ai_decision == model.final_decision, 1))),
+                        ).group_by(model.status)
+                    )).all()
+                    review_rows += (await session.exec(
+                        select(model.reviewed_at, model.created_at)
+                        .where(model.reviewed_at >= cutoff)
+                        .order_by(model.reviewed_at.desc())
+                        .limit(settings.refill_stats_max_review_samples)
+                    )).all()
+                # Literal predicate so the partial pending index is used
+                pending_rows = (await session.exec(
+                    select(RefillRequest.id, RefillRequest.status, RefillRequest.created_at)
+                    .where(text(PENDING_STATUSES_SQL))
+                )).all()
+
+        counts: Counter = Counter()
+        compared = agreed = 0
+        for status, count, status_compared, status_agreed in by_status:
+            if status not in PENDING_STATUSES:
+                counts[status] += count
+            if status in REVIEWED_STATUSES:
+                compared += status_compared
+                agreed += status_agreed
+        pending: Dict[RefillStatus, Dict[int, datetime]] = {status: {} for status in PENDING_STATUSES}
+        for request_id, status, created_at in pending_rows:
+            pending[status][request_id] = created_at
+        reviews = deque(
+            ((reviewed_at, (reviewed_at - created_at).total_seconds()) for reviewed_at, created_at in sorted(review_rows)),
+            maxlen=settings.refill_stats_max_review_samples,
+        )
+
+        with self._lock:
+            if self.ready:
+                drift = {
+                    status.value: delta
+                    for status, count in self._status_counts().items()
+                    if (delta := (counts[status] if status not in PENDING_STATUSES else len(pending[status])) - count)
+                }
+                if drift:
+                    logger.info("Refill statistics corrected by reconciliation: %s", drift)
+            self._counts = counts
+            self._pending = pending
+            self._oldest = {status: self._build_heap(pending[status]) for status in PENDING_STATUSES}
+            self._compared, self._agreed = compared, agreed
+            self._reviews = reviews
+            self.reconciled_at = datetime.utcnow()
+
+    def _status_counts(self) -> Dict[RefillStatus, int]:
+        return {
+            status: len(self._pending[status]) if status in PENDING_STATUSES else self._counts[status]
+            for status in RefillStatus
+        }
+
+    def _oldest_created(self, status: RefillStatus) -> Optional[datetime]:
+        heap = self._oldest[status]
+        pending = self._pending[status]
+        while heap and pending.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    @staticmethod
+    def _build_heap(pending: Dict[int, datetime]) -> List[Tuple[datetime, int]]:
+        heap = [(created_at, request_id) for request_id, created_at in pending.items()]
+        heapq.heapify(heap)
+        return heap
+
+    async def _run(self) -> None:
+        """Reconcile and follow events, starting over whenever events may have been lost."""
+        while True:
+            try:
+                # Subscribe first: changes made during the reload are applied after it
+                async with refill_events.subscribe() as queue:
+                    await self.reconcile()
+                    await self._follow(queue)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Refill statistics failed; reloading")
+                await asyncio.sleep(5)
+
+    async def _follow(self, queue: asyncio.Queue) -> None:
+        """Apply events and reconcile periodically; return when this subscriber was dropped."""
+        loop = asyncio.get_running_loop()
+        next_reconcile = loop.time() + settings.refill_stats_reconcile_interval
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=max(next_reconcile - loop.time(), 0))
+            except asyncio.TimeoutError:
+                event = {"type": "resync"}
+            if event is None:
+                return
+            if event["type"] == "resync":
+                await self.reconcile()
+                next_reconcile = loop.time() + settings.refill_stats_reconcile_interval
+                continue
+            self.apply(event)
+
+
+refill_stats = RefillStats()
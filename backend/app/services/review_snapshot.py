@@ -0,0 +1,67 @@
+"""
+Snapshots of the data an AI review decided on.
+
+The snapshot is stored on the RefillRequest at review time so the detail
+page shows reviewers exactly what the AI saw, without calling the EMR or
+re-running the rules on every view.
+"""
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.services.protocol_rules import ProtocolEvaluation
+
+STATUS_LABELS = {True: "✅ PASS", False: "❌ FAILED", None: "⚠️ MISSING"}
+
+
+def protocols_checked(evaluation: ProtocolEvaluation) -> List[Dict]:
+    """Rule results in the format shown on the detail page."""
+    return [
+        {
+            "protocol": result.label,
+            "emr_data": result.emr_data,
+            # A missing A1c date is itself a violation
+            "status": STATUS_LABELS[False if result.violation else result.passed],
+        }
+        for result in evaluation.results
+    ]
+
+
+def build_snapshot(
+    patient_data: Dict,
+    clinical_data: Dict,
+    protocol,
+    evaluation: ProtocolEvaluation,
+    captured_at: Optional[datetime] = None,
+) -> Dict:
+    """
+    Build the JSON snapshot stored in RefillRequest.ai_snapshot.
+
+    Args:
+        patient_data: EMR demographics
+        clinical_data: EMR clinical data
+        protocol: Protocol evaluated (None if no protocol was found)
+        evaluation: Rules engine result
+        captured_at: Capture time (defaults to now)
+
+    Returns:
+        JSON-serializable dictionary
+    """
+    return {
+        "captured_at": (captured_at or datetime.utcnow()).isoformat(),
+        "patient_data": patient_data,
+        "clinical_data": clinical_data,
+        "protocol": {
+            "id": protocol.id,
+            "medication_class": protocol.medication_class,
+            "version": protocol.version,
+            "max_months_since_visit": protocol.max_months_since_visit,
+            "max_a1c_value": protocol.max_a1c_value,
+            "require_recent_a1c": protocol.require_recent_a1c,
+        } if protocol else None,
+        "decision": evaluation.decision,
+        "reason": evaluation.reason,
+        "rule_results": [asdict(result) for result in evaluation.results],
+        "escalation_reasons": evaluation.escalation_reasons,
+        "protocols_checked": protocols_checked(evaluation),
+    }
@@ -0,0 +1,62 @@
+"""
+Celery application for background AI review.
+
+Start a worker with:
+    celery -A app.worker.celery_app worker --loglevel=info
+
+Periodic tasks (archiving reviewed requests, re-enqueueing stuck AI
+reviews) are scheduled by beat:
+    celery -A app.worker.celery_app beat --loglevel=info
+
+Set CELERY_TASK_ALWAYS_EAGER=true to run tasks in-process (no broker
+needed), or CELERY_BROKER_URL=memory:// for an in-memory broker.
+"""
+from celery import Celery
+from celery.signals import worker_ready
+
+from app.core.config import settings
+
+celery_app = Celery(
+    "medrefills",
+    broker=settings.celery_broker_url or settings.redis_url,
+    include=["app.worker.tasks"],
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    task_ignore_result=True,
+    task_always_eager=settings.celery_task_always_eager,
+    task_eager_propagates=True,
+    # Acknowledge after the review is stored so a crashed worker's task is
+    # redelivered once the visibility timeout expires
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_concurrency=settings.celery_worker_concurrency,
+    worker_prefetch_multiplier=1,
+    broker_transport_options={
+        "visibility_timeout": settings.celery_visibility_timeout,
+        # Deliver urgent reviews (priority 0) before normal ones
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+    beat_schedule={
+        "requeue-stale-ai-reviews": {
+            "task": "ai_review.requeue_stale_requests",
+            "schedule": settings.ai_review_requeue_interval,
+        },
+        "archive-reviewed-refill-requests": {
+            "task": "archive.move_reviewed_requests",
+            "schedule": settings.archive_interval,
+        },
+    },
+)
+
+
+@worker_ready.connect
+def start_worker_metrics(**kwargs):
+    """Serve the worker's metrics (AI reviews, LLM and EMR calls) for Prometheus."""
+    if settings.worker_metrics_port:
+        from app.core.metrics import start_metrics_server
+        start_metrics_server(settings.worker_metrics_port)
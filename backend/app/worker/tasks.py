@@ -0,0 +1,88 @@
+"""
+Celery tasks for MedRefills AI.
+"""
+import logging
+from typing import Collection, Iterable, Optional
+
+from kombu.exceptions import OperationalError as BrokerError
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.services.ai_review import claim_stale_ai_reviews, process_ai_review
+from app.services.llm_scheduler import LLMBackpressureError
+from app.services.refill_archive import archive_reviewed_requests
+from app.worker.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+# Redis broker priorities: 0 is consumed first
+URGENT_TASK_PRIORITY = 0
+NORMAL_TASK_PRIORITY = 5
+
+
+@celery_app.task(
+    bind=True,
+    name="ai_review.process_refill_request",
+    autoretry_for=(OperationalError,),
+    retry_backoff=settings.ai_review_retry_backoff,
+    max_retries=settings.ai_review_max_retries,
+)
+def process_refill_request(self, request_id: int) -> Optional[str]:
+    """Run the AI review for a refill request and move it to human review."""
+    try:
+        return process_ai_review(request_id)
+    except LLMBackpressureError as e:
+        if self.request.is_eager:
+            # No broker to hand the retry to; the request stays pending
+            # until requeue_stale_ai_reviews picks it up again
+            logger.warning("AI review of refill request %s deferred: %s", request_id, e)
+            return None
+        # The request stays PENDING_AI_REVIEW until the LLM has capacity;
+        # once the retries are exhausted, requeue_stale_ai_reviews takes over
+        raise self.retry(
+            exc=e,
+            countdown=e.retry_after,
+            max_retries=settings.ai_review_backpressure_max_retries,
+        )
+
+
+def enqueue_ai_reviews(request_ids: Iterable[int], urgent_ids: Collection[int] = ()) -> None:
+    """
+    Hand refill requests to the AI review worker pool.
+
+    Callers commit the requests first. If the broker is unreachable, the
+    requests are left in PENDING_AI_REVIEW for requeue_stale_ai_reviews
+    instead of failing a request whose rows are already stored.
+
+    Args:
+        request_ids: IDs of RefillRequests in PENDING_AI_REVIEW
+        urgent_ids: Subset of request_ids to review ahead of the others
+    """
+    request_ids = list(request_ids)
+    for index, request_id in enumerate(request_ids):
+        priority = URGENT_TASK_PRIORITY if request_id in urgent_ids else NORMAL_TASK_PRIORITY
+        try:
+            process_refill_request.apply_async((request_id,), priority=priority)
+        except BrokerError:
+            logger.exception(
+                "Broker unavailable: %d AI reviews left for the stale review sweep", len(request_ids) - index
+            )
+            return
+
+
+@celery_app.task(name="ai_review.requeue_stale_requests")
+def requeue_stale_ai_reviews() -> int:
+    """Re-enqueue refill requests left in PENDING_AI_REVIEW past settings.ai_review_requeue_after."""
+    request_ids, urgent_ids = claim_stale_ai_reviews(
+        settings.ai_review_requeue_after, settings.ai_review_requeue_batch_size
+    )
+    if request_ids:
+        logger.warning("Re-enqueueing %d stale AI reviews", len(request_ids))
+        enqueue_ai_reviews(request_ids, urgent_ids=urgent_ids)
+    return len(request_ids)
+
+
+@celery_app.task(name="archive.move_reviewed_requests")
+def archive_reviewed_refill_requests() -> int:
+    """Move reviewed refill requests past settings.archive_after_hours to the archive."""
+    return archive_reviewed_requests()
@@ -0,0 +1,78 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "patients",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("mrn", sqlmodel.AutoString(), nullable=False),
+        sa.Column("first_name", sqlmodel.AutoString(), nullable=False),
+        sa.Column("last_name", sqlmodel.AutoString(), nullable=False),
+        sa.Column("date_of_birth", sa.Date(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_patients_mrn", "patients", ["mrn"], unique=True)
+
+    op.create_table(
+        "medication_protocols",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("medication_class", sqlmodel.AutoString(), nullable=False),
+        sa.Column("max_months_since_visit", sa.Integer(), nullable=True),
+        sa.Column("max_a1c_value", sa.Float(), nullable=True),
+        sa.Column("require_recent_a1c", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_medication_protocols_medication_class", "medication_protocols", ["medication_class"]
+    )
+
+    op.create_table(
+        "refill_requests",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("patient_id", sa.Integer(), nullable=False),
+        sa.Column("protocol_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "PENDING_AI_REVIEW", "PENDING_HUMAN_REVIEW", "APPROVED", "DENIED",
+                name="refillstatus",
+            ),
+            nullable=False,
+        ),
+        sa.Column("ai_decision", sqlmodel.AutoString(), nullable=True),
+        sa.Column("ai_reason", sqlmodel.AutoString(), nullable=True),
+        sa.Column("ai_confidence", sa.Float(), nullable=True),
+        sa.Column("final_decision", sqlmodel.AutoString(), nullable=True),
+        sa.Column("reviewed_by", sqlmodel.AutoString(), nullable=True),
+        sa.Column("reviewed_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["patient_id"], ["patients.id"]),
+        sa.ForeignKeyConstraint(["protocol_id"], ["medication_protocols.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("refill_requests")
+    op.drop_index("ix_medication_protocols_medication_class", table_name="medication_protocols")
+    op.drop_table("medication_protocols")
+    op.drop_index("ix_patients_mrn", table_name="patients")
+    op.drop_table("patients")
+    sa.Enum(name="refillstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,53 @@
+"""Add ai_decided_by and queue-serving indexes on refill_requests
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+PENDING_STATUSES_SQL = "status IN ('PENDING_AI_REVIEW', 'PENDING_HUMAN_REVIEW')"
+QUEUE_STATUS_SQL = "status = 'PENDING_HUMAN_REVIEW'"
+
+
+def upgrade() -> None:
+    # Databases built with create_all before migrations existed may already
+    # have some of these objects
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("refill_requests")}
+    if "ai_decided_by" not in columns:
+        op.add_column("refill_requests", sa.Column("ai_decided_by", sqlmodel.AutoString(), nullable=True))
+
+    op.create_index("ix_refill_requests_patient_id", "refill_requests", ["patient_id"], if_not_exists=True)
+    op.create_index("ix_refill_requests_protocol_id", "refill_requests", ["protocol_id"], if_not_exists=True)
+    op.create_index(
+        "ix_refill_requests_pending_status_decision_created",
+        "refill_requests",
+        ["status", "ai_decision", "created_at"],
+        postgresql_where=sa.text(PENDING_STATUSES_SQL),
+        sqlite_where=sa.text(PENDING_STATUSES_SQL),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_refill_requests_queue_order",
+        "refill_requests",
+        [sa.text("(CASE WHEN ai_decision = 'Deny' THEN 0 ELSE 1 END)"), "created_at", "id"],
+        postgresql_where=sa.text(QUEUE_STATUS_SQL),
+        sqlite_where=sa.text(QUEUE_STATUS_SQL),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refill_requests_queue_order", table_name="refill_requests")
+    op.drop_index("ix_refill_requests_pending_status_decision_created", table_name="refill_requests")
+    op.drop_index("ix_refill_requests_protocol_id", table_name="refill_requests")
+    op.drop_index("ix_refill_requests_patient_id", table_name="refill_requests")
+    op.drop_column("refill_requests", "ai_decided_by")
@@ -0,0 +1,49 @@
+"""Version medication protocols and notify listeners on change
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "medication_protocols",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.add_column(
+        "medication_protocols",
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+    # Every change to medication_protocols notifies protocol registries in all workers
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("""
+            CREATE OR REPLACE FUNCTION notify_medication_protocols_changed() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('medication_protocols_changed', '');
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute("""
+            CREATE TRIGGER medication_protocols_changed
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON medication_protocols
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_medication_protocols_changed()
+        """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS medication_protocols_changed ON medication_protocols")
+        op.execute("DROP FUNCTION IF EXISTS notify_medication_protocols_changed()")
+    op.drop_column("medication_protocols", "updated_at")
+    op.drop_column("medication_protocols", "version")
@@ -0,0 +1,28 @@
+"""Store the EMR snapshot and rule results of each AI review
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "refill_requests",
+        sa.Column("ai_snapshot", sa.JSON().with_variant(postgresql.JSONB(), "postgresql"), nullable=True),
+    )
+    op.add_column("refill_requests", sa.Column("ai_snapshot_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("refill_requests", "ai_snapshot_at")
+    op.drop_column("refill_requests", "ai_snapshot")
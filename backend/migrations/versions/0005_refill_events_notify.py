@@ -0,0 +1,47 @@
+"""Notify listeners when refill requests are added or change status
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Other databases use the in-process fallback in app/services/refill_events.py
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("""
+            CREATE OR REPLACE FUNCTION notify_refill_event() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' AND OLD.status = NEW.status THEN
+                    RETURN NULL;
+                END IF;
+                PERFORM pg_notify('refill_events', json_build_object(
+                    'id', NEW.id,
+                    'status', NEW.status,
+                    'old_status', CASE WHEN TG_OP = 'UPDATE' THEN OLD.status END,
+                    'ai_decision', NEW.ai_decision,
+                    'final_decision', NEW.final_decision,
+                    'reviewed_by', NEW.reviewed_by
+                )::text);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute("""
+            CREATE TRIGGER refill_requests_notify
+            AFTER INSERT OR UPDATE OF status ON refill_requests
+            FOR EACH ROW EXECUTE FUNCTION notify_refill_event()
+        """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS refill_requests_notify ON refill_requests")
+        op.execute("DROP FUNCTION IF EXISTS notify_refill_event()")
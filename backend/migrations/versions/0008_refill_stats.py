@@ -0,0 +1,47 @@
+"""Carry request timestamps in refill events and index reviewed_at for statistics
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+NOTIFY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION notify_refill_event() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND OLD.status = NEW.status THEN
+            RETURN NULL;
+        END IF;
+        PERFORM pg_notify('refill_events', json_build_object(
+            'id', NEW.id,
+            'status', NEW.status,
+            'old_status', CASE WHEN TG_OP = 'UPDATE' THEN OLD.status END,
+            'ai_decision', NEW.ai_decision,
+            'final_decision', NEW.final_decision,
+            'reviewed_by', NEW.reviewed_by{extra}
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    # Queue statistics (app/services/refill_stats.py) need both timestamps of each change
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(NOTIFY_FUNCTION.format(extra=""",
+            'created_at', NEW.created_at,
+            'reviewed_at', NEW.reviewed_at"""))
+    op.create_index("ix_refill_requests_reviewed_at", "refill_requests", ["reviewed_at"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refill_requests_reviewed_at", table_name="refill_requests")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(NOTIFY_FUNCTION.format(extra=""))
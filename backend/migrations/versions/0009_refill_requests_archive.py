@@ -0,0 +1,69 @@
+"""Add refill_requests_archive, partitioned by month of reviewed_at on PostgreSQL
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+STATUSES = ("PENDING_AI_REVIEW", "PENDING_HUMAN_REVIEW", "APPROVED", "DENIED")
+COLUMNS = (
+    "id", "patient_id", "protocol_id", "status", "is_urgent",
+    "ai_decision", "ai_reason", "ai_confidence", "ai_decided_by", "ai_cache_hit",
+    "ai_snapshot", "ai_snapshot_at", "final_decision", "reviewed_by", "reviewed_at",
+    "created_at", "updated_at",
+)
+
+
+def upgrade() -> None:
+    # Monthly partitions are created by the archiver as it needs them
+    # (app/services/refill_archive.py); other databases get a plain table
+    is_postgresql = op.get_bind().dialect.name == "postgresql"
+    status = (
+        postgresql.ENUM(*STATUSES, name="refillstatus", create_type=False)
+        if is_postgresql else sa.Enum(*STATUSES, name="refillstatus")
+    )
+    op.create_table(
+        "refill_requests_archive",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("patient_id", sa.Integer(), nullable=False),
+        sa.Column("protocol_id", sa.Integer(), nullable=False),
+        sa.Column("status", status, nullable=False),
+        sa.Column("is_urgent", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("ai_decision", sqlmodel.AutoString(), nullable=True),
+        sa.Column("ai_reason", sqlmodel.AutoString(), nullable=True),
+        sa.Column("ai_confidence", sa.Float(), nullable=True),
+        sa.Column("ai_decided_by", sqlmodel.AutoString(), nullable=True),
+        sa.Column("ai_cache_hit", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("ai_snapshot", sa.JSON().with_variant(postgresql.JSONB(), "postgresql"), nullable=True),
+        sa.Column("ai_snapshot_at", sa.DateTime(), nullable=True),
+        sa.Column("final_decision", sqlmodel.AutoString(), nullable=True),
+        sa.Column("reviewed_by", sqlmodel.AutoString(), nullable=True),
+        sa.Column("reviewed_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["patient_id"], ["patients.id"]),
+        sa.ForeignKeyConstraint(["protocol_id"], ["medication_protocols.id"]),
+        # The partition key must be part of the primary key
+        sa.PrimaryKeyConstraint("id", "reviewed_at"),
+        postgresql_partition_by="RANGE (reviewed_at)",
+    )
+    op.create_index("ix_refill_requests_archive_patient_id", "refill_requests_archive", ["patient_id"])
+    op.create_index("ix_refill_requests_archive_protocol_id", "refill_requests_archive", ["protocol_id"])
+    op.create_index("ix_refill_requests_archive_reviewed_at", "refill_requests_archive", ["reviewed_at"])
+
+
+def downgrade() -> None:
+    # Move archived requests back before dropping the table (and its partitions)
+    columns = ", ".join(COLUMNS)
+    op.execute(f"INSERT INTO refill_requests ({columns}) SELECT {columns} FROM refill_requests_archive")
+    op.drop_table("refill_requests_archive")
@@ -0,0 +1,30 @@
+"""Add review claims (leases) to refill requests
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+TABLES = ("refill_requests", "refill_requests_archive")
+
+
+def upgrade() -> None:
+    # The archive keeps the same columns so rows can be moved as they are
+    for table in TABLES:
+        op.add_column(table, sa.Column("claimed_by", sqlmodel.AutoString(), nullable=True))
+        op.add_column(table, sa.Column("claim_expires_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, "claim_expires_at")
+        op.drop_column(table, "claimed_by")
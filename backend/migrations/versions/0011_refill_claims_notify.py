@@ -0,0 +1,63 @@
+"""Notify listeners when review claims change
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+NOTIFY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION notify_refill_event() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND OLD.status = NEW.status THEN{claim_change}
+            RETURN NULL;
+        END IF;
+        PERFORM pg_notify('refill_events', json_build_object(
+            'id', NEW.id,
+            'status', NEW.status,
+            'old_status', CASE WHEN TG_OP = 'UPDATE' THEN OLD.status END,
+            'ai_decision', NEW.ai_decision,
+            'final_decision', NEW.final_decision,
+            'reviewed_by', NEW.reviewed_by,
+            'created_at', NEW.created_at,
+            'reviewed_at', NEW.reviewed_at
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+CLAIM_CHANGE = """
+            IF OLD.claimed_by IS DISTINCT FROM NEW.claimed_by
+               OR OLD.claim_expires_at IS DISTINCT FROM NEW.claim_expires_at THEN
+                PERFORM pg_notify('refill_events', json_build_object('type', 'claim', 'id', NEW.id)::text);
+            END IF;"""
+
+CREATE_TRIGGER = """
+    CREATE TRIGGER refill_requests_notify
+    AFTER INSERT OR UPDATE OF {columns} ON refill_requests
+    FOR EACH ROW EXECUTE FUNCTION notify_refill_event()
+"""
+
+
+def upgrade() -> None:
+    # The queue is served with an ETag and shows who holds each claim, so
+    # claims, renewals and releases must bump the change count of every API
+    # process, not only the one that handled them
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(NOTIFY_FUNCTION.format(claim_change=CLAIM_CHANGE))
+        op.execute("DROP TRIGGER IF EXISTS refill_requests_notify ON refill_requests")
+        op.execute(CREATE_TRIGGER.format(columns="status, claimed_by, claim_expires_at"))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS refill_requests_notify ON refill_requests")
+        op.execute(CREATE_TRIGGER.format(columns="status"))
+        op.execute(NOTIFY_FUNCTION.format(claim_change=""))
@@ -0,0 +1,42 @@
+"""Order the human review queue index by urgency
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+QUEUE_STATUS_SQL = "status = 'PENDING_HUMAN_REVIEW'"
+QUEUE_RANK_SQL = (
+    "(CASE WHEN (is_urgent = true AND ai_decision = 'Deny') THEN 0"
+    " WHEN (is_urgent = true) THEN 1"
+    " WHEN (ai_decision = 'Deny') THEN 2 ELSE 3 END)"
+)
+OLD_QUEUE_RANK_SQL = "(CASE WHEN ai_decision = 'Deny' THEN 0 ELSE 1 END)"
+
+
+def _replace_queue_index(rank_sql: str) -> None:
+    op.drop_index("ix_refill_requests_queue_order", table_name="refill_requests")
+    op.create_index(
+        "ix_refill_requests_queue_order",
+        "refill_requests",
+        [sa.text(rank_sql), "created_at", "id"],
+        postgresql_where=sa.text(QUEUE_STATUS_SQL),
+        sqlite_where=sa.text(QUEUE_STATUS_SQL),
+    )
+
+
+def upgrade() -> None:
+    # Urgent requests now lead the queue (queue_rank in app/services/refill_queue.py)
+    _replace_queue_index(QUEUE_RANK_SQL)
+
+
+def downgrade() -> None:
+    _replace_queue_index(OLD_QUEUE_RANK_SQL)
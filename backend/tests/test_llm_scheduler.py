@@ -0,0 +1,135 @@
+"""
+Tests for the in-process LLM scheduler (LocalLimiter and LLMScheduler).
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.llm_scheduler import PRIORITIES, LLMBackpressureError, LLMScheduler, LocalLimiter
+
+URGENT = PRIORITIES["urgent"]
+NORMAL = PRIORITIES["normal"]
+
+
+def wait_for(condition, timeout: float = 2.0) -> None:
+    """Poll until condition() is true."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def start_waiter(limiter: LocalLimiter, priority: int, name: str, served: list) -> threading.Thread:
+    """Start a thread that takes a slot, records its name and releases the slot."""
+    def run():
+        limiter.acquire(priority, time.monotonic() + 5)
+        served.append(name)
+        limiter.release()
+
+    waiting = len(limiter._waiters)
+    thread = threading.Thread(target=run)
+    thread.start()
+    wait_for(lambda: len(limiter._waiters) == waiting + 1)
+    return thread
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    limiter = LocalLimiter(requests_per_minute=None, burst=1, max_concurrency=1)
+    limiter.acquire(NORMAL, time.monotonic() + 1)
+
+    served = []
+    threads = [
+        start_waiter(limiter, NORMAL, "normal-1", served),
+        start_waiter(limiter, NORMAL, "normal-2", served),
+        start_waiter(limiter, URGENT, "urgent", served),
+    ]
+    limiter.release()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert served == ["urgent", "normal-1", "normal-2"]
+    assert limiter._in_flight == 0
+
+
+def test_concurrency_cap():
+    limiter = LocalLimiter(requests_per_minute=None, burst=1, max_concurrency=2)
+    limiter.acquire(NORMAL, time.monotonic() + 1)
+    limiter.acquire(NORMAL, time.monotonic() + 1)
+
+    with pytest.raises(LLMBackpressureError):
+        limiter.acquire(NORMAL, time.monotonic() + 0.05)
+
+    limiter.release()
+    limiter.acquire(NORMAL, time.monotonic() + 0.05)
+    assert limiter._in_flight == 2
+
+
+def test_deadline_raises_and_leaves_the_queue():
+    limiter = LocalLimiter(requests_per_minute=None, burst=1, max_concurrency=1)
+    limiter.acquire(NORMAL, time.monotonic() + 1)
+
+    started = time.monotonic()
+    with pytest.raises(LLMBackpressureError) as error:
+        limiter.acquire(URGENT, started + 0.1)
+
+    assert 0.1 <= time.monotonic() - started < 1.0
+    assert error.value.retry_after > 0
+    assert limiter._waiters == []
+
+    # A timed-out urgent waiter must not block the next caller
+    limiter.release()
+    limiter.acquire(NORMAL, time.monotonic() + 0.05)
+
+
+def test_token_bucket_limits_bursts():
+    # 10 tokens per second, bursts of 2
+    limiter = LocalLimiter(requests_per_minute=600, burst=2, max_concurrency=10)
+    limiter.acquire(NORMAL, time.monotonic() + 1)
+    limiter.acquire(NORMAL, time.monotonic() + 1)
+
+    with pytest.raises(LLMBackpressureError):
+        limiter.acquire(NORMAL, time.monotonic() + 0.02)
+
+    started = time.monotonic()
+    limiter.acquire(NORMAL, started + 1)
+    assert 0.03 <= time.monotonic() - started < 0.5
+
+
+def test_scheduler_rejects_callers_beyond_the_queue_cap():
+    limiter = LocalLimiter(requests_per_minute=None, burst=1, max_concurrency=1)
+    scheduler = LLMScheduler(limiter, max_queue=1)
+    limiter.acquire(NORMAL, time.monotonic() + 1)
+
+    entered = threading.Event()
+
+    def queued_call():
+        with scheduler.slot("normal", timeout=5):
+            entered.set()
+
+    thread = threading.Thread(target=queued_call)
+    thread.start()
+    wait_for(lambda: scheduler._waiting == 1)
+
+    started = time.monotonic()
+    with pytest.raises(LLMBackpressureError, match="queue is full"):
+        with scheduler.slot("normal", timeout=5):
+            pass
+    assert time.monotonic() - started < 0.5
+
+    limiter.release()
+    thread.join(timeout=5)
+    assert entered.is_set()
+    assert scheduler._waiting == 0
+    assert limiter._in_flight == 0
+
+
+def test_slot_is_released_when_the_call_fails():
+    limiter = LocalLimiter(requests_per_minute=None, burst=1, max_concurrency=1)
+    scheduler = LLMScheduler(limiter, max_queue=10)
+
+    with pytest.raises(RuntimeError):
+        with scheduler.slot("urgent", timeout=1):
+            raise RuntimeError("provider error")
+
+    assert limiter._in_flight == 0
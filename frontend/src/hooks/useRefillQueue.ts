@@ -1,18 +1,72 @@
 /**
  * React Query hooks for refill requests.
  */
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
+import { useEffect, useState } from 'react'
+import axios from 'axios'
+import { type InfiniteData, useInfiniteQuery, useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { useNavigate } from 'react-router-dom'
 import * as api from '../services/api'
 
 /**
- * Hook to fetch the refill queue.
+ * Queue order: urgent first, then "Deny" recommendations, then oldest first.
+ * Must match queue_rank in backend/app/services/refill_queue.py.
+ */
+function compareQueueOrder(a: api.RefillRequest, b: api.RefillRequest) {
+  const rank = (r: api.RefillRequest) => (r.is_urgent ? 0 : 2) + (r.ai_decision === 'Deny' ? 0 : 1)
+  return rank(a) - rank(b) || a.created_at.localeCompare(b.created_at) || a.id - b.id
+}
+
+/**
+ * Apply a live event to the loaded queue pages.
+ * A request that sorts after the last loaded row is left for the next page,
+ * so the loaded rows stay a prefix of the queue.
+ */
+function applyRefillEvent(
+  queue: InfiniteData<api.RefillQueuePage, string | undefined> | undefined,
+  event: api.RefillEvent
+) {
+  if (!queue) return queue
+  const inserted = event.status === 'pending_human_review' ? event.request : null
+  let placed = false
+  const pages = queue.pages.map((page) => {
+    let requests = page.requests.filter((r) => r.id !== event.id)
+    // Pages end where their cursor points; the last page takes the rest only
+    // when there is nothing more to load
+    const last = page.requests[page.requests.length - 1]
+    if (inserted && !placed && (!page.nextCursor || (last && compareQueueOrder(inserted, last) < 0))) {
+      requests = [...requests, inserted].sort(compareQueueOrder)
+      placed = true
+    }
+    return { ...page, requests }
+  })
+  return { ...queue, pages }
+}
+
+/**
+ * Hook to fetch the refill queue page by page and keep the loaded pages up
+ * to date with live events. `fetchNextPage` loads more.
  */
 export function useRefillQueue() {
-  return useQuery({
+  const queryClient = useQueryClient()
+
+  useEffect(() => {
+    return api.subscribeToRefillEvents(
+      (event) => {
+        queryClient.setQueryData<InfiniteData<api.RefillQueuePage, string | undefined>>(
+          ['refill-queue'],
+          (queue) => applyRefillEvent(queue, event)
+        )
+      },
+      () => queryClient.invalidateQueries({ queryKey: ['refill-queue'] })
+    )
+  }, [queryClient])
+
+  return useInfiniteQuery({
     queryKey: ['refill-queue'],
-    queryFn: api.getRefillQueue,
-    refetchInterval: 30000, // Refetch every 30 seconds
+    queryFn: ({ pageParam }) => api.getRefillQueue(pageParam),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (lastPage) => lastPage.nextCursor ?? undefined,
+    select: (data) => data.pages.flatMap((page) => page.requests),
   })
 }
 
@@ -46,3 +100,72 @@ export function useReviewRefill() {
   })
 }
 
+export type ClaimState =
+  | { status: 'claiming' }
+  | { status: 'held' }
+  | { status: 'conflict'; message: string }
+  | { status: 'error' }
+
+/**
+ * Hook to hold the review claim on a request while its page is open.
+ * Claims on mount, renews halfway through the lease and releases on unmount.
+ */
+export function useRefillClaim(requestId: string, userId: string = api.getReviewerId()) {
+  const [claim, setClaim] = useState<ClaimState>({ status: 'claiming' })
+
+  useEffect(() => {
+    if (!requestId) return
+    let cancelled = false
+    let held = false
+    let timer: ReturnType<typeof setTimeout> | undefined
+
+    const acquire = async () => {
+      try {
+        const request = await api.claimRefill(requestId, userId)
+        if (cancelled) return
+        held = true
+        setClaim({ status: 'held' })
+        const remaining = request.claim_expires_at
+          ? api.parseUtc(request.claim_expires_at) - Date.now()
+          : 0
+        timer = setTimeout(acquire, Math.max(remaining / 2, 5000))
+      } catch (error) {
+        if (cancelled) return
+        held = false
+        if (axios.isAxiosError(error) && error.response?.status === 409) {
+          setClaim({ status: 'conflict', message: error.response.data?.detail ?? 'Claimed by another reviewer' })
+        } else {
+          setClaim({ status: 'error' })
+        }
+      }
+    }
+
+    setClaim({ status: 'claiming' })
+    acquire()
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+      if (held) {
+        api.releaseClaim(requestId, userId).catch(() => undefined)
+      }
+    }
+  }, [requestId, userId])
+
+  return claim
+}
+
+/**
+ * Hook to claim the next request of the queue and open it.
+ */
+export function useClaimNext() {
+  const navigate = useNavigate()
+
+  return useMutation({
+    mutationFn: (userId?: string) => api.claimNext(userId, 1),
+    onSuccess: (claimed) => {
+      if (claimed.length > 0) {
+        navigate(`/request/${claimed[0].id}`)
+      }
+    },
+  })
+}
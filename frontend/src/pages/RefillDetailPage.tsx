@@ -2,7 +2,8 @@
  * Refill Detail Page - HITL dashboard for reviewing a single refill request.
  */
 import { useParams } from 'react-router-dom'
-import { useRefillDetail, useReviewRefill } from '../hooks/useRefillQueue'
+import { useRefillClaim, useRefillDetail, useReviewRefill } from '../hooks/useRefillQueue'
+import { getReviewerId } from '../services/api'
 import { Button } from '../components/ui/button'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '../components/ui/card'
 import {
@@ -18,8 +19,10 @@ import { Loader2 } from 'lucide-react'
 
 export default function RefillDetailPage() {
   const { requestId } = useParams<{ requestId: string }>()
+  const reviewerId = getReviewerId()
   const { data: detailData, isLoading, error } = useRefillDetail(requestId || '')
   const reviewMutation = useReviewRefill()
+  const claim = useRefillClaim(requestId || '', reviewerId)
 
   if (isLoading) {
     return (
@@ -48,13 +51,15 @@ export default function RefillDetailPage() {
   const aiDecision = request.ai_decision || 'Pending'
   const aiReason = request.ai_reason || 'No reason provided'
   const aiConfidence = request.ai_confidence !== null ? `${Math.round(request.ai_confidence)}%` : 'N/A'
+  // Only the reviewer holding the claim may decide
+  const canReview = claim.status === 'held' && !reviewMutation.isPending
 
   const handleApprove = () => {
     if (requestId) {
       reviewMutation.mutate({
         requestId,
         decision: 'Approve',
-        userId: 'clinical_staff_member',
+        userId: reviewerId,
       })
     }
   }
@@ -64,7 +69,7 @@ export default function RefillDetailPage() {
       reviewMutation.mutate({
         requestId,
         decision: 'Deny',
-        userId: 'clinical_staff_member',
+        userId: reviewerId,
       })
     }
   }
@@ -104,6 +109,11 @@ export default function RefillDetailPage() {
             <div>
               <p className="text-sm font-medium text-muted-foreground mb-1">Confidence</p>
               <p className="text-lg font-semibold">{aiConfidence}</p>
+              {request.ai_cache_hit && (
+                <p className="text-xs text-muted-foreground mt-1">
+                  Reused from an earlier review with identical clinical data
+                </p>
+              )}
             </div>
             <Separator />
             <div>
@@ -178,12 +188,18 @@ export default function RefillDetailPage() {
       {/* Action Bar */}
       <Card>
         <CardContent className="pt-6">
-          <div className="flex justify-end gap-4">
+          <div className="flex items-center justify-end gap-4">
+            {claim.status === 'conflict' && (
+              <p className="mr-auto text-sm text-muted-foreground">{claim.message}</p>
+            )}
+            {claim.status === 'error' && (
+              <p className="mr-auto text-sm text-destructive">Could not claim this request for review.</p>
+            )}
             <Button
               variant="destructive"
               size="lg"
               onClick={handleDeny}
-              disabled={reviewMutation.isPending}
+              disabled={!canReview}
             >
               {reviewMutation.isPending ? (
                 <>
@@ -197,7 +213,7 @@ export default function RefillDetailPage() {
             <Button
               size="lg"
               onClick={handleApprove}
-              disabled={reviewMutation.isPending}
+              disabled={!canReview}
               className="bg-green-600 hover:bg-green-700"
             >
               {reviewMutation.isPending ? (
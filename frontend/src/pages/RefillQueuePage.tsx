@@ -2,7 +2,8 @@
  * Refill Queue Page - Displays all pending refill requests.
  */
 import { Link } from 'react-router-dom'
-import { useRefillQueue } from '../hooks/useRefillQueue'
+import { useClaimNext, useRefillQueue } from '../hooks/useRefillQueue'
+import { activeClaimHolder, getReviewerId } from '../services/api'
 import { Button } from '../components/ui/button'
 import {
   Table,
@@ -15,7 +16,16 @@ import {
 import { Loader2 } from 'lucide-react'
 
 export default function RefillQueuePage() {
-  const { data: requests, isLoading, error } = useRefillQueue()
+  const {
+    data: requests,
+    isLoading,
+    error,
+    hasNextPage,
+    fetchNextPage,
+    isFetchingNextPage,
+  } = useRefillQueue()
+  const claimNext = useClaimNext()
+  const reviewerId = getReviewerId()
 
   if (isLoading) {
     return (
@@ -40,11 +50,25 @@ export default function RefillQueuePage() {
 
   return (
     <div className="container mx-auto py-10">
-      <div className="mb-6">
-        <h1 className="text-3xl font-bold tracking-tight">Refill Queue</h1>
-        <p className="text-muted-foreground mt-2">
-          Review and approve medication refill requests
-        </p>
+      <div className="mb-6 flex items-start justify-between gap-4">
+        <div>
+          <h1 className="text-3xl font-bold tracking-tight">Refill Queue</h1>
+          <p className="text-muted-foreground mt-2">
+            Review and approve medication refill requests
+          </p>
+        </div>
+        <div className="text-right">
+          <Button
+            onClick={() => claimNext.mutate(reviewerId)}
+            disabled={claimNext.isPending}
+          >
+            {claimNext.isPending ? <Loader2 className="mr-2 h-4 w-4 animate-spin" /> : null}
+            Review next
+          </Button>
+          {claimNext.data?.length === 0 && (
+            <p className="text-sm text-muted-foreground mt-2">No unclaimed requests to review.</p>
+          )}
+        </div>
       </div>
 
       {requests && requests.length === 0 ? (
@@ -73,10 +97,16 @@ export default function RefillQueuePage() {
                   ? request.protocol.medication_class
                   : 'Unknown Medication'
                 const recommendation = request.ai_decision || 'Pending'
+                const reviewer = activeClaimHolder(request)
 
                 return (
                   <TableRow key={request.id}>
-                    <TableCell className="font-medium">{patientName}</TableCell>
+                    <TableCell className="font-medium">
+                      {patientName}
+                      {request.is_urgent && (
+                        <span className="ml-2 text-xs font-semibold uppercase text-destructive">Urgent</span>
+                      )}
+                    </TableCell>
                     <TableCell>{medication}</TableCell>
                     <TableCell>
                       <span
@@ -92,6 +122,9 @@ export default function RefillQueuePage() {
                       </span>
                     </TableCell>
                     <TableCell className="text-right">
+                      {reviewer && reviewer !== reviewerId && (
+                        <span className="mr-3 text-xs text-muted-foreground">In review by {reviewer}</span>
+                      )}
                       <Link to={`/request/${request.id}`}>
                         <Button variant="outline" size="sm">
                           Review
@@ -103,6 +136,14 @@ export default function RefillQueuePage() {
               })}
             </TableBody>
           </Table>
+          {hasNextPage && (
+            <div className="flex justify-center border-t p-4">
+              <Button variant="outline" onClick={() => fetchNextPage()} disabled={isFetchingNextPage}>
+                {isFetchingNextPage ? <Loader2 className="mr-2 h-4 w-4 animate-spin" /> : null}
+                Load more
+              </Button>
+            </div>
+          )}
         </div>
       )}
     </div>
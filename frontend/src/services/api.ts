@@ -5,6 +5,38 @@ import axios from 'axios'
 
 const API_BASE_URL = (import.meta.env?.VITE_API_URL as string) || 'http://localhost:8000'
 
+const REVIEWER_ID_KEY = 'medrefills.reviewerId'
+
+let reviewerId: string | null = null
+
+/**
+ * Identity sent with claims and reviews.
+ * VITE_REVIEWER_ID when set, otherwise an id generated once per browser and
+ * kept in localStorage, so claims survive reloads.
+ */
+export function getReviewerId(): string {
+  if (reviewerId) return reviewerId
+  const configured = import.meta.env?.VITE_REVIEWER_ID as string | undefined
+  if (configured) {
+    reviewerId = configured
+    return reviewerId
+  }
+  try {
+    reviewerId = localStorage.getItem(REVIEWER_ID_KEY)
+  } catch {
+    // Storage unavailable (e.g. disabled): keep the id for this page load only
+  }
+  if (!reviewerId) {
+    reviewerId = `reviewer-${Math.random().toString(36).slice(2, 10)}`
+    try {
+      localStorage.setItem(REVIEWER_ID_KEY, reviewerId)
+    } catch {
+      // See above
+    }
+  }
+  return reviewerId
+}
+
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -18,12 +50,18 @@ export interface RefillRequest {
   patient_id: number
   protocol_id: number
   status: string
+  is_urgent: boolean
   ai_decision: string | null
   ai_reason: string | null
   ai_confidence: number | null
+  ai_decided_by: 'rules' | 'agent' | null
+  ai_cache_hit: boolean
   final_decision: string | null
   reviewed_by: string | null
   reviewed_at: string | null
+  // Review claim: only this reviewer may review until it expires
+  claimed_by: string | null
+  claim_expires_at: string | null
   created_at: string
   updated_at: string
   patient: {
@@ -66,6 +104,23 @@ export interface RefillDetailData {
     }
   }
   protocols_checked: ProtocolCheck[]
+  source: 'snapshot' | 'live'
+  snapshot_captured_at: string | null
+}
+
+export type RefillEventType = 'added' | 'ai_completed' | 'reviewed' | 'updated' | 'resync'
+
+export interface RefillEvent {
+  type: RefillEventType
+  id: number
+  status: string
+  old_status: string | null
+  ai_decision: string | null
+  final_decision: string | null
+  reviewed_by: string | null
+  sequence: number
+  // Present on ai_completed events
+  request?: RefillRequest | null
 }
 
 export interface ReviewPayload {
@@ -74,11 +129,58 @@ export interface ReviewPayload {
 }
 
 /**
- * Get all refill requests pending human review.
+ * Parse a backend timestamp (UTC, sent without a timezone).
  */
-export async function getRefillQueue(): Promise<RefillRequest[]> {
-  const response = await apiClient.get<RefillRequest[]>('/api/v1/refill-queue')
-  return response.data
+export function parseUtc(timestamp: string): number {
+  return Date.parse(/(Z|[+-]\d\d:\d\d)$/.test(timestamp) ? timestamp : `${timestamp}Z`)
+}
+
+/**
+ * Reviewer holding an unexpired claim on a request, if any.
+ */
+export function activeClaimHolder(request: RefillRequest): string | null {
+  if (!request.claimed_by || !request.claim_expires_at) return null
+  return parseUtc(request.claim_expires_at) > Date.now() ? request.claimed_by : null
+}
+
+export interface RefillQueuePage {
+  requests: RefillRequest[]
+  // Pass as `after` to fetch the next page; null on the last page
+  nextCursor: string | null
+}
+
+/**
+ * Get one page of refill requests pending human review, in queue order.
+ */
+export async function getRefillQueue(after?: string): Promise<RefillQueuePage> {
+  const response = await apiClient.get<RefillRequest[]>('/api/v1/refill-queue', {
+    params: after ? { after } : undefined,
+  })
+  return {
+    requests: response.data,
+    nextCursor: response.headers['x-next-cursor'] ?? null,
+  }
+}
+
+/**
+ * Subscribe to live refill request events (server-sent events).
+ * Returns a function that closes the connection.
+ */
+export function subscribeToRefillEvents(
+  onEvent: (event: RefillEvent) => void,
+  onResync: () => void
+): () => void {
+  const source = new EventSource(`${API_BASE_URL}/api/v1/refill-events`)
+  const types: RefillEventType[] = ['added', 'ai_completed', 'reviewed', 'updated']
+  types.forEach((type) => {
+    source.addEventListener(type, (message) => {
+      onEvent(JSON.parse((message as MessageEvent).data) as RefillEvent)
+    })
+  })
+  // Missed events (reconnect or slow client): refetch instead of patching
+  source.addEventListener('resync', onResync)
+  source.onerror = onResync
+  return () => source.close()
 }
 
 /**
@@ -95,7 +197,7 @@ export async function getRefillDetail(requestId: string): Promise<RefillDetailDa
 export async function postReview(
   requestId: string,
   decision: 'Approve' | 'Deny',
-  userId: string = 'clinical_staff_member'
+  userId: string = getReviewerId()
 ): Promise<RefillRequest> {
   const payload: ReviewPayload = {
     decision,
@@ -108,3 +210,44 @@ export async function postReview(
   return response.data
 }
 
+/**
+ * Claim a refill request for review, or renew the claim.
+ * Fails with 409 if another reviewer holds it.
+ */
+export async function claimRefill(
+  requestId: string,
+  userId: string = getReviewerId()
+): Promise<RefillRequest> {
+  const response = await apiClient.post<RefillRequest>(
+    `/api/v1/refill-request/${requestId}/claim`,
+    { user_id: userId }
+  )
+  return response.data
+}
+
+/**
+ * Release a claim so other reviewers can take the request.
+ */
+export async function releaseClaim(
+  requestId: string,
+  userId: string = getReviewerId()
+): Promise<void> {
+  await apiClient.delete(`/api/v1/refill-request/${requestId}/claim`, {
+    params: { user_id: userId },
+  })
+}
+
+/**
+ * Claim the next requests of the review queue.
+ * Returns an empty list when nothing is available.
+ */
+export async function claimNext(
+  userId: string = getReviewerId(),
+  limit: number = 1
+): Promise<RefillRequest[]> {
+  const response = await apiClient.post<RefillRequest[]>('/api/v1/refill-requests:claim', {
+    user_id: userId,
+    limit,
+  })
+  return response.data
+}
@@ -2,6 +2,7 @@
 
 interface ImportMetaEnv {
   readonly VITE_API_URL?: string
+  readonly VITE_REVIEWER_ID?: string
 }
 
 interface ImportMeta {